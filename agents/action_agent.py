@@ -1,20 +1,26 @@
 import requests
 import json
 from .base_agent import BaseAgent
+from .llm_scheduler import PRIORITY_OFFLINE
 
 class ActionAgent(BaseAgent):
     """Agent responsible for extracting actionable items from customer conversations."""
     
+    cache_ttl = 1800
+    max_concurrent_calls = 2
+    context_budget = 1200
+    
     def __init__(self):
         super().__init__("Action Agent")
     
-    def extract_actions(self, conversation, summary=None):
+    async def extract_actions(self, conversation, summary=None, on_delta=None):
         """
         Extract actionable items from the conversation.
         
         Args:
             conversation (str): The formatted conversation history
             summary (str, optional): The conversation summary if available
+            on_delta (callable, optional): Coroutine function receiving streamed text chunks
             
         Returns:
             list: A list of action items that need to be addressed
@@ -48,16 +54,27 @@ class ActionAgent(BaseAgent):
         """
         
         try:
-            response = self.query_llm(prompt)
+            response = await self.query_llm_async(prompt, on_delta=on_delta)
             
             # Process the response into a list of action items
-            actions = [action.strip() for action in response.strip().split('\n') if action.strip()]
-            return actions if actions else []
+            return self.clean_actions(response.strip().split('\n'))
         except Exception as e:
             print(f"[AGENT] {self.name} error extracting actions: {str(e)}")
             return []
     
-    def prioritize_actions(self, actions):
+    def clean_actions(self, actions):
+        """
+        Normalize candidate action items.
+        
+        Args:
+            actions (list): Candidate action strings
+            
+        Returns:
+            list: Non-empty, stripped action items
+        """
+        return [action.strip() for action in actions if isinstance(action, str) and action.strip()]
+    
+    async def prioritize_actions(self, actions):
         """
         Prioritize the list of actions based on urgency and impact.
         
@@ -85,7 +102,7 @@ class ActionAgent(BaseAgent):
         Start with High priority items, then Medium, then Low.
         """
         
-        response = self.query_llm(prompt)
+        response = await self.query_llm_async(prompt, priority=PRIORITY_OFFLINE)
         
         # Process the response into a prioritized list
         prioritized_actions = []
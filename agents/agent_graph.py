@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+
+class AgentGraph:
+    """Runs agent steps concurrently, starting each one as soon as its inputs are ready."""
+
+    def __init__(self, name="pipeline"):
+        """
+        Initialize an empty graph.
+
+        Args:
+            name (str): Name used in log lines
+        """
+        self.name = name
+        self.nodes = {}
+
+    def add_node(self, name, func, depends_on=None, fallback=None):
+        """
+        Register a step in the graph.
+
+        Args:
+            name (str): Unique node name; also the key of its result
+            func (callable): Coroutine function called with the results of its
+                dependencies as keyword arguments
+            depends_on (list, optional): Names of nodes whose results this node needs
+            fallback (any, optional): Result used when the node raises an error
+        """
+        self.nodes[name] = {
+            "func": func,
+            "depends_on": list(depends_on or []),
+            "fallback": fallback
+        }
+
+    def _validate(self, known):
+        """Make sure every dependency exists so the run cannot stall."""
+        for name, node in self.nodes.items():
+            for dep in node["depends_on"]:
+                if dep not in self.nodes and dep not in known:
+                    raise ValueError(f"Node '{name}' depends on unknown node '{dep}'")
+
+    async def _run_node(self, name, results, on_complete):
+        node = self.nodes[name]
+        started = time.monotonic()
+        kwargs = {dep: results[dep] for dep in node["depends_on"]}
+        try:
+            value = await node["func"](**kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[PIPELINE] {self.name} node '{name}' failed: {str(e)}")
+            value = node["fallback"]
+        print(f"[PIPELINE] {self.name} node '{name}' finished in {time.monotonic() - started:.2f}s")
+
+        results[name] = value
+        if on_complete:
+            await on_complete(name, value)
+        return value
+
+    async def run(self, on_complete=None, initial=None):
+        """
+        Execute the graph.
+
+        Args:
+            on_complete (callable, optional): Coroutine function called with
+                (name, result) the moment each node finishes
+            initial (dict, optional): Results that are already known; matching
+                nodes are skipped and their values fed to dependents
+
+        Returns:
+            dict: Results of every node keyed by node name
+        """
+        results = dict(initial or {})
+        self._validate(results)
+
+        waiting = [name for name in self.nodes if name not in results]
+        running = {}
+        started = time.monotonic()
+
+        try:
+            while waiting or running:
+                for name in list(waiting):
+                    if all(dep in results for dep in self.nodes[name]["depends_on"]):
+                        waiting.remove(name)
+                        running[asyncio.ensure_future(self._run_node(name, results, on_complete))] = name
+
+                if not running:
+                    raise RuntimeError(f"Graph {self.name} has unsatisfiable nodes: {waiting}")
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    running.pop(task)
+                    # Surface errors from on_complete; node errors are already handled
+                    task.result()
+        finally:
+            for task in running:
+                task.cancel()
+
+        print(f"[PIPELINE] {self.name} completed {len(self.nodes)} nodes in {time.monotonic() - started:.2f}s")
+        return results
@@ -1,11 +1,23 @@
-import requests
-import json
-import os
-import time
+from .llm_client import LLMClient, LLMError
+from .llm_cache import LLMCache
+from .llm_singleflight import SingleFlight
+from .llm_scheduler import LLMScheduler, PRIORITY_PANEL
+from utils.context_builder import ContextBuilder
 
 class BaseAgent:
     """Base class for all agents in the multi-agent system."""
     
+    # Response caching; subclasses tune the TTL (seconds) or opt out entirely
+    use_cache = True
+    cache_ttl = 3600
+    
+    # Scheduling class for this agent's calls and cap on its concurrent calls (None = no cap)
+    llm_priority = PRIORITY_PANEL
+    max_concurrent_calls = None
+    
+    # Tokens of conversation context this agent's prompts may carry
+    context_budget = 1200
+    
     def __init__(self, agent_name):
         """
         Initialize an agent with a name.
@@ -15,24 +27,39 @@ class BaseAgent:
         """
         self.name = agent_name
         self.model = "llama3.2:1b"
-        self.ollama_url = "http://localhost:11434/api/generate"
+        self.llm_client = LLMClient.get_shared()
+        self.ollama_url = self.llm_client.url
+        self.llm_cache = LLMCache.get_shared()
+        self.single_flight = SingleFlight.get_shared()
+        self.scheduler = LLMScheduler.get_shared()
+        self.scheduler.set_agent_limit(self.name, self.max_concurrent_calls)
+        self.context_builder = ContextBuilder.get_shared()
         print(f"[AGENT] {self.name} initialized")
-        
-    def query_llm(self, prompt, max_retries=3, retry_delay=1):
+    
+    def build_context(self, conversation_history, summary=None):
         """
-        Query the LLama model using Ollama API.
+        Format the conversation for this agent's prompts within its token budget.
         
         Args:
-            prompt (str): The prompt to send to the model
-            max_retries (int): Maximum number of retries on failure
-            retry_delay (int): Delay between retries in seconds
+            conversation_history (TranscriptView): Conversation messages, oldest first
+            summary (str, optional): Rolling summary standing in for messages that do not fit
             
         Returns:
-            str: The model's response
+            str: Conversation context
         """
-        print(f"[AGENT] {self.name} querying LLM with prompt of length {len(prompt)} chars")
+        budget = self.context_builder.budget_for(self.name, self.context_budget)
+        return self.context_builder.build(conversation_history, summary, budget=budget, label=self.name)
+    
+    def _prepare_prompt(self, prompt):
+        """
+        Add common system instructions based on agent type.
         
-        # Add common system instructions based on agent type
+        Args:
+            prompt (str): The agent's prompt
+            
+        Returns:
+            str: The prompt to send to the model
+        """
         if "IntentClassifier" in self.__class__.__name__:
             system_context = """
             You are an intent classification system for a customer support chatbot.
@@ -50,33 +77,128 @@ class BaseAgent:
             - When in doubt between casual and issue, prefer casual for safety
             """
             prompt = f"{system_context}\n\n{prompt}"
+        return prompt
+    
+    async def query_llm_async(self, prompt, max_retries=3, retry_delay=1, on_delta=None, priority=None,
+                              on_generated=None):
+        """
+        Query the LLama model using Ollama API without blocking the event loop.
         
-        headers = {
-            "Content-Type": "application/json"
-        }
+        Args:
+            prompt (str): The prompt to send to the model
+            max_retries (int): Maximum number of retries on failure
+            retry_delay (int): Base delay between retries in seconds (doubles each retry)
+            on_delta (callable, optional): Coroutine function called with each partial
+                text chunk; when given, the response is streamed token by token
+            priority (int, optional): Scheduling class; defaults to the agent's llm_priority
+            on_generated (callable, optional): Called with the response only when this call
+                generated it, not when it came from the cache or an identical call in flight
+            
+        Returns:
+            str: The model's full response
+        """
+        print(f"[AGENT] {self.name} querying LLM with prompt of length {len(prompt)} chars")
+        prompt = self._prepare_prompt(prompt)
         
-        data = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": False
-        }
+        cache_key = self._cache_key(prompt)
+        cached = await self._cache_lookup_async(cache_key)
+        if cached is not None:
+            if on_delta is not None:
+                await on_delta(cached)
+            return cached
         
-        for attempt in range(max_retries):
+        streaming = on_delta is not None
+        priority = self.llm_priority if priority is None else priority
+        
+        async def generate(emit):
             try:
-                print(f"[AGENT] {self.name} LLM query attempt {attempt+1}/{max_retries}")
-                response = requests.post(self.ollama_url, headers=headers, data=json.dumps(data))
-                response.raise_for_status()
-                result = response.json().get("response", "")
+                async with self.scheduler.slot(self.name, priority):
+                    if not streaming:
+                        result = await self.llm_client.generate(self.model, prompt, max_retries, retry_delay, label=self.name)
+                    else:
+                        parts = []
+                        stream = self.llm_client.stream(self.model, prompt, max_retries, retry_delay, label=self.name)
+                        try:
+                            async for delta in stream:
+                                parts.append(delta)
+                                await emit(delta)
+                        finally:
+                            # Release the HTTP connection even if the generation is cancelled
+                            await stream.aclose()
+                        result = "".join(parts)
                 print(f"[AGENT] {self.name} received response of length {len(result)} chars")
+                await self._cache_store_async(cache_key, result)
+                if on_generated is not None:
+                    on_generated(result)
                 return result
-            except Exception as e:
-                print(f"[AGENT] {self.name} LLM query error: {str(e)}")
-                if attempt == max_retries - 1:
-                    print(f"[AGENT] {self.name} all retry attempts failed")
-                    return f"Error querying LLM: {str(e)}"
-                else:
-                    print(f"[AGENT] {self.name} retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
+            except LLMError as e:
+                print(f"[AGENT] {self.name} all retry attempts failed")
+                return f"Error querying LLM: {str(e)}"
+        
+        # Identical concurrent prompts share one generation
+        request_key = cache_key or self.llm_cache.make_key(self.model, prompt)
+        return await self.single_flight.do(request_key, generate, on_delta=on_delta)
+    
+    def query_llm(self, prompt, max_retries=3, retry_delay=1):
+        """
+        Blocking variant of query_llm_async for scripts and offline tools.
+        
+        Args:
+            prompt (str): The prompt to send to the model
+            max_retries (int): Maximum number of retries on failure
+            retry_delay (int): Base delay between retries in seconds (doubles each retry)
+            
+        Returns:
+            str: The model's response
+        """
+        print(f"[AGENT] {self.name} querying LLM with prompt of length {len(prompt)} chars")
+        prompt = self._prepare_prompt(prompt)
+        
+        cache_key = self._cache_key(prompt)
+        cached = self._cache_lookup(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            result = self.llm_client.generate_sync(self.model, prompt, max_retries, retry_delay, label=self.name)
+            print(f"[AGENT] {self.name} received response of length {len(result)} chars")
+            self._cache_store(cache_key, result)
+            return result
+        except LLMError as e:
+            print(f"[AGENT] {self.name} all retry attempts failed")
+            return f"Error querying LLM: {str(e)}"
+    
+    def _cache_key(self, prompt):
+        """Return the cache key for a prepared prompt, or None when caching is off."""
+        if not self.use_cache or not self.llm_cache.enabled:
+            return None
+        return self.llm_cache.make_key(self.model, prompt)
+    
+    def _cache_lookup(self, cache_key):
+        if cache_key is None:
+            return None
+        cached = self.llm_cache.get(cache_key)
+        if cached is not None:
+            print(f"[AGENT] {self.name} using cached response of length {len(cached)} chars")
+        return cached
+    
+    async def _cache_lookup_async(self, cache_key):
+        # The disk tier is read in a worker thread, not on the event loop
+        if cache_key is None:
+            return None
+        cached = await self.llm_cache.get_async(cache_key)
+        if cached is not None:
+            print(f"[AGENT] {self.name} using cached response of length {len(cached)} chars")
+        return cached
+    
+    def _cache_store(self, cache_key, result):
+        # Failed queries never reach here, so error text is not cached
+        if cache_key is not None:
+            self.llm_cache.set(cache_key, result, ttl=self.cache_ttl)
+    
+    async def _cache_store_async(self, cache_key, result):
+        if cache_key is not None:
+            await self.llm_cache.set_async(cache_key, result, ttl=self.cache_ttl)
     
     def log_activity(self, activity_type, input_data, output_data):
         """
@@ -102,5 +224,6 @@ class BaseAgent:
         return {
             "name": self.name,
             "model": self.model,
-            "class": self.__class__.__name__
+            "class": self.__class__.__name__,
+            "cache_ttl": self.cache_ttl if self.use_cache else None
         }
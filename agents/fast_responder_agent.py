@@ -0,0 +1,166 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from .base_agent import BaseAgent
+from .llm_scheduler import PRIORITY_OFFLINE
+
+# Words that may accompany a greeting or farewell without adding a request
+FILLER_WORDS = {
+    "there", "team", "everyone", "all", "folks", "again", "so", "much", "a", "lot", "very",
+    "ok", "okay", "you", "for", "your", "the", "help", "now", "then", "later", "soon", "and"
+}
+
+
+class FastResponderAgent(BaseAgent):
+    """Agent that answers plain greetings and farewells from pools of pre-generated replies."""
+
+    # Every refresh should produce new variants, and it never gates a user reply
+    use_cache = False
+    llm_priority = PRIORITY_OFFLINE
+    max_concurrent_calls = 1
+
+    # Replies used until the first refresh succeeds, and whenever one fails
+    DEFAULT_REPLIES = {
+        "greeting": [
+            "Hello! How can I help you today?",
+            "Hi there! What can I help you with today?",
+            "Hello, thanks for reaching out! How can I assist you?"
+        ],
+        "farewell": [
+            "Thank you for reaching out. Have a great day!",
+            "Thanks for contacting us. Take care!",
+            "Glad I could help. Have a wonderful day!"
+        ]
+    }
+
+    def __init__(self, greetings, farewells):
+        """
+        Initialize the responder.
+
+        Args:
+            greetings (list): Greeting phrases recognized as plain greetings
+            farewells (list): Farewell phrases recognized as plain farewells
+        """
+        super().__init__("Fast Responder Agent")
+        self.phrases = {"greeting": greetings, "farewell": farewells}
+        self.pools = {intent: list(replies) for intent, replies in self.DEFAULT_REPLIES.items()}
+        self.variants = int(os.environ.get("FAST_REPLY_VARIANTS", "6"))
+        self.refresh_interval = float(os.environ.get("FAST_REPLY_REFRESH_SECONDS", str(6 * 3600)))
+        self.last_refresh = None
+        self.stats = {"fast": 0, "fallthrough": 0, "refreshes": 0, "failed_refreshes": 0}
+
+    def is_plain(self, intent, message):
+        """
+        Check whether a message is only a greeting or farewell with nothing else to answer.
+
+        Args:
+            intent (str): The classified intent
+            message (str): The user's message
+
+        Returns:
+            bool: True if a canned reply fully answers the message
+        """
+        if intent not in self.pools or "?" in message:
+            return False
+        text = " ".join(re.findall(r"[a-z']+", message.lower()))
+        for phrase in sorted(self.phrases[intent], key=len, reverse=True):
+            text = re.sub(rf"\b{re.escape(phrase)}\b", " ", text)
+        return all(word in FILLER_WORDS for word in text.split())
+
+    def select_reply(self, intent, message, conversation_history):
+        """
+        Pick a pooled reply for a plain greeting or farewell.
+
+        Args:
+            intent (str): The classified intent
+            message (str): The user's message
+            conversation_history (ConversationTranscript): Previous conversation messages
+
+        Returns:
+            str: The reply, or None when the message needs a generated response
+        """
+        if not self.is_plain(intent, message):
+            self.stats["fallthrough"] += 1
+            return None
+
+        # Avoid repeating the previous assistant reply word for word
+        previous = next((msg["content"] for msg in reversed(conversation_history) if msg["role"] == "assistant"), None)
+        choices = [reply for reply in self.pools[intent] if reply != previous] or self.pools[intent]
+        self.stats["fast"] += 1
+        return random.choice(choices)
+
+    async def refresh_pools(self):
+        """Regenerate the reply variants for every intent."""
+        for intent in self.pools:
+            prompt = f"""
+            You are a friendly customer support chatbot. Write {self.variants} different replies to a customer's
+            {intent} message. Each reply is 1-2 short sentences with a professional but warm tone.
+            For greetings, ask how you can help them today. For farewells, thank them for reaching out.
+
+            Respond with a JSON list of strings only.
+            """
+            response = await self.query_llm_async(prompt)
+            replies = self.parse_replies(response)
+            if len(replies) >= 2:
+                self.pools[intent] = replies
+                print(f"[AGENT] {self.name} refreshed {len(replies)} {intent} replies")
+            else:
+                self.stats["failed_refreshes"] += 1
+                print(f"[AGENT] {self.name} kept previous {intent} replies, refresh returned no usable variants")
+        self.stats["refreshes"] += 1
+        self.last_refresh = time.time()
+
+    def parse_replies(self, response):
+        """
+        Extract usable reply variants from the model's response.
+
+        Args:
+            response (str): The model's response
+
+        Returns:
+            list: Clean reply strings
+        """
+        start = response.find('[')
+        end = response.rfind(']') + 1
+        if start < 0 or end <= start:
+            return []
+        try:
+            items = json.loads(response[start:end])
+        except ValueError:
+            return []
+        replies = []
+        for item in items:
+            if not isinstance(item, str):
+                continue
+            reply = item.strip().strip('"')
+            if 5 <= len(reply) <= 200 and "response" not in reply.lower():
+                replies.append(reply)
+        return replies
+
+    async def run_refresh_loop(self):
+        """Refresh the pools now and then every refresh_interval seconds until cancelled."""
+        while True:
+            try:
+                await self.refresh_pools()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["failed_refreshes"] += 1
+                print(f"[AGENT] {self.name} error refreshing replies: {str(e)}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def get_stats(self):
+        """
+        Get fast-path counters.
+
+        Returns:
+            dict: Replies served from the pools, fallthroughs to the LLM and pool state
+        """
+        return {
+            **self.stats,
+            "pool_sizes": {intent: len(replies) for intent, replies in self.pools.items()},
+            "last_refresh": self.last_refresh
+        }
@@ -1,12 +1,175 @@
+import asyncio
+import json
+import os
+import threading
+from datetime import datetime
 from .base_agent import BaseAgent
+from .llm_scheduler import PRIORITY_INTERACTIVE
+from .local_intent_model import LocalIntentModel
 
 class IntentClassifierAgent(BaseAgent):
     """Agent responsible for classifying the intent of user messages."""
     
+    # Classifications and greeting replies for identical text are stable
+    cache_ttl = 24 * 3600
+    
+    # Gates every reply, so it always runs ahead of panel work
+    llm_priority = PRIORITY_INTERACTIVE
+    
+    # Keyword rules applied before and after the LLM
+    GREETINGS = ["hello", "hi", "hey", "greetings", "good morning", "good afternoon", "good evening"]
+    FAREWELLS = ["bye", "goodbye", "farewell", "see you", "thanks", "thank you"]
+    VAGUE_ISSUES = ["i have an issue", "i have a issue", "i have a problem", "i have problem",
+                    "got an issue", "having an issue", "need help", "help me"]
+    
+    # Phrases that indicate a concrete problem description
+    ISSUE_MARKERS = ["error", "failed", "doesn't work", "cannot", "can't", "issue with", "problem with", "bug"]
+    
     def __init__(self):
         super().__init__("Intent Classifier Agent")
+        
+        # Local model answers confident cases; everything else goes to the LLM
+        self.model_path = os.environ.get("INTENT_MODEL_PATH", "data/intent_model.npz")
+        self.confidence_threshold = float(os.environ.get("INTENT_MODEL_THRESHOLD", "0.85"))
+        self.log_path = os.environ.get("INTENT_LOG_PATH", "data/intent_classifications.jsonl")
+        self._log_lock = threading.Lock()
+        self.local_model = None
+        self.stats = {"rules": 0, "local": 0, "llm": 0}
+        self.load_local_model()
+    
+    def load_local_model(self, path=None):
+        """
+        Load (or reload) the trained local classifier.
+        
+        Args:
+            path (str, optional): Model file, defaults to INTENT_MODEL_PATH
+            
+        Returns:
+            bool: True if a model is loaded
+        """
+        path = path or self.model_path
+        if not path or not os.path.exists(path):
+            print(f"[AGENT] {self.name} has no local model at {path}, using the LLM for every message")
+            return False
+        try:
+            self.local_model = LocalIntentModel.load(path)
+            print(f"[AGENT] {self.name} loaded local model from {path} (threshold {self.confidence_threshold})")
+            return True
+        except Exception as e:
+            print(f"[AGENT] {self.name} error loading local model: {str(e)}")
+            return False
     
-    def classify_intent(self, message):
+    def classify_locally(self, message):
+        """
+        Classify with the local model when it is confident enough.
+        
+        Args:
+            message (str): The user's message
+            
+        Returns:
+            dict: Classification results, or None to escalate to the LLM
+        """
+        if self.local_model is None:
+            return None
+        intent, confidence = self.local_model.predict(message)
+        if confidence < self.confidence_threshold:
+            print(f"[AGENT] {self.name} local model unsure ({intent}, {confidence:.2f}), escalating to LLM")
+            return None
+        self.stats["local"] += 1
+        print(f"[AGENT] {self.name} local classification: {intent}, confidence: {confidence:.2f}")
+        return {
+            "intent": intent,
+            "confidence": round(confidence, 2),
+            "is_question": "?" in message,
+            "reasoning": "Local intent model",
+            "source": "local"
+        }
+    
+    async def log_classification(self, message, classification):
+        """
+        Append an LLM classification to the training log for the local model.
+        
+        The file is written in a worker thread, so the event loop never waits for the disk.
+        
+        Args:
+            message (str): The user's message
+            classification (dict): The LLM's classification
+        """
+        if not self.log_path:
+            return
+        entry = {
+            "message": message,
+            "intent": classification.get("intent"),
+            "confidence": classification.get("confidence"),
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        try:
+            await asyncio.to_thread(self._append_log, json.dumps(entry) + "\n")
+        except Exception as e:
+            print(f"[AGENT] {self.name} error logging classification: {str(e)}")
+    
+    def _append_log(self, line):
+        with self._log_lock:
+            directory = os.path.dirname(self.log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line)
+    
+    @classmethod
+    def rule_examples(cls):
+        """
+        Build labelled examples from the keyword rules for training the local model.
+        
+        Returns:
+            tuple: (texts, labels)
+        """
+        texts, labels = [], []
+        for greeting in cls.GREETINGS:
+            for variant in (greeting, greeting + "!", greeting.capitalize()):
+                texts.append(variant)
+                labels.append("greeting")
+        for farewell in cls.FAREWELLS:
+            for variant in (farewell, farewell + "!", f"ok {farewell}"):
+                texts.append(variant)
+                labels.append("farewell")
+        for vague in cls.VAGUE_ISSUES:
+            for variant in (vague, vague.capitalize() + "."):
+                texts.append(variant)
+                labels.append("casual")
+        return texts, labels
+    
+    def get_classifier_stats(self):
+        """
+        Get counts of which stage answered each classification.
+        
+        Returns:
+            dict: Rule, local model and LLM answer counts plus the LLM escalation rate
+        """
+        total = sum(self.stats.values())
+        return {
+            "local_model_loaded": self.local_model is not None,
+            "confidence_threshold": self.confidence_threshold,
+            "answered_by": dict(self.stats),
+            "llm_rate": round(self.stats["llm"] / total, 4) if total else 0.0
+        }
+    
+    def looks_like_issue(self, message):
+        """
+        Cheap pre-check, without the LLM, for messages likely to be classified as issues.
+        
+        Args:
+            message (str): The user's message
+            
+        Returns:
+            bool: True if the message is long enough and mentions a concrete problem
+        """
+        if not message or not isinstance(message, str):
+            return False
+        message_lower = message.lower().strip()
+        return len(message_lower) > 30 and any(marker in message_lower for marker in self.ISSUE_MARKERS)
+    
+    async def classify_intent(self, message):
         """
         Classify the intent of a user message to determine if it requires agent processing.
         
@@ -28,19 +191,27 @@ class IntentClassifierAgent(BaseAgent):
         # Check for very short or vague issue mentions
         if message_lower in ["i have an issue", "i have a issue", "i have a problem", "i have problem", "help me"]:
             print(f"[AGENT] {self.name} detected vague issue mention")
+            self.stats["rules"] += 1
             return {"intent": "casual", "confidence": 0.9, "is_question": False, "reasoning": "Vague mention of an issue without specific details"}
             
         # Check for common greetings
-        common_greetings = ["hello", "hi", "hey", "greetings", "good morning", "good afternoon", "good evening"]
+        common_greetings = self.GREETINGS
         if any(message_lower == greeting or message_lower == greeting + "!" for greeting in common_greetings):
+            self.stats["rules"] += 1
             return {"intent": "greeting", "confidence": 0.95, "is_question": False, "reasoning": "Simple greeting detected"}
             
         # Check for common farewells
-        common_farewells = ["bye", "goodbye", "farewell", "see you", "thanks", "thank you"]
+        common_farewells = self.FAREWELLS
         if any(farewell in message_lower for farewell in common_farewells) and len(message_lower.split()) <= 5:
+            self.stats["rules"] += 1
             return {"intent": "farewell", "confidence": 0.8, "is_question": False, "reasoning": "Farewell detected"}
         
-        # Use LLM classification for more complex messages
+        # Use the local model, then LLM classification for more complex messages
+        local_classification = self.classify_locally(message)
+        if local_classification is not None:
+            return local_classification
+        self.stats["llm"] += 1
+        
         prompt = f"""
         Carefully analyze this customer support message and classify it into one of these categories:
 
@@ -82,10 +253,11 @@ class IntentClassifierAgent(BaseAgent):
         """
         
         try:
-            response = self.query_llm(prompt)
+            # Cached and shared answers were logged when they were generated
+            generated = []
+            response = await self.query_llm_async(prompt, on_generated=generated.append)
             
             try:
-                import json
                 # Find JSON block in the response if there's extra text
                 start = response.find('{')
                 end = response.rfind('}') + 1
@@ -102,7 +274,7 @@ class IntentClassifierAgent(BaseAgent):
                         classification["is_question"] = False
                     
                     # Safety check for common greetings to avoid misclassification
-                    simple_greetings = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening", "greetings"]
+                    simple_greetings = self.GREETINGS
                     if message.lower().strip() in simple_greetings or message.lower().strip() in [g + "!" for g in simple_greetings]:
                         if classification["intent"] != "greeting":
                             print(f"[AGENT] {self.name} correcting misclassification of simple greeting")
@@ -111,8 +283,7 @@ class IntentClassifierAgent(BaseAgent):
                             classification["reasoning"] = "Simple greeting detected with no other content"
                     
                     # Safety check for vague issue mentions
-                    vague_issues = ["i have an issue", "i have a issue", "i have a problem", "i have problem", 
-                                   "got an issue", "having an issue", "need help", "help me"]
+                    vague_issues = self.VAGUE_ISSUES
                     if message.lower().strip() in vague_issues:
                         if classification["intent"] != "casual":
                             print(f"[AGENT] {self.name} correcting misclassification of vague issue mention")
@@ -124,6 +295,8 @@ class IntentClassifierAgent(BaseAgent):
                     reasoning = classification.get("reasoning", "No reasoning provided")
                     print(f"[AGENT] {self.name} classification: {classification['intent']}, confidence: {classification['confidence']}")
                     print(f"[AGENT] {self.name} reasoning: {reasoning}")
+                    if generated:
+                        await self.log_classification(message, classification)
                         
                     return classification
                         
@@ -137,27 +310,25 @@ class IntentClassifierAgent(BaseAgent):
             message_lower = message.lower().strip()
             
             # Check for very short or vague issue mentions
-            vague_issues = ["i have an issue", "i have a issue", "i have a problem", "i have problem", 
-                           "got an issue", "having an issue", "need help", "help me"]
+            vague_issues = self.VAGUE_ISSUES
             if message_lower in vague_issues or (len(message_lower) < 30 and ("issue" in message_lower or "problem" in message_lower)):
                 return {"intent": "casual", "confidence": 0.9, "is_question": False, "reasoning": "Vague mention of an issue without specific details"}
             
             # Check for common greetings
-            common_greetings = ["hello", "hi", "hey", "greetings", "good morning", "good afternoon", "good evening"]
+            common_greetings = self.GREETINGS
             if any(message_lower == greeting or message_lower == greeting + "!" for greeting in common_greetings):
                 return {"intent": "greeting", "confidence": 0.95, "is_question": False, "reasoning": "Simple greeting detected"}
                 
             # Check for common farewells
-            common_farewells = ["bye", "goodbye", "farewell", "see you", "thanks", "thank you"]
+            common_farewells = self.FAREWELLS
             if any(farewell in message_lower for farewell in common_farewells) and len(message_lower.split()) <= 5:
                 return {"intent": "farewell", "confidence": 0.8, "is_question": False, "reasoning": "Farewell detected"}
                 
             # Check for question marks and specific issue markers
             has_question = "?" in message
-            has_specific_details = any(marker in message_lower for marker in ["error", "failed", "doesn't work", "cannot", "can't", "issue with", "problem with", "bug"])
             
             # For messages to be classified as issues, require more evidence of specificity
-            if has_specific_details and len(message_lower) > 30:
+            if self.looks_like_issue(message):
                 return {"intent": "issue", "confidence": 0.7, "is_question": has_question, "reasoning": "Contains specific issue details"}
             else:
                 return {"intent": "casual", "confidence": 0.6, "is_question": has_question, "reasoning": "General conversation or vague issue mention"}
@@ -167,23 +338,26 @@ class IntentClassifierAgent(BaseAgent):
             # In case of any error, default to a conservative classification
             return {"intent": "casual", "confidence": 0.3, "is_question": "?" in message}
     
-    def generate_casual_response(self, message, conversation_history):
+    async def generate_casual_response(self, message, conversation_history, on_delta=None, classification=None):
         """
         Generate a casual response to greeting or farewell messages.
         
         Args:
             message (str): The user's message
-            conversation_history (list): Previous conversation messages
+            conversation_history (ConversationTranscript): Previous conversation messages
+            on_delta (callable, optional): Coroutine function receiving streamed text chunks
+            classification (dict, optional): Result of classify_intent for this message;
+                the message is only classified again when it is not given
             
         Returns:
             str: A casual response appropriate for the message intent
         """
-        # First classify the message to determine its intent
-        classification = self.classify_intent(message)
+        if classification is None:
+            classification = await self.classify_intent(message)
         intent = classification.get("intent", "unknown")
         
         # Format a short conversation history for context
-        recent_messages = conversation_history[-3:] if len(conversation_history) > 3 else conversation_history
+        recent_messages = conversation_history.last(3)
         context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in recent_messages])
         
         prompt = f"""
@@ -206,7 +380,7 @@ class IntentClassifierAgent(BaseAgent):
         """
         
         try:
-            response = self.query_llm(prompt)
+            response = await self.query_llm_async(prompt, on_delta=on_delta)
             return response.strip()
         except Exception as e:
             print(f"[AGENT] {self.name} error generating casual response: {str(e)}")
@@ -219,20 +393,21 @@ class IntentClassifierAgent(BaseAgent):
             else:
                 return "Is there something specific I can help you with today?"
     
-    def generate_probing_response(self, message, conversation_history):
+    async def generate_probing_response(self, message, conversation_history, on_delta=None):
         """
         Generate a response for casual conversations or vague problem mentions,
         probing for more specific details.
         
         Args:
             message (str): The user's message
-            conversation_history (list): Previous conversation messages
+            conversation_history (ConversationTranscript): Previous conversation messages
+            on_delta (callable, optional): Coroutine function receiving streamed text chunks
             
         Returns:
             str: A response that probes for more specific details
         """
         # Format a short conversation history for context
-        recent_messages = conversation_history[-3:] if len(conversation_history) > 3 else conversation_history
+        recent_messages = conversation_history.last(3)
         context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in recent_messages])
         
         prompt = f"""
@@ -254,7 +429,7 @@ class IntentClassifierAgent(BaseAgent):
         """
         
         try:
-            response = self.query_llm(prompt)
+            response = await self.query_llm_async(prompt, on_delta=on_delta)
             return response.strip()
         except Exception as e:
             print(f"[AGENT] {self.name} error generating probing response: {str(e)}")
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from utils.lru_cache import LRUCache
+
+
+class LLMCache:
+    """Prompt/response cache for agent LLM calls with an in-memory LRU tier and an optional SQLite tier."""
+
+    # Shared instance used by BaseAgent
+    _shared = None
+
+    def __init__(self, max_entries=None, max_bytes=None, db_path=None):
+        """
+        Initialize the cache. Every setting falls back to an environment variable.
+
+        Args:
+            max_entries (int, optional): In-memory entry limit (LLM_CACHE_MAX_ENTRIES)
+            max_bytes (int, optional): In-memory size limit in characters (LLM_CACHE_MAX_BYTES)
+            db_path (str, optional): SQLite file for the persistent tier (LLM_CACHE_PATH);
+                the disk tier is disabled when unset
+        """
+        self.enabled = os.environ.get("LLM_CACHE_ENABLED", "true").lower() != "false"
+        self.memory = LRUCache(
+            max_entries=max_entries or int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "2048")),
+            max_bytes=max_bytes or int(os.environ.get("LLM_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+        )
+        self.db_path = db_path or os.environ.get("LLM_CACHE_PATH")
+        self._db = None
+        self._db_lock = threading.Lock()
+        self.disk_hits = 0
+        self.disk_misses = 0
+
+        if self.db_path:
+            try:
+                self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL)"
+                )
+                self._db.commit()
+                print(f"[LLM] Persistent response cache enabled at {self.db_path}")
+            except Exception as e:
+                print(f"[LLM] Error opening response cache database: {str(e)}")
+                self._db = None
+
+    @classmethod
+    def get_shared(cls):
+        """Return the process-wide cache, creating it on first use."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @staticmethod
+    def make_key(model, prompt):
+        """
+        Build a cache key from the model and a whitespace-normalized prompt.
+
+        Args:
+            model (str): Model name
+            prompt (str): Full prompt text
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        normalized = re.sub(r"\s+", " ", prompt).strip()
+        return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a response, promoting disk hits into memory.
+
+        Blocks on the disk tier; use get_async() on the event loop.
+
+        Args:
+            key (str): Key from make_key()
+
+        Returns:
+            str: The cached response or None
+        """
+        value = self.memory.get(key)
+        if value is not None or self._db is None:
+            return value
+        return self._get_disk(key)
+
+    async def get_async(self, key):
+        """
+        Look up a response like get(), reading the disk tier in a worker thread.
+
+        Args:
+            key (str): Key from make_key()
+
+        Returns:
+            str: The cached response or None
+        """
+        value = self.memory.get(key)
+        if value is not None or self._db is None:
+            return value
+        return await asyncio.to_thread(self._get_disk, key)
+
+    def _get_disk(self, key):
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT response, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] is not None and row[1] <= time.time():
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+
+        if row is None:
+            self.disk_misses += 1
+            return None
+
+        self.disk_hits += 1
+        remaining = row[1] - time.time() if row[1] is not None else None
+        self.memory.set(key, row[0], ttl=remaining)
+        return row[0]
+
+    def set(self, key, response, ttl=None):
+        """
+        Store a response in both tiers.
+
+        Blocks on the disk tier; use set_async() on the event loop.
+
+        Args:
+            key (str): Key from make_key()
+            response (str): The model's response
+            ttl (float, optional): Seconds until the entry expires; None never expires
+        """
+        self.memory.set(key, response, ttl=ttl)
+        if self._db is not None:
+            self._set_disk(key, response, ttl)
+
+    async def set_async(self, key, response, ttl=None):
+        """
+        Store a response like set(), writing the disk tier in a worker thread.
+
+        Args:
+            key (str): Key from make_key()
+            response (str): The model's response
+            ttl (float, optional): Seconds until the entry expires; None never expires
+        """
+        self.memory.set(key, response, ttl=ttl)
+        if self._db is not None:
+            await asyncio.to_thread(self._set_disk, key, response, ttl)
+
+    def _set_disk(self, key, response, ttl):
+        expires_at = time.time() + ttl if ttl else None
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, expires_at) VALUES (?, ?, ?)",
+                    (key, response, expires_at)
+                )
+                self._db.commit()
+        except Exception as e:
+            print(f"[LLM] Error writing response cache: {str(e)}")
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        self.memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def get_stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Memory tier stats plus disk tier hit/miss counts
+        """
+        stats = self.memory.get_stats()
+        stats["enabled"] = self.enabled
+        stats["disk"] = {
+            "enabled": self._db is not None,
+            "hits": self.disk_hits,
+            "misses": self.disk_misses
+        }
+        return stats
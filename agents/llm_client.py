@@ -0,0 +1,203 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+
+class LLMError(Exception):
+    """Raised when the LLM endpoint fails after all retry attempts."""
+
+
+class LLMClient:
+    """Connection-pooled client for the Ollama generate API, shared by all agents."""
+
+    # Shared instance used by BaseAgent
+    _shared = None
+
+    def __init__(self, url=None, timeout=None, connect_timeout=None,
+                 max_connections=None, max_keepalive_connections=None, keepalive_expiry=None):
+        """
+        Initialize the client. Every setting falls back to an environment variable.
+
+        Args:
+            url (str, optional): Ollama generate endpoint (OLLAMA_URL)
+            timeout (float, optional): Read/write/pool timeout in seconds (LLM_TIMEOUT)
+            connect_timeout (float, optional): Connect timeout in seconds (LLM_CONNECT_TIMEOUT)
+            max_connections (int, optional): Maximum open connections (LLM_MAX_CONNECTIONS)
+            max_keepalive_connections (int, optional): Idle connections kept alive (LLM_MAX_KEEPALIVE)
+            keepalive_expiry (float, optional): Seconds an idle connection is kept (LLM_KEEPALIVE_EXPIRY)
+        """
+        self.url = url or os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate")
+        self.timeout = httpx.Timeout(
+            timeout if timeout is not None else float(os.environ.get("LLM_TIMEOUT", "120")),
+            connect=connect_timeout if connect_timeout is not None else float(os.environ.get("LLM_CONNECT_TIMEOUT", "5"))
+        )
+        self.limits = httpx.Limits(
+            max_connections=max_connections or int(os.environ.get("LLM_MAX_CONNECTIONS", "32")),
+            max_keepalive_connections=max_keepalive_connections or int(os.environ.get("LLM_MAX_KEEPALIVE", "16")),
+            keepalive_expiry=keepalive_expiry if keepalive_expiry is not None else float(os.environ.get("LLM_KEEPALIVE_EXPIRY", "60"))
+        )
+        self._async_client = None
+        self._async_loop = None
+        self._sync_client = None
+
+    @classmethod
+    def get_shared(cls):
+        """Return the process-wide client, creating it on first use."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def _get_async_client(self):
+        """Return the pooled async client bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            # Pools cannot be shared across event loops (e.g. repeated asyncio.run in scripts)
+            self._async_client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            self._async_loop = loop
+        return self._async_client
+
+    def _get_sync_client(self):
+        """Return the pooled blocking client."""
+        if self._sync_client is None:
+            self._sync_client = httpx.Client(timeout=self.timeout, limits=self.limits)
+        return self._sync_client
+
+    @staticmethod
+    def _build_payload(model, prompt, stream=False):
+        return {"model": model, "prompt": prompt, "stream": stream}
+
+    @staticmethod
+    def _backoff(retry_delay, attempt):
+        """Exponential backoff delay for the given zero-based attempt."""
+        return retry_delay * (2 ** attempt)
+
+    async def generate(self, model, prompt, max_retries=3, retry_delay=1, label="LLM"):
+        """
+        Generate a completion without blocking the event loop.
+
+        Args:
+            model (str): Model name
+            prompt (str): Full prompt text
+            max_retries (int): Maximum number of attempts
+            retry_delay (float): Base delay for exponential backoff in seconds
+            label (str): Caller name used in log lines
+
+        Returns:
+            str: The model's response
+
+        Raises:
+            LLMError: If every attempt fails
+        """
+        client = self._get_async_client()
+        payload = self._build_payload(model, prompt)
+
+        for attempt in range(max_retries):
+            try:
+                print(f"[LLM] {label} query attempt {attempt+1}/{max_retries}")
+                response = await client.post(self.url, json=payload)
+                response.raise_for_status()
+                return response.json().get("response", "")
+            except Exception as e:
+                print(f"[LLM] {label} query error: {str(e)}")
+                if attempt == max_retries - 1:
+                    raise LLMError(str(e)) from e
+                delay = self._backoff(retry_delay, attempt)
+                print(f"[LLM] {label} retrying in {delay} seconds...")
+                await asyncio.sleep(delay)
+
+    async def stream(self, model, prompt, max_retries=3, retry_delay=1, label="LLM"):
+        """
+        Stream a completion token by token from Ollama's NDJSON response.
+
+        Failed attempts are retried only until the first token has been yielded;
+        after that a failure is raised so callers never see duplicated text.
+
+        Args:
+            model (str): Model name
+            prompt (str): Full prompt text
+            max_retries (int): Maximum number of attempts
+            retry_delay (float): Base delay for exponential backoff in seconds
+            label (str): Caller name used in log lines
+
+        Yields:
+            str: Partial response text as it is generated
+
+        Raises:
+            LLMError: If the stream fails
+        """
+        client = self._get_async_client()
+        payload = self._build_payload(model, prompt, stream=True)
+
+        for attempt in range(max_retries):
+            emitted = False
+            try:
+                print(f"[LLM] {label} streaming attempt {attempt+1}/{max_retries}")
+                async with client.stream("POST", self.url, json=payload) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            raise LLMError(chunk["error"])
+                        text = chunk.get("response", "")
+                        if text:
+                            emitted = True
+                            yield text
+                        if chunk.get("done"):
+                            return
+                return
+            except Exception as e:
+                print(f"[LLM] {label} streaming error: {str(e)}")
+                if emitted or attempt == max_retries - 1:
+                    raise LLMError(str(e)) from e
+                delay = self._backoff(retry_delay, attempt)
+                print(f"[LLM] {label} retrying in {delay} seconds...")
+                await asyncio.sleep(delay)
+
+    def generate_sync(self, model, prompt, max_retries=3, retry_delay=1, label="LLM"):
+        """
+        Blocking variant of generate() for scripts and offline tools.
+
+        Args:
+            model (str): Model name
+            prompt (str): Full prompt text
+            max_retries (int): Maximum number of attempts
+            retry_delay (float): Base delay for exponential backoff in seconds
+            label (str): Caller name used in log lines
+
+        Returns:
+            str: The model's response
+
+        Raises:
+            LLMError: If every attempt fails
+        """
+        client = self._get_sync_client()
+        payload = self._build_payload(model, prompt)
+
+        for attempt in range(max_retries):
+            try:
+                print(f"[LLM] {label} query attempt {attempt+1}/{max_retries}")
+                response = client.post(self.url, json=payload)
+                response.raise_for_status()
+                return response.json().get("response", "")
+            except Exception as e:
+                print(f"[LLM] {label} query error: {str(e)}")
+                if attempt == max_retries - 1:
+                    raise LLMError(str(e)) from e
+                delay = self._backoff(retry_delay, attempt)
+                print(f"[LLM] {label} retrying in {delay} seconds...")
+                time.sleep(delay)
+
+    async def aclose(self):
+        """Close pooled connections."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
@@ -0,0 +1,171 @@
+import asyncio
+import bisect
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+
+# Priority classes, lower runs first
+PRIORITY_INTERACTIVE = 0  # intent classification and chat replies gating the user
+PRIORITY_PANEL = 1        # insight panel agents
+PRIORITY_OFFLINE = 2      # evaluation and optimization helpers
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_PANEL: "panel",
+    PRIORITY_OFFLINE: "offline"
+}
+
+
+class LLMScheduler:
+    """Admits LLM calls by priority under a global concurrency limit and per-agent caps."""
+
+    # Shared instance used by BaseAgent
+    _shared = None
+
+    def __init__(self, max_concurrency=None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_concurrency (int, optional): Calls allowed in flight at once (LLM_MAX_CONCURRENCY)
+        """
+        self.max_concurrency = max_concurrency or int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+        self.agent_limits = {}
+        self._active = 0
+        self._active_by_agent = {}
+        self._waiters = []  # sorted [priority, seq, agent, future, enqueued_at]
+        self._seq = itertools.count()
+        self._wait_stats = {
+            name: {"granted": 0, "queued": 0, "total_wait": 0.0, "max_wait": 0.0, "max_depth": 0}
+            for name in PRIORITY_NAMES.values()
+        }
+
+    @classmethod
+    def get_shared(cls):
+        """Return the process-wide scheduler, creating it on first use."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def set_agent_limit(self, agent, limit):
+        """
+        Cap how many calls an agent may have in flight.
+
+        Args:
+            agent (str): Agent name
+            limit (int): Maximum concurrent calls, or None for no cap
+        """
+        if limit:
+            self.agent_limits[agent] = limit
+        else:
+            self.agent_limits.pop(agent, None)
+
+    def _can_run(self, agent):
+        if self._active >= self.max_concurrency:
+            return False
+        limit = self.agent_limits.get(agent)
+        return limit is None or self._active_by_agent.get(agent, 0) < limit
+
+    def _grant(self, agent, priority, waited):
+        self._active += 1
+        self._active_by_agent[agent] = self._active_by_agent.get(agent, 0) + 1
+        stats = self._wait_stats[PRIORITY_NAMES[priority]]
+        stats["granted"] += 1
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+
+    def _dispatch(self):
+        """Hand free slots to the best waiting calls whose agent is under its cap."""
+        index = 0
+        while index < len(self._waiters) and self._active < self.max_concurrency:
+            priority, _, agent, future, enqueued_at = self._waiters[index]
+            if future.done():
+                self._waiters.pop(index)
+            elif self._can_run(agent):
+                self._waiters.pop(index)
+                self._grant(agent, priority, time.monotonic() - enqueued_at)
+                future.set_result(True)
+            else:
+                index += 1
+
+    async def acquire(self, agent, priority=PRIORITY_PANEL):
+        """
+        Wait for a slot.
+
+        Args:
+            agent (str): Agent name, used for its concurrency cap
+            priority (int): One of the PRIORITY_* classes
+        """
+        # Waiters left in the queue are all blocked by a cap, so a runnable call can go now
+        if self._can_run(agent):
+            self._grant(agent, priority, 0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), agent, future, time.monotonic()]
+        bisect.insort(self._waiters, entry)
+        stats = self._wait_stats[PRIORITY_NAMES[priority]]
+        stats["queued"] += 1
+        stats["max_depth"] = max(stats["max_depth"], self._queue_depth(priority))
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just before cancellation; hand it back
+                self.release(agent)
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+            raise
+
+    def release(self, agent):
+        """
+        Return a slot taken by acquire().
+
+        Args:
+            agent (str): Agent name passed to acquire()
+        """
+        self._active -= 1
+        self._active_by_agent[agent] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, agent, priority=PRIORITY_PANEL):
+        """Hold a slot for the duration of an LLM call."""
+        await self.acquire(agent, priority)
+        try:
+            yield
+        finally:
+            self.release(agent)
+
+    def _queue_depth(self, priority):
+        return sum(1 for entry in self._waiters if entry[0] == priority and not entry[3].done())
+
+    def get_stats(self):
+        """
+        Get scheduler metrics.
+
+        Returns:
+            dict: Slot usage, per-agent load and per-priority queue depth and wait times
+        """
+        priorities = {}
+        for priority, name in PRIORITY_NAMES.items():
+            stats = self._wait_stats[name]
+            priorities[name] = {
+                "queue_depth": self._queue_depth(priority),
+                "max_queue_depth": stats["max_depth"],
+                "granted": stats["granted"],
+                "queued": stats["queued"],
+                "avg_wait_ms": round(stats["total_wait"] / stats["granted"] * 1000, 1) if stats["granted"] else 0.0,
+                "max_wait_ms": round(stats["max_wait"] * 1000, 1)
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "agents": {
+                agent: {"active": self._active_by_agent.get(agent, 0), "limit": self.agent_limits.get(agent)}
+                for agent in sorted(set(self._active_by_agent) | set(self.agent_limits))
+            },
+            "priorities": priorities
+        }
@@ -0,0 +1,111 @@
+import asyncio
+
+
+class SingleFlight:
+    """Coalesces concurrent identical LLM requests so they share one in-flight generation."""
+
+    # Shared instance used by BaseAgent
+    _shared = None
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.executed = 0
+        self.deduplicated = 0
+
+    @classmethod
+    def get_shared(cls):
+        """Return the process-wide instance, creating it on first use."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    async def do(self, key, func, on_delta=None):
+        """
+        Run func once per key no matter how many callers ask for it concurrently.
+
+        The first caller starts func; later callers with the same key await the
+        same task. Streamed text is fanned out to every caller's on_delta, and
+        callers that join late first receive the text produced so far. The shared
+        task is cancelled only when every caller waiting on it has been cancelled.
+
+        Args:
+            key (str): Request identity, e.g. a hash of model and prompt
+            func (callable): Coroutine function taking an emit(delta) coroutine
+                function and returning the final text
+            on_delta (callable, optional): Coroutine function receiving text chunks
+
+        Returns:
+            str: The shared result
+        """
+        self.calls += 1
+        entry = self._inflight.get(key)
+
+        if entry is None:
+            entry = {"task": None, "listeners": [], "text": "", "waiters": 0}
+
+            async def emit(delta):
+                entry["text"] += delta
+                for listener in list(entry["listeners"]):
+                    try:
+                        await listener(delta)
+                    except Exception as e:
+                        # One broken consumer must not stop the generation for the others
+                        print(f"[LLM] Dropping stream listener after error: {str(e)}")
+                        entry["listeners"].remove(listener)
+
+            entry["task"] = asyncio.ensure_future(func(emit))
+            entry["task"].add_done_callback(lambda _: self._forget(key, entry))
+            self._inflight[key] = entry
+            self.executed += 1
+        else:
+            self.deduplicated += 1
+            print(f"[LLM] Joining in-flight request ({entry['waiters']} caller(s) already waiting)")
+
+        task = entry["task"]
+        entry["waiters"] += 1
+        listener = None
+        if on_delta is not None:
+            # Serialize catch-up text and live deltas so the caller sees them in order
+            lock = asyncio.Lock()
+
+            async def listener(delta):
+                async with lock:
+                    await on_delta(delta)
+
+            entry["listeners"].append(listener)
+
+        try:
+            if listener is not None and entry["text"]:
+                await listener(entry["text"])
+            result = await asyncio.shield(task)
+        finally:
+            entry["waiters"] -= 1
+            if listener in entry["listeners"]:
+                entry["listeners"].remove(listener)
+            if entry["waiters"] == 0 and not task.done():
+                task.cancel()
+
+        # Deliver whatever was not streamed, e.g. when the leader did not stream
+        if on_delta is not None and result.startswith(entry["text"]) and len(result) > len(entry["text"]):
+            await on_delta(result[len(entry["text"]):])
+        return result
+
+    def _forget(self, key, entry):
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    def get_stats(self):
+        """
+        Get coalescing counters.
+
+        Returns:
+            dict: Total calls, generations actually executed and deduplicated calls
+        """
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "deduplicated": self.deduplicated,
+            "dedup_ratio": round(self.deduplicated / self.calls, 4) if self.calls else 0.0,
+            "in_flight": len(self._inflight)
+        }
@@ -0,0 +1,285 @@
+import json
+import os
+import re
+import zlib
+
+import numpy as np
+
+# Intent labels in model output order
+INTENT_LABELS = ["issue", "greeting", "casual", "farewell", "unknown"]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+|[?!]")
+
+
+class LocalIntentModel:
+    """Multinomial logistic regression over hashed word and character n-grams, trained and run with NumPy."""
+
+    def __init__(self, n_features=2 ** 14, labels=None):
+        """
+        Initialize an untrained model.
+
+        Args:
+            n_features (int): Number of hash buckets
+            labels (list, optional): Class labels, defaults to INTENT_LABELS
+        """
+        self.n_features = n_features
+        self.labels = list(labels or INTENT_LABELS)
+        self.weights = np.zeros((n_features, len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+        self.trained = False
+
+    def _bucket(self, feature):
+        # crc32 is stable across processes, unlike the built-in hash()
+        return zlib.crc32(feature.encode("utf-8")) % self.n_features
+
+    def featurize(self, text):
+        """
+        Turn a message into a sparse, L2-normalized feature vector.
+
+        Uses word unigrams and bigrams plus character trigrams of each word, so
+        typos and inflections ("crashes", "crashed") still share features.
+
+        Args:
+            text (str): The message
+
+        Returns:
+            tuple: (indices, values) numpy arrays
+        """
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        features = [f"w:{token}" for token in tokens]
+        features += [f"b:{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for token in tokens:
+            padded = f"<{token}>"
+            features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        # Message length matters for the specificity rules the LLM was told to follow
+        features.append(f"len:{min(len(tokens) // 5, 6)}")
+
+        counts = {}
+        for feature in features:
+            index = self._bucket(feature)
+            counts[index] = counts.get(index, 0) + 1
+
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        norm = np.linalg.norm(values)
+        if norm > 0:
+            values /= norm
+        return indices, values
+
+    def featurize_all(self, texts):
+        """
+        Featurize many messages into one sparse matrix, without a dense row per message.
+
+        Args:
+            texts (list): Messages
+
+        Returns:
+            tuple: (indptr, indices, values) numpy arrays in CSR layout: the
+                features of message i are indices/values[indptr[i]:indptr[i + 1]]
+        """
+        indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        all_indices, all_values = [], []
+        for row, text in enumerate(texts):
+            indices, values = self.featurize(text)
+            all_indices.append(indices.astype(np.int32))
+            all_values.append(values)
+            indptr[row + 1] = indptr[row] + len(indices)
+        return indptr, np.concatenate(all_indices), np.concatenate(all_values)
+
+    @staticmethod
+    def _batch(features, rows):
+        # Gather the features of some messages: (start of each message, message of each
+        # value, feature indices, values)
+        indptr, indices, values = features
+        starts = indptr[rows]
+        lengths = indptr[rows + 1] - starts
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.arange(lengths.sum()) - np.repeat(offsets, lengths) + np.repeat(starts, lengths)
+        return offsets, np.repeat(np.arange(len(rows)), lengths), indices[positions], values[positions]
+
+    @staticmethod
+    def _softmax(logits):
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def predict_proba(self, text):
+        """
+        Get class probabilities for a message.
+
+        Args:
+            text (str): The message
+
+        Returns:
+            numpy.ndarray: Probability per label, in self.labels order
+        """
+        indices, values = self.featurize(text)
+        logits = values @ self.weights[indices] + self.bias
+        return self._softmax(logits)
+
+    def predict(self, text):
+        """
+        Classify a message.
+
+        Args:
+            text (str): The message
+
+        Returns:
+            tuple: (label, confidence)
+        """
+        probabilities = self.predict_proba(text)
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(probabilities[best])
+
+    def fit(self, texts, labels, epochs=40, learning_rate=1.0, l2=1e-4, batch_size=256, seed=0):
+        """
+        Train with mini-batch gradient descent on the cross-entropy loss.
+
+        Args:
+            texts (list): Training messages
+            labels (list): Intent label for each message
+            epochs (int): Passes over the data
+            learning_rate (float): Step size
+            l2 (float): Weight decay
+            batch_size (int): Examples per gradient step
+            seed (int): Shuffle seed
+
+        Returns:
+            float: Mean training loss of the final epoch
+        """
+        if not texts:
+            raise ValueError("No training examples")
+
+        targets = np.array([self.labels.index(label) for label in labels])
+        # Sparse, so memory grows with the features used rather than n_features per example
+        features = self.featurize_all(texts)
+        one_hot = np.eye(len(self.labels), dtype=np.float32)[targets]
+        rng = np.random.default_rng(seed)
+        loss = 0.0
+
+        for _ in range(epochs):
+            order = rng.permutation(len(texts))
+            losses = []
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                offsets, example, indices, values = self._batch(features, batch)
+                # Every message has at least its length feature, so no segment is empty
+                logits = np.add.reduceat(values[:, None] * self.weights[indices], offsets, axis=0)
+                probabilities = self._softmax(logits + self.bias)
+                losses.append(-np.log(probabilities[np.arange(len(batch)), targets[batch]] + 1e-9).mean())
+                error = (probabilities - one_hot[batch]) / len(batch)
+                gradient = l2 * self.weights
+                np.add.at(gradient, indices, values[:, None] * error[example])
+                self.weights -= learning_rate * gradient
+                self.bias -= learning_rate * error.sum(axis=0)
+            loss = float(np.mean(losses))
+
+        self.trained = True
+        return loss
+
+    def evaluate(self, texts, labels, threshold=None):
+        """
+        Compare predictions with reference labels.
+
+        Args:
+            texts (list): Messages
+            labels (list): Reference labels, e.g. from the LLM
+            threshold (float, optional): Confidence below which a prediction
+                would be escalated; adds coverage and accuracy of the accepted part
+
+        Returns:
+            dict: Overall accuracy, per-label recall and a confusion matrix
+        """
+        confusion = {actual: {predicted: 0 for predicted in self.labels} for actual in self.labels}
+        correct = 0
+        accepted = 0
+        accepted_correct = 0
+
+        for text, actual in zip(texts, labels):
+            predicted, confidence = self.predict(text)
+            confusion[actual][predicted] += 1
+            correct += predicted == actual
+            if threshold is not None and confidence >= threshold:
+                accepted += 1
+                accepted_correct += predicted == actual
+
+        results = {
+            "examples": len(texts),
+            "accuracy": round(correct / len(texts), 4) if texts else 0.0,
+            "recall": {
+                label: round(row[label] / sum(row.values()), 4) if sum(row.values()) else None
+                for label, row in confusion.items()
+            },
+            "confusion": confusion
+        }
+        if threshold is not None:
+            results["threshold"] = threshold
+            results["coverage"] = round(accepted / len(texts), 4) if texts else 0.0
+            results["accepted_accuracy"] = round(accepted_correct / accepted, 4) if accepted else None
+        return results
+
+    def save(self, path):
+        """
+        Write the model to a .npz file.
+
+        Args:
+            path (str): Destination file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, labels=np.array(self.labels))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a model written by save().
+
+        Args:
+            path (str): Model file
+
+        Returns:
+            LocalIntentModel: The trained model
+        """
+        with np.load(path) as data:
+            model = cls(n_features=data["weights"].shape[0], labels=[str(label) for label in data["labels"]])
+            model.weights = data["weights"].astype(np.float32)
+            model.bias = data["bias"].astype(np.float32)
+        model.trained = True
+        return model
+
+
+def load_examples(log_path, min_confidence=0.0):
+    """
+    Read logged LLM classifications.
+
+    Later entries for the same message win, so relabelled messages are not duplicated.
+
+    Args:
+        log_path (str): JSONL file written by IntentClassifierAgent
+        min_confidence (float): Skip labels the LLM was less sure about
+
+    Returns:
+        tuple: (texts, labels)
+    """
+    examples = {}
+    if not os.path.exists(log_path):
+        return [], []
+
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                message = entry.get("message")
+                intent = entry.get("intent")
+                # The LLM sometimes answers "confidence": null
+                confidence = float(entry.get("confidence") or 0.0)
+            except (ValueError, TypeError, AttributeError):
+                continue
+            if not message or not isinstance(message, str) or intent not in INTENT_LABELS:
+                continue
+            if confidence < min_confidence:
+                continue
+            examples[message.strip().lower()] = (message, intent)
+
+    return [text for text, _ in examples.values()], [label for _, label in examples.values()]
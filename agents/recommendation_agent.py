@@ -1,16 +1,24 @@
+import asyncio
 import requests
 import json
 from .base_agent import BaseAgent
+from .llm_scheduler import PRIORITY_OFFLINE
 from database.supabase_client import SupabaseClient
 
 class RecommendationAgent(BaseAgent):
     """Agent responsible for recommending solutions based on historical data."""
     
+    # Prompts embed historical tickets, which change as tickets are resolved
+    cache_ttl = 600
+    # Long prompts; capped so a burst cannot occupy every model slot
+    max_concurrent_calls = 1
+    context_budget = 1000
+    
     def __init__(self):
         super().__init__("Recommendation Agent")
         self.supabase = SupabaseClient()
     
-    def generate_recommendations(self, conversation, summary=None, actions=None):
+    async def generate_recommendations(self, conversation, summary=None, actions=None):
         """
         Generate solution recommendations based on the conversation and historical data.
         
@@ -42,25 +50,7 @@ class RecommendationAgent(BaseAgent):
         else:
             actions_context = "Identified action items:\n" + "\n".join([f"- {action}" for action in actions])
         
-        try:
-            # Get similar historical tickets from the database
-            similar_tickets = self.supabase.get_similar_tickets(conversation)
-            
-            # Format similar tickets for context
-            historical_context = ""
-            if similar_tickets and isinstance(similar_tickets, list) and len(similar_tickets) > 0:
-                historical_context = "Similar past issues and their solutions:\n"
-                for idx, ticket in enumerate(similar_tickets[:3]):  # Limit to top 3 most similar
-                    if isinstance(ticket, dict):
-                        ticket_summary = ticket.get('summary', 'No summary available')
-                        ticket_resolution = ticket.get('resolution', 'No resolution recorded')
-                        historical_context += f"Issue {idx+1}: {ticket_summary}\n"
-                        historical_context += f"Solution: {ticket_resolution}\n\n"
-            else:
-                historical_context = "No similar historical tickets found.\n"
-        except Exception as db_error:
-            print(f"[AGENT] {self.name} database error: {str(db_error)}")
-            historical_context = "Unable to retrieve historical data.\n"
+        historical_context = await self.build_historical_context(conversation)
         
         prompt = f"""
         You are a customer support solution specialist. Your task is to recommend the most appropriate 
@@ -87,28 +77,72 @@ class RecommendationAgent(BaseAgent):
         """
         
         try:
-            response = self.query_llm(prompt)
+            response = await self.query_llm_async(prompt)
             
             # Process the response into a list of recommendations
             recommendations = [rec.strip() for rec in response.strip().split('\n') if rec.strip()]
-            
-            # Ensure recommendations are complete sentences and sufficiently detailed
-            validated_recommendations = []
-            for rec in recommendations:
-                # Add period if missing at the end
-                if not rec.endswith('.') and not rec.endswith('!') and not rec.endswith('?'):
-                    rec = rec + '.'
-                    
-                # Only keep recommendations that are substantial
-                if len(rec.split()) >= 5:
-                    validated_recommendations.append(rec)
-            
-            return validated_recommendations if validated_recommendations else ["Unable to generate specific recommendations based on the current information."]
+            return self.validate_recommendations(recommendations)
         except Exception as llm_error:
             print(f"[AGENT] {self.name} LLM error: {str(llm_error)}")
             return ["Unable to generate recommendations due to a processing error."]
     
-    def evaluate_recommendation_effectiveness(self, recommendation, issue_summary):
+    async def build_historical_context(self, conversation):
+        """
+        Describe similar past tickets and their solutions for use in a prompt.
+        
+        Args:
+            conversation (str): The formatted conversation history
+            
+        Returns:
+            str: Historical context text
+        """
+        try:
+            # Get similar historical tickets from the database
+            similar_tickets = await asyncio.to_thread(self.supabase.get_similar_tickets, conversation)
+            
+            # Format similar tickets for context
+            historical_context = ""
+            if similar_tickets and isinstance(similar_tickets, list) and len(similar_tickets) > 0:
+                historical_context = "Similar past issues and their solutions:\n"
+                for idx, ticket in enumerate(similar_tickets[:3]):  # Limit to top 3 most similar
+                    if isinstance(ticket, dict):
+                        ticket_summary = ticket.get('summary', 'No summary available')
+                        ticket_resolution = ticket.get('resolution', 'No resolution recorded')
+                        historical_context += f"Issue {idx+1}: {ticket_summary}\n"
+                        historical_context += f"Solution: {ticket_resolution}\n\n"
+            else:
+                historical_context = "No similar historical tickets found.\n"
+        except Exception as db_error:
+            print(f"[AGENT] {self.name} database error: {str(db_error)}")
+            historical_context = "Unable to retrieve historical data.\n"
+        return historical_context
+    
+    def validate_recommendations(self, recommendations):
+        """
+        Keep only complete, sufficiently detailed recommendations.
+        
+        Args:
+            recommendations (list): Candidate recommendation strings
+            
+        Returns:
+            list: Validated recommendations, or a single fallback message if none qualify
+        """
+        validated_recommendations = []
+        for rec in recommendations:
+            if not isinstance(rec, str) or not rec.strip():
+                continue
+            rec = rec.strip()
+            # Add period if missing at the end
+            if not rec.endswith('.') and not rec.endswith('!') and not rec.endswith('?'):
+                rec = rec + '.'
+                
+            # Only keep recommendations that are substantial
+            if len(rec.split()) >= 5:
+                validated_recommendations.append(rec)
+        
+        return validated_recommendations if validated_recommendations else ["Unable to generate specific recommendations based on the current information."]
+    
+    async def evaluate_recommendation_effectiveness(self, recommendation, issue_summary):
         """
         Evaluate the likely effectiveness of a recommendation for the given issue.
         
@@ -141,7 +175,7 @@ class RecommendationAgent(BaseAgent):
         Explanation: [your brief explanation]
         """
         
-        response = self.query_llm(prompt)
+        response = await self.query_llm_async(prompt, priority=PRIORITY_OFFLINE)
         
         # Extract score and explanation
         try:
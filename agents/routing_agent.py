@@ -1,10 +1,15 @@
 import requests
 import json
 from .base_agent import BaseAgent
+from .llm_scheduler import PRIORITY_OFFLINE
 
 class RoutingAgent(BaseAgent):
     """Agent responsible for determining the optimal routing for customer issues."""
     
+    cache_ttl = 1800
+    max_concurrent_calls = 2
+    context_budget = 800
+    
     def __init__(self):
         super().__init__("Routing Agent")
         # Define available teams
@@ -21,7 +26,7 @@ class RoutingAgent(BaseAgent):
             "Quality Assurance"
         ]
     
-    def determine_routing(self, conversation, actions=None):
+    async def determine_routing(self, conversation, actions=None):
         """
         Determine the optimal team(s) to route this customer issue to.
         
@@ -60,7 +65,7 @@ class RoutingAgent(BaseAgent):
         Additional Teams: [team name], [team name] (or "None" if no additional teams)
         """
         
-        response = self.query_llm(prompt)
+        response = await self.query_llm_async(prompt)
         
         # Process the response to extract routing information
         routing_info = {"primary_team": "", "additional_teams": []}
@@ -68,21 +73,44 @@ class RoutingAgent(BaseAgent):
         for line in response.strip().split('\n'):
             if line.startswith('Primary Team:'):
                 primary_team = line.split('Primary Team:')[1].strip()
-                if primary_team in self.available_teams:
-                    routing_info["primary_team"] = primary_team
-                else:
-                    # Default to Level 1 Support if the primary team isn't recognized
-                    routing_info["primary_team"] = "Level 1 Support"
+                routing_info["primary_team"] = self.validate_primary_team(primary_team)
             
             if line.startswith('Additional Teams:'):
                 teams_text = line.split('Additional Teams:')[1].strip()
                 if teams_text.lower() != "none":
                     teams = [team.strip() for team in teams_text.split(',')]
-                    routing_info["additional_teams"] = [team for team in teams if team in self.available_teams]
+                    routing_info["additional_teams"] = self.validate_additional_teams(teams)
         
         return routing_info
     
-    def evaluate_routing_accuracy(self, issue_summary, assigned_team):
+    def validate_primary_team(self, team):
+        """
+        Map a proposed primary team onto the available teams.
+        
+        Args:
+            team (str): Proposed team name
+            
+        Returns:
+            str: The team if available, otherwise "Level 1 Support"
+        """
+        if team in self.available_teams:
+            return team
+        # Default to Level 1 Support if the primary team isn't recognized
+        return "Level 1 Support"
+    
+    def validate_additional_teams(self, teams):
+        """
+        Drop proposed additional teams that are not available.
+        
+        Args:
+            teams (list): Proposed team names
+            
+        Returns:
+            list: Only the recognized teams
+        """
+        return [team for team in teams if team in self.available_teams]
+    
+    async def evaluate_routing_accuracy(self, issue_summary, assigned_team):
         """
         Evaluate whether an issue was routed to the appropriate team.
         
@@ -113,7 +141,7 @@ class RoutingAgent(BaseAgent):
         Suggested Team: [only if routing is incorrect]
         """
         
-        response = self.query_llm(prompt)
+        response = await self.query_llm_async(prompt, priority=PRIORITY_OFFLINE)
         
         # Extract evaluation
         lines = response.strip().split('\n')
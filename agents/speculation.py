@@ -0,0 +1,155 @@
+import asyncio
+import time
+
+
+class SpeculativeRun:
+    """A group of agent calls started before the intent is known."""
+
+    def __init__(self, tracker, funcs):
+        """
+        Start every call immediately.
+
+        Streamed output is buffered until the run is committed, so nothing
+        reaches the user for a speculation that turns out to be wrong.
+
+        Args:
+            tracker (Speculation): Tracker receiving hit/miss accounting
+            funcs (dict): Node name -> coroutine function taking an on_delta
+                coroutine function
+        """
+        self.tracker = tracker
+        self.started = time.monotonic()
+        self.committed_at = None
+        self.tasks = {}
+        self._buffers = {}
+        self._sinks = {}
+        self._finished = {}
+
+        for name, func in funcs.items():
+            self._buffers[name] = []
+            task = asyncio.ensure_future(func(self._make_delta_handler(name)))
+            task.add_done_callback(lambda task, name=name: self._on_done(name, task))
+            self.tasks[name] = task
+
+    def _on_done(self, name, task):
+        self._finished[name] = time.monotonic()
+        # Retrieve the outcome so discarded failures are not reported as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    def _make_delta_handler(self, name):
+        async def on_delta(delta):
+            sink = self._sinks.get(name)
+            if sink is None:
+                self._buffers[name].append(delta)
+            else:
+                await sink(delta)
+        return on_delta
+
+    def commit(self):
+        """Record that the speculation was correct and its results will be used."""
+        if self.committed_at is None:
+            self.committed_at = time.monotonic()
+            self.tracker.record_hit(self)
+
+    async def result(self, name, on_delta=None):
+        """
+        Wait for a speculative call, replaying buffered output first.
+
+        Args:
+            name (str): Node name passed to start()
+            on_delta (callable, optional): Coroutine function that receives the
+                buffered text and then the live stream
+
+        Returns:
+            any: The call's result
+        """
+        self.commit()
+        if on_delta is not None:
+            buffer = self._buffers[name]
+            while buffer:
+                await on_delta(buffer.pop(0))
+            self._sinks[name] = on_delta
+        return await self.tasks[name]
+
+    def cancel(self):
+        """Cancel the calls because the turn they belong to was abandoned; not counted as a miss."""
+        for task in self.tasks.values():
+            task.cancel()
+
+    def discard(self):
+        """Cancel the calls of a wrong speculation and account for the wasted time."""
+        now = time.monotonic()
+        for task in self.tasks.values():
+            task.cancel()
+        wasted = sum(self._finished.get(name, now) - self.started for name in self.tasks)
+        self.tracker.record_miss(self, wasted)
+
+
+class Speculation:
+    """Starts issue pipeline agents while intent classification is still running and tracks the payoff."""
+
+    # Shared instance used by the app
+    _shared = None
+
+    def __init__(self):
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.calls_started = 0
+        self.calls_cancelled = 0
+        self.wasted_seconds = 0.0
+        self.head_start_seconds = 0.0
+
+    @classmethod
+    def get_shared(cls):
+        """Return the process-wide instance, creating it on first use."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def start(self, funcs):
+        """
+        Launch a speculative run.
+
+        Args:
+            funcs (dict): Node name -> coroutine function taking an on_delta
+                coroutine function
+
+        Returns:
+            SpeculativeRun: Handle to commit or discard once the intent is known
+        """
+        self.started += 1
+        self.calls_started += len(funcs)
+        print(f"[PIPELINE] Speculatively starting {', '.join(funcs)}")
+        return SpeculativeRun(self, funcs)
+
+    def record_hit(self, run):
+        self.hits += 1
+        self.head_start_seconds += run.committed_at - run.started
+        print(f"[PIPELINE] Speculation hit, {run.committed_at - run.started:.2f}s head start")
+
+    def record_miss(self, run, wasted):
+        self.misses += 1
+        self.calls_cancelled += sum(1 for name in run.tasks if name not in run._finished)
+        self.wasted_seconds += wasted
+        print(f"[PIPELINE] Speculation miss, discarded {wasted:.2f}s of agent work")
+
+    def get_stats(self):
+        """
+        Get speculation counters.
+
+        Returns:
+            dict: Hit rate, average head start on hits and agent time wasted on misses
+        """
+        resolved = self.hits + self.misses
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / resolved, 4) if resolved else 0.0,
+            "calls_started": self.calls_started,
+            "calls_cancelled": self.calls_cancelled,
+            "avg_head_start_seconds": round(self.head_start_seconds / self.hits, 3) if self.hits else 0.0,
+            "wasted_seconds": round(self.wasted_seconds, 3)
+        }
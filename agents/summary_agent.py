@@ -1,3 +1,4 @@
+import os
 import requests
 import json
 from .base_agent import BaseAgent
@@ -5,15 +6,23 @@ from .base_agent import BaseAgent
 class SummaryAgent(BaseAgent):
     """Agent responsible for generating concise summaries of customer conversations."""
     
+    cache_ttl = 1800
+    max_concurrent_calls = 2
+    context_budget = 1500
+    
     def __init__(self):
         super().__init__("Summary Agent")
+        # Incremental updates allowed before the summary is rebuilt from the full conversation
+        self.full_refresh_every = int(os.environ.get("SUMMARY_FULL_REFRESH_EVERY", "5"))
+        self.stats = {"full": 0, "incremental": 0}
 
-    def generate_summary(self, conversation):
+    async def generate_summary(self, conversation, on_delta=None):
         """
         Generate a concise summary of the conversation.
         
         Args:
             conversation (str): The formatted conversation history
+            on_delta (callable, optional): Coroutine function receiving streamed text chunks
             
         Returns:
             str: A concise summary of the key points in the conversation
@@ -34,25 +43,26 @@ class SummaryAgent(BaseAgent):
         """
         
         try:
-            response = self.query_llm(prompt)
+            response = await self.query_llm_async(prompt, on_delta=on_delta)
             return response.strip()
         except Exception as e:
             print(f"[AGENT] {self.name} error generating summary: {str(e)}")
             return "Unable to generate conversation summary at this time."
     
-    def update_summary(self, previous_summary, new_messages):
+    async def update_summary(self, previous_summary, new_messages, on_delta=None):
         """
         Update an existing summary with new conversation messages.
         
         Args:
             previous_summary (str): The existing conversation summary
             new_messages (str): New messages to incorporate into the summary
+            on_delta (callable, optional): Coroutine function receiving streamed text chunks
             
         Returns:
             str: Updated summary
         """
         if not previous_summary or not isinstance(previous_summary, str):
-            return self.generate_summary(new_messages)
+            return await self.generate_summary(new_messages, on_delta)
             
         if not new_messages or not isinstance(new_messages, str):
             return previous_summary
@@ -71,8 +81,50 @@ class SummaryAgent(BaseAgent):
         """
         
         try:
-            response = self.query_llm(prompt)
+            response = await self.query_llm_async(prompt, on_delta=on_delta)
             return response.strip()
         except Exception as e:
             print(f"[AGENT] {self.name} error updating summary: {str(e)}")
             return previous_summary
+    
+    async def roll_summary(self, conversation_history, previous_summary, watermark, updates_since_refresh, on_delta=None):
+        """
+        Bring a summary up to date by summarizing only the messages after the watermark.
+        
+        Every full_refresh_every incremental updates the summary is rebuilt from the
+        whole conversation so errors in earlier updates cannot accumulate.
+        
+        Args:
+            conversation_history (TranscriptView): All conversation messages
+            previous_summary (str): Summary covering conversation_history[:watermark]
+            watermark (int): Number of messages already covered by previous_summary
+            updates_since_refresh (int): Incremental updates since the last full summary
+            on_delta (callable, optional): Coroutine function receiving streamed text chunks
+            
+        Returns:
+            tuple: (summary, new watermark, updates since the last full summary)
+        """
+        full_refresh = (
+            not previous_summary
+            or watermark <= 0
+            or watermark > len(conversation_history)
+            or updates_since_refresh >= self.full_refresh_every
+        )
+        
+        if full_refresh:
+            self.stats["full"] += 1
+            print(f"[AGENT] {self.name} summarizing all {len(conversation_history)} messages")
+            # Only falls back on the previous summary when the conversation exceeds the budget
+            summary = await self.generate_summary(self.build_context(conversation_history, previous_summary), on_delta)
+            updates = 0
+        else:
+            self.stats["incremental"] += 1
+            new_messages = conversation_history.since(watermark)
+            print(f"[AGENT] {self.name} updating summary with {len(new_messages)} new messages")
+            summary = await self.update_summary(previous_summary, self.build_context(new_messages), on_delta)
+            updates = updates_since_refresh + 1
+        
+        if summary.startswith("Error querying LLM") or summary.startswith("Unable to generate"):
+            # Do not build on a failed summary; the next turn starts over
+            return summary, 0, 0
+        return summary, len(conversation_history), updates
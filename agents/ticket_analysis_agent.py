@@ -0,0 +1,155 @@
+import asyncio
+import json
+from .base_agent import BaseAgent
+
+class TicketAnalysisAgent(BaseAgent):
+    """Agent that produces every insight panel from a single structured LLM call."""
+
+    cache_ttl = 1800
+    max_concurrent_calls = 2
+    context_budget = 1500
+
+    def __init__(self, action_agent, recommendation_agent, routing_agent, time_agent):
+        """
+        Initialize the fused agent.
+
+        The individual agents are used for their historical context and
+        validation rules so both pipeline modes enforce the same constraints.
+
+        Args:
+            action_agent (ActionAgent): Provides action item normalization
+            recommendation_agent (RecommendationAgent): Provides similar tickets and recommendation rules
+            routing_agent (RoutingAgent): Provides the available teams
+            time_agent (TimeEstimationAgent): Provides historical resolution times
+        """
+        super().__init__("Ticket Analysis Agent")
+        self.action_agent = action_agent
+        self.recommendation_agent = recommendation_agent
+        self.routing_agent = routing_agent
+        self.time_agent = time_agent
+
+    async def analyze_ticket(self, conversation):
+        """
+        Generate summary, actions, recommendations, routing and time estimate in one call.
+
+        Args:
+            conversation (str): The formatted conversation history
+
+        Returns:
+            dict: Keys summary, actions, recommendations, routing and time_estimate,
+                or None if the model output is missing or invalid
+        """
+        if not conversation or not isinstance(conversation, str):
+            print(f"[AGENT] {self.name} received invalid conversation input")
+            return None
+
+        similar_context, time_context = await asyncio.gather(
+            self.recommendation_agent.build_historical_context(conversation),
+            self.time_agent.build_historical_context(conversation)
+        )
+        teams_list = "\n".join([f"- {team}" for team in self.routing_agent.available_teams])
+
+        prompt = f"""
+        You are a customer support analyst. Analyze the conversation below and produce a complete
+        ticket analysis in a single JSON document.
+
+        Available teams:
+        {teams_list}
+
+        {similar_context}
+
+        {time_context}
+
+        Conversation:
+        {conversation}
+
+        Respond with JSON only, using exactly this structure:
+        {{
+          "summary": "[brief, objective summary of the issue and its status in 3-5 sentences]",
+          "actions": ["[specific action a support agent or another team must take]"],
+          "recommendations": ["[2-3 detailed, actionable recommendations, each a complete sentence of at least 10 words]"],
+          "routing": {{
+            "primary_team": "[one team from the available teams]",
+            "additional_teams": ["[other available teams that must be involved, or an empty list]"]
+          }},
+          "time_estimate": {{
+            "estimated_resolution_time": "[time range or specific time]",
+            "confidence_level": "[High/Medium/Low]",
+            "factors": "[brief explanation of key factors affecting the estimate]"
+          }}
+        }}
+        """
+
+        try:
+            response = await self.query_llm_async(prompt)
+            start = response.find('{')
+            end = response.rfind('}') + 1
+            if start < 0 or end <= start:
+                print(f"[AGENT] {self.name} response contained no JSON object")
+                return None
+            return self.validate_analysis(json.loads(response[start:end]))
+        except Exception as e:
+            print(f"[AGENT] {self.name} error analyzing ticket: {str(e)}")
+            return None
+
+    def validate_analysis(self, analysis):
+        """
+        Check fused output against the rules the individual agents enforce.
+
+        Args:
+            analysis (dict): Parsed model output
+
+        Returns:
+            dict: Normalized analysis, or None if a required part is missing or malformed
+        """
+        if not isinstance(analysis, dict):
+            return None
+
+        summary = analysis.get("summary")
+        actions = analysis.get("actions")
+        recommendations = analysis.get("recommendations")
+        routing = analysis.get("routing")
+        time_estimate = analysis.get("time_estimate")
+
+        if not isinstance(summary, str) or not summary.strip():
+            print(f"[AGENT] {self.name} analysis has no summary")
+            return None
+        if not isinstance(actions, list) or not isinstance(recommendations, list):
+            print(f"[AGENT] {self.name} analysis actions/recommendations are not lists")
+            return None
+        if not isinstance(routing, dict) or not isinstance(routing.get("primary_team"), str):
+            print(f"[AGENT] {self.name} analysis has no primary team")
+            return None
+
+        additional_teams = routing.get("additional_teams") or []
+        if not isinstance(additional_teams, list):
+            additional_teams = [team.strip() for team in str(additional_teams).split(',')]
+
+        if isinstance(time_estimate, dict):
+            estimated_time = time_estimate.get("estimated_resolution_time")
+            if not estimated_time:
+                print(f"[AGENT] {self.name} analysis has no estimated resolution time")
+                return None
+            time_text = "\n".join([
+                f"Estimated Resolution Time: {estimated_time}",
+                f"Confidence Level: {time_estimate.get('confidence_level', 'Medium')}",
+                f"Factors: {time_estimate.get('factors', '')}"
+            ])
+        elif isinstance(time_estimate, str) and time_estimate.strip():
+            time_text = time_estimate
+        else:
+            print(f"[AGENT] {self.name} analysis has no time estimate")
+            return None
+
+        return {
+            "summary": summary.strip(),
+            "actions": self.action_agent.clean_actions(actions),
+            "recommendations": self.recommendation_agent.validate_recommendations(recommendations),
+            "routing": {
+                "primary_team": self.routing_agent.validate_primary_team(routing["primary_team"].strip()),
+                "additional_teams": self.routing_agent.validate_additional_teams(
+                    [team.strip() for team in additional_teams if isinstance(team, str)]
+                )
+            },
+            "time_estimate": self.time_agent.format_estimate(time_text)
+        }
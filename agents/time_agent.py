@@ -1,16 +1,24 @@
+import asyncio
 import requests
 import json
 from .base_agent import BaseAgent
+from .llm_scheduler import PRIORITY_OFFLINE
 from database.supabase_client import SupabaseClient
 
 class TimeEstimationAgent(BaseAgent):
     """Agent responsible for estimating resolution time for customer issues."""
     
+    # Prompts embed historical resolution times, which change as tickets are resolved
+    cache_ttl = 600
+    # Long prompts; capped so a burst cannot occupy every model slot
+    max_concurrent_calls = 1
+    context_budget = 800
+    
     def __init__(self):
         super().__init__("Time Estimation Agent")
         self.supabase = SupabaseClient()
     
-    def estimate_resolution_time(self, conversation, actions=None, routing=None):
+    async def estimate_resolution_time(self, conversation, actions=None, routing=None):
         """
         Estimate the expected resolution time for the customer issue.
         
@@ -22,9 +30,6 @@ class TimeEstimationAgent(BaseAgent):
         Returns:
             str: Estimated resolution time with confidence level
         """
-        # Get historical resolution times for similar issues
-        historical_data = self.supabase.get_resolution_time_data(conversation)
-        
         # Format actions for context
         actions_context = ""
         if actions and isinstance(actions, list):
@@ -40,28 +45,7 @@ class TimeEstimationAgent(BaseAgent):
             if additional_teams:
                 routing_context += f"Additional teams involved: {', '.join(additional_teams)}\n"
         
-        # Format historical data for context (safely handling empty or None values)
-        historical_context = ""
-        if historical_data and isinstance(historical_data, list) and len(historical_data) > 0:
-            # Filter out None values
-            valid_data = [t for t in historical_data if t is not None]
-            
-            if valid_data:
-                avg_time = sum(valid_data) / len(valid_data)
-                min_time = min(valid_data)
-                max_time = max(valid_data)
-                
-                historical_context = f"""
-                Historical resolution times for similar issues:
-                - Average: {avg_time:.1f} hours
-                - Minimum: {min_time:.1f} hours
-                - Maximum: {max_time:.1f} hours
-                - Sample size: {len(valid_data)} similar issues
-                """
-            else:
-                historical_context = "No valid historical resolution time data available."
-        else:
-            historical_context = "No historical resolution time data available."
+        historical_context = await self.build_historical_context(conversation)
         
         prompt = f"""
         You are a customer support time estimation specialist. Your task is to estimate 
@@ -87,17 +71,66 @@ class TimeEstimationAgent(BaseAgent):
         Factors: [brief explanation of key factors affecting the estimate]
         """
         
-        response = self.query_llm(prompt)
+        response = await self.query_llm_async(prompt)
+        
+        return self.format_estimate(response)
+    
+    async def build_historical_context(self, conversation):
+        """
+        Describe historical resolution times for similar issues for use in a prompt.
+        
+        Args:
+            conversation (str): The formatted conversation history
+            
+        Returns:
+            str: Historical context text
+        """
+        # Get historical resolution times for similar issues
+        historical_data = await asyncio.to_thread(self.supabase.get_resolution_time_data, conversation)
+        
+        # Format historical data for context (safely handling empty or None values)
+        historical_context = ""
+        if historical_data and isinstance(historical_data, list) and len(historical_data) > 0:
+            # Filter out None values
+            valid_data = [t for t in historical_data if t is not None]
+            
+            if valid_data:
+                avg_time = sum(valid_data) / len(valid_data)
+                min_time = min(valid_data)
+                max_time = max(valid_data)
+                
+                historical_context = f"""
+                Historical resolution times for similar issues:
+                - Average: {avg_time:.1f} hours
+                - Minimum: {min_time:.1f} hours
+                - Maximum: {max_time:.1f} hours
+                - Sample size: {len(valid_data)} similar issues
+                """
+            else:
+                historical_context = "No valid historical resolution time data available."
+        else:
+            historical_context = "No historical resolution time data available."
         
-        # Format the response
+        return historical_context
+    
+    def format_estimate(self, estimate_text):
+        """
+        Normalize an estimate to one non-empty line per field.
+        
+        Args:
+            estimate_text (str): Raw estimate text
+            
+        Returns:
+            str: Estimate lines joined with newlines
+        """
         formatted_estimate = ""
-        for line in response.strip().split('\n'):
+        for line in estimate_text.strip().split('\n'):
             if line.strip():
                 formatted_estimate += line.strip() + "\n"
         
         return formatted_estimate.strip()
     
-    def optimize_resolution_process(self, actions, current_estimate):
+    async def optimize_resolution_process(self, actions, current_estimate):
         """
         Suggest optimizations to reduce the estimated resolution time.
         
@@ -135,7 +168,7 @@ class TimeEstimationAgent(BaseAgent):
         time it could save.
         """
         
-        response = self.query_llm(prompt)
+        response = await self.query_llm_async(prompt, priority=PRIORITY_OFFLINE)
         
         # Process the response into a list of optimizations
         optimizations = []
@@ -1,4 +1,6 @@
 import os
+import asyncio
+import functools
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException, Depends
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
@@ -16,15 +18,37 @@ from agents.recommendation_agent import RecommendationAgent
 from agents.routing_agent import RoutingAgent
 from agents.time_agent import TimeEstimationAgent
 from agents.intent_classifier_agent import IntentClassifierAgent
-from database.supabase_client import SupabaseClient
-from utils.conversation_utils import format_conversation_history
+from agents.fast_responder_agent import FastResponderAgent
+from agents.agent_graph import AgentGraph
+from agents.ticket_analysis_agent import TicketAnalysisAgent
+from agents.speculation import Speculation
+from agents.llm_client import LLMClient
+from agents.llm_cache import LLMCache
+from agents.llm_singleflight import SingleFlight
+from agents.llm_scheduler import LLMScheduler
+from database.async_supabase_client import AsyncSupabaseClient
+from database.ticket_writer import TicketWriter
+from utils.context_builder import ContextBuilder
+from utils.transcript import Message, format_timestamp
+from utils.session import Session
+from utils.session_store import SessionStore
+from utils.redis_session_store import RedisSessionStore
+from utils.redis_client import create_redis_client
+from utils.connection_manager import ConnectionManager, LocalBroker, RedisBroker
+from utils.turn_runner import TurnRunner
+from utils.ticket_ids import TicketIdGenerator
 
 # Create FastAPI app
 app = FastAPI(title="AI-Driven Customer Support System")
 
 # Initialize Supabase client
 print("Initializing Supabase client...")
-supabase_client = SupabaseClient()
+# Non-blocking queries for the async handlers; supabase_client serves sync callers
+async_supabase_client = AsyncSupabaseClient.get_shared()
+# The same client the async one wraps, so both read and invalidate one ticket cache
+supabase_client = async_supabase_client.sync_client
+# Tickets are saved in the background, so replies never wait for the database
+ticket_writer = TicketWriter(async_supabase_client)
 print("Supabase client initialized.")
 
 # Initialize agents
@@ -35,8 +59,20 @@ recommendation_agent = RecommendationAgent()
 routing_agent = RoutingAgent()
 time_agent = TimeEstimationAgent()
 intent_classifier = IntentClassifierAgent()
+fast_responder = FastResponderAgent(intent_classifier.GREETINGS, intent_classifier.FAREWELLS)
+ticket_analysis_agent = TicketAnalysisAgent(action_agent, recommendation_agent, routing_agent, time_agent)
 print("All agents initialized successfully.")
 
+# Issue pipeline mode: "agents" runs each agent separately, "fused" uses one structured call
+PIPELINE_MODES = ("agents", "fused")
+pipeline_settings = {
+    "mode": os.environ.get("PIPELINE_MODE", "agents"),
+    # Start summary and action extraction while the intent is still being classified
+    "speculative": os.environ.get("SPECULATIVE_AGENTS", "true").lower() != "false"
+}
+if pipeline_settings["mode"] not in PIPELINE_MODES:
+    pipeline_settings["mode"] = "agents"
+
 # Create a templates directory for HTML templates
 templates_dir = os.path.join(os.path.dirname(__file__), "templates")
 if not os.path.exists(templates_dir):
@@ -53,51 +89,119 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 # Setup Jinja2 templates
 templates = Jinja2Templates(directory=templates_dir)
 
-# In-memory session storage - in production, use Redis or another persistence layer
-active_sessions = {}
+# Session storage: "memory" keeps sessions in this process, evicting idle ones to disk
+# snapshots; "redis" shares them between workers so clients can reconnect to any of them
+session_backend = os.environ.get("SESSION_BACKEND", "memory")
+# Message delivery between workers: "local" reaches this process only, "redis" every worker
+pubsub_backend = os.environ.get("PUBSUB_BACKEND", "local")
+redis_client = create_redis_client() if "redis" in (session_backend, pubsub_backend) else None
 
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict = {}
-    
-    async def connect(self, websocket: WebSocket, client_id: str):
-        await websocket.accept()
-        self.active_connections[client_id] = websocket
-    
-    def disconnect(self, client_id: str):
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
+if session_backend == "redis":
+    session_store = RedisSessionStore(client=redis_client)
+else:
+    session_store = SessionStore()
+
+# Long-running tasks started with the app, cancelled on shutdown
+background_tasks = {}
+
+# WebSocket connections, with delivery to clients connected to other workers
+manager = ConnectionManager(RedisBroker(redis_client) if pubsub_backend == "redis" else LocalBroker())
+
+# Background conversation turns, one at a time per client
+turn_runner = TurnRunner()
+
+def make_delta_sender(client_id, target):
+    """
+    Build a callback that forwards streamed LLM text to the client.
     
-    async def send_message(self, client_id: str, message: dict):
-        if client_id in self.active_connections:
-            await self.active_connections[client_id].send_json(message)
+    Args:
+        client_id (str): The WebSocket client to send to
+        target (str): Which UI element the text belongs to ("chat", "summary" or "actions")
+        
+    Returns:
+        callable: Coroutine function accepting a partial text chunk
+    """
+    async def send_delta(delta):
+        await manager.send_message(client_id, {
+            "type": "message_delta",
+            "target": target,
+            "delta": delta
+        })
+    return send_delta
+
+def make_ticket_saver(client_id):
+    """
+    Build a callback that stores session attributes the ticket writer changed.
     
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections.values():
-            await connection.send_json(message)
+    Args:
+        client_id (str): The WebSocket client the session belongs to
+        
+    Returns:
+        callable: Coroutine function accepting the session and the changed attribute names
+    """
+    async def save_ticket_fields(session, *fields):
+        await session_store.save(client_id, session, *fields)
+        if "ticket_id" in fields:
+            # The ticket ID was taken by another ticket, so the ticket was saved under a new one
+            await manager.set_topics(client_id, [f"ticket:{session.ticket_id}"])
+            await manager.send_message(client_id, {"type": "update_ticket_id", "data": session.ticket_id})
+    return save_ticket_fields
+
+@app.on_event("startup")
+async def start_fast_reply_refresh():
+    """Keep the greeting/farewell reply pools fresh in the background"""
+    background_tasks["fast_reply_refresh"] = asyncio.create_task(fast_responder.run_refresh_loop())
+
+@app.on_event("startup")
+async def claim_ticket_worker_id():
+    """Give this worker its own ticket worker ID, so workers never make the same ticket ID"""
+    if redis_client is not None:
+        await TicketIdGenerator.get_shared().claim_worker_id(redis_client)
 
-manager = ConnectionManager()
+@app.on_event("startup")
+async def start_ticket_writer():
+    """Write queued tickets in batches, replaying writes spooled while the database was down"""
+    ticket_writer.start()
 
-def get_or_create_session(session_id):
+@app.on_event("startup")
+async def start_session_sweeper():
+    """Evict idle sessions in the background so memory stays bounded"""
+    background_tasks["session_sweeper"] = asyncio.create_task(session_store.run_sweeper())
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    """Stop background tasks and release pooled LLM connections on shutdown"""
+    for task in background_tasks.values():
+        task.cancel()
+    await LLMClient.get_shared().aclose()
+
+@app.on_event("shutdown")
+async def close_database_client():
+    """Write or spool queued tickets, then release pooled database connections on shutdown"""
+    await ticket_writer.close()
+    await async_supabase_client.aclose()
+
+@app.on_event("shutdown")
+async def close_connection_manager():
+    """Release pub/sub subscriptions before the Redis connection closes"""
+    await manager.close()
+
+@app.on_event("shutdown")
+async def save_sessions():
+    """Snapshot sessions still in memory so they survive a restart"""
+    await session_store.close()
+
+async def get_or_create_session(session_id):
     """Get or create a new user session"""
-    if session_id not in active_sessions:
-        # Generate a base ticket ID
-        base_ticket_id = f"TICKET-{int(time.time())}"
-        # Make sure it's unique in the database
-        ticket_id = supabase_client.generate_unique_ticket_id(base_ticket_id)
+    session = await session_store.get(session_id)
+    if session is None:
+        # Unique without a database round trip; see utils.ticket_ids
+        ticket_id = TicketIdGenerator.get_shared().next_id()
         print(f"[APP] Generated unique ticket ID: {ticket_id}")
 
-        active_sessions[session_id] = {
-            "ticket_id": ticket_id,
-            "conversation_history": [],
-            "current_summary": "",
-            "actions": [],
-            "recommendations": [],
-            "routing": {},
-            "time_estimate": ""
-        }
-    return active_sessions[session_id]
+        # Another request may have created the session meanwhile; the stored one wins
+        session = await session_store.put(session_id, Session(ticket_id))
+    return session
 
 @app.get("/", response_class=HTMLResponse)
 async def get_home_page(request: Request):
@@ -134,7 +238,7 @@ async def get_admin_metrics():
     """Get dashboard metrics data"""
     try:
         # Query tickets data directly from database
-        tickets_data = supabase_client.get_all_tickets()
+        tickets_data = await async_supabase_client.get_all_tickets()
         
         if not tickets_data:
             print("No ticket data found in database")
@@ -179,7 +283,7 @@ async def get_all_tickets():
     """Get all tickets"""
     try:
         # Query tickets directly from database
-        tickets = supabase_client.get_all_tickets()
+        tickets = await async_supabase_client.get_all_tickets()
         
         # Format the data
         formatted_tickets = []
@@ -203,7 +307,7 @@ async def get_recent_tickets(limit: int = 5):
     """Get recent tickets"""
     try:
         # Get recent tickets directly from database
-        tickets = supabase_client.get_recent_tickets(limit)
+        tickets = await async_supabase_client.get_recent_tickets(limit)
         return tickets
     except Exception as e:
         print(f"Error getting recent tickets: {e}")
@@ -214,13 +318,13 @@ async def get_ticket_details(ticket_id: str):
     """Get details of a specific ticket"""
     try:
         # Get ticket details directly from database
-        ticket = supabase_client.get_ticket(ticket_id)
+        ticket = await async_supabase_client.get_ticket(ticket_id)
         
         if not ticket:
             raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found")
         
         # Enhance with conversation data if available in database
-        ticket_conversations = supabase_client.get_ticket_conversations(ticket_id)
+        ticket_conversations = await async_supabase_client.get_ticket_conversations(ticket_id)
         if ticket_conversations:
             ticket["conversation"] = ticket_conversations
         else:
@@ -233,7 +337,7 @@ async def get_ticket_details(ticket_id: str):
             ]
         
         # Get agent insights from database if available
-        insights = supabase_client.get_ticket_insights(ticket_id)
+        insights = await async_supabase_client.get_ticket_insights(ticket_id)
         if insights:
             ticket.update(insights)
         else:
@@ -261,11 +365,18 @@ async def update_ticket_status(ticket_id: str, data: dict):
             raise HTTPException(status_code=400, detail="Status is required")
             
         # Update status in database
-        success = supabase_client.update_ticket_status(ticket_id, status)
+        success = await async_supabase_client.update_ticket_status(ticket_id, status)
         
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update ticket status")
         
+        # Let the customer know, whichever worker they are connected to
+        await manager.send_to_topic(f"ticket:{ticket_id}", {
+            "type": "status_update_result",
+            "success": True,
+            "status": status
+        })
+        
         return {"success": True, "message": f"Ticket {ticket_id} status updated to {status}"}
     except HTTPException as he:
         raise he
@@ -599,25 +710,380 @@ async def get_analytics_priority(days: int = 30):
         print(f"Error getting priority distribution: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.websocket("/ws/{client_id}")
-async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    session = get_or_create_session(client_id)
-    await manager.connect(websocket, client_id)
+# Session field and WebSocket event for each pipeline node
+PIPELINE_OUTPUTS = {
+    "summary": ("current_summary", "update_summary"),
+    "actions": ("actions", "update_actions"),
+    "recommendations": ("recommendations", "update_recommendations"),
+    "routing": ("routing", "update_routing"),
+    "time_estimate": ("time_estimate", "update_time_estimate")
+}
+
+def roll_session_summary(session, conversation_history, on_delta=None):
+    """
+    Start updating the session summary from the messages after its watermark.
+    
+    Args:
+        session (Session): The user session
+        conversation_history (TranscriptView): Snapshot of the messages to summarize, so
+            messages appended while summarizing stay above the watermark
+        on_delta (callable, optional): Coroutine function receiving streamed text chunks
+        
+    Returns:
+        coroutine: Resolves to (summary, watermark, updates) from SummaryAgent.roll_summary
+    """
+    return summary_agent.roll_summary(
+        conversation_history,
+        session.current_summary,
+        session.summary_watermark,
+        session.summary_updates,
+        on_delta=on_delta
+    )
+
+def start_speculative_agents(session, conversation_history):
+    """
+    Start the agents that only need the conversation before the intent is known.
+    
+    Args:
+        session (Session): The user session
+        conversation_history (TranscriptView): Snapshot of the conversation messages
+        
+    Returns:
+        SpeculativeRun: Handle to pass to the pipeline or discard
+    """
+    actions_context = action_agent.build_context(conversation_history, session.current_summary)
+    return Speculation.get_shared().start({
+        "summary": lambda on_delta: roll_session_summary(session, conversation_history, on_delta=on_delta),
+        "actions": lambda on_delta: action_agent.extract_actions(actions_context, on_delta=on_delta)
+    })
+
+def build_agent_graph(client_id, session, conversation_history, speculation=None):
+    """
+    Declare the issue pipeline as a dependency graph.
+    
+    Summary and action extraction only need the raw conversation and start
+    immediately; routing waits for actions, recommendations for summary and
+    actions, and time estimation for actions and routing. Each agent gets the
+    conversation fitted to its own token budget. Actions, routing and time
+    estimation see the summary from before this turn, whether or not the new
+    one has been published yet, so their prompts do not depend on timing.
+    
+    Args:
+        client_id (str): The WebSocket client receiving streamed output
+        session (Session): The user session, whose summary watermark is advanced
+        conversation_history (TranscriptView): Snapshot of the conversation messages
+        speculation (SpeculativeRun, optional): Summary and action calls already
+            started during intent classification
+        
+    Returns:
+        AgentGraph: The configured graph
+    """
+    graph = AgentGraph("issue pipeline")
+    # The summary node replaces session.current_summary while other nodes still run
+    prior_summary = session.current_summary
+    
+    async def summarize():
+        on_delta = make_delta_sender(client_id, "summary")
+        if speculation is not None:
+            summary, watermark, updates = await speculation.result("summary", on_delta=on_delta)
+        else:
+            summary, watermark, updates = await roll_session_summary(session, conversation_history, on_delta=on_delta)
+        session.summary_watermark = watermark
+        session.summary_updates = updates
+        await session_store.save(client_id, session, "summary_watermark", "summary_updates")
+        return summary
+    
+    async def extract_actions():
+        on_delta = make_delta_sender(client_id, "actions")
+        if speculation is not None:
+            return await speculation.result("actions", on_delta=on_delta)
+        context = action_agent.build_context(conversation_history, prior_summary)
+        return await action_agent.extract_actions(context, on_delta=on_delta)
+    
+    async def recommend(summary, actions):
+        # Ensure summary is a string and not None
+        summary_text = summary if summary and isinstance(summary, str) else "No summary available"
+        return await recommendation_agent.generate_recommendations(
+            recommendation_agent.build_context(conversation_history, summary_text),
+            summary_text,
+            actions if actions else []
+        )
+    
+    async def route(actions):
+        context = routing_agent.build_context(conversation_history, prior_summary)
+        return await routing_agent.determine_routing(context, actions)
+    
+    async def estimate_time(actions, routing):
+        context = time_agent.build_context(conversation_history, prior_summary)
+        return await time_agent.estimate_resolution_time(context, actions, routing)
+    
+    graph.add_node("summary", summarize,
+                   fallback="Unable to generate conversation summary at this time.")
+    graph.add_node("actions", extract_actions, fallback=[])
+    graph.add_node("recommendations", recommend, depends_on=["summary", "actions"],
+                   fallback=["Unable to generate recommendations at this time."])
+    graph.add_node("routing", route, depends_on=["actions"],
+                   fallback={"primary_team": "Level 1 Support", "additional_teams": []})
+    graph.add_node("time_estimate", estimate_time, depends_on=["actions", "routing"],
+                   fallback="Unable to estimate resolution time at this moment.")
+    return graph
+
+async def run_agent_pipeline(client_id, session, conversation_history, speculation=None):
+    """
+    Run the issue pipeline, storing and pushing each result as soon as it is ready.
+    
+    Args:
+        client_id (str): The WebSocket client to update
+        session (Session): The user session
+        conversation_history (TranscriptView): Snapshot of the conversation messages
+        speculation (SpeculativeRun, optional): Agent calls started during intent classification
+        
+    Returns:
+        dict: Results keyed by node name
+    """
+    async def publish(name, value):
+        session_key, event_type = PIPELINE_OUTPUTS[name]
+        setattr(session, session_key, value)
+        await session_store.save(client_id, session, session_key)
+        print(f"[WORKFLOW] {name} ready, sending {event_type}")
+        await manager.send_message(client_id, {
+            "type": event_type,
+            "data": value
+        })
+    
+    if pipeline_settings["mode"] == "fused":
+        print("[WORKFLOW] Running fused ticket analysis")
+        analysis = await ticket_analysis_agent.analyze_ticket(
+            ticket_analysis_agent.build_context(conversation_history, session.current_summary)
+        )
+        if analysis:
+            if speculation is not None:
+                speculation.discard()
+            # The fused summary covers the whole conversation
+            session.summary_watermark = len(conversation_history)
+            session.summary_updates = 0
+            await session_store.save(client_id, session, "summary_watermark", "summary_updates")
+            for name in PIPELINE_OUTPUTS:
+                await publish(name, analysis[name])
+            return analysis
+        print("[WORKFLOW] Fused analysis invalid, falling back to individual agents")
+    
+    graph = build_agent_graph(client_id, session, conversation_history, speculation)
+    return await graph.run(on_complete=publish)
+
+async def run_turn(client_id, session, user_input, timestamp):
+    """
+    Answer a user message, directly or through the agent pipeline.
+    
+    Runs in the background so the WebSocket keeps receiving while agents work.
+    A newer message from the same client cancels the turn, see TurnRunner.
+    
+    Args:
+        client_id (str): The WebSocket client to answer
+        session (Session): The user session, already holding the message
+        user_input (str): The user's message
+        timestamp (str): When the message was received
+    """
+    # Snapshot the conversation for agents; each fits it to its own token budget
+    conversation_history = session.conversation_history.snapshot()
+    speculation = None
     
     try:
-        # Send initial state to the client
+        # Detailed problem reports start the first agents alongside classification
+        if (pipeline_settings["speculative"] and pipeline_settings["mode"] == "agents"
+                and intent_classifier.looks_like_issue(user_input)):
+            speculation = start_speculative_agents(session, conversation_history)
+        
+        # Classify user intent before processing
+        print("[WORKFLOW] Classifying user intent")
+        classification = await intent_classifier.classify_intent(user_input)
+        intent_type = classification.get("intent", "unknown")
+        confidence = classification.get("confidence", 0.0)
+        
+        print(f"[WORKFLOW] Classified intent: {intent_type}, Confidence: {confidence}")
+        
+        # Only confident issue classifications reach the agent pipeline below
+        if speculation is not None and not (intent_type == "issue" and confidence >= 0.8):
+            speculation.discard()
+            speculation = None
+        
+        # Generate response based on intent classification
+        if intent_type == "greeting" and confidence > 0.6:
+            # Simple greeting - no need for agent pipeline
+            print("[WORKFLOW] Handling as simple greeting")
+            # Plain greetings are answered from the pre-generated reply pool
+            response = fast_responder.select_reply(intent_type, user_input, session.conversation_history)
+            if response is None:
+                # Send typing indicator
+                await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": True})
+                response = await intent_classifier.generate_casual_response(
+                    user_input, 
+                    session.conversation_history,
+                    on_delta=make_delta_sender(client_id, "chat"),
+                    classification=classification
+                )
+                # Stop typing indicator
+                await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": False})
+        
+        elif intent_type == "farewell" and confidence > 0.6:
+            # Simple farewell - no need for agent pipeline
+            print("[WORKFLOW] Handling as farewell")
+            # Plain farewells are answered from the pre-generated reply pool
+            response = fast_responder.select_reply(intent_type, user_input, session.conversation_history)
+            if response is None:
+                # Send typing indicator
+                await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": True})
+                response = await intent_classifier.generate_casual_response(
+                    user_input, 
+                    session.conversation_history,
+                    on_delta=make_delta_sender(client_id, "chat"),
+                    classification=classification
+                )
+                # Stop typing indicator
+                await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": False})
+        
+        elif intent_type == "casual" or (intent_type == "issue" and confidence < 0.8):
+            # Casual conversation or vague mention of a problem - don't activate full pipeline
+            print("[WORKFLOW] Handling as casual conversation or vague problem mention")
+            # Send typing indicator
+            await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": True})
+            response = await intent_classifier.generate_probing_response(
+                user_input,
+                session.conversation_history,
+                on_delta=make_delta_sender(client_id, "chat")
+            )
+            # Stop typing indicator
+            await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": False})
+        
+        elif intent_type == "issue" and confidence >= 0.7:
+            # Specific support issue - activate full agent pipeline
+            print("[WORKFLOW] Processing specific support issue with full agent pipeline")
+            # Send typing indicator
+            await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": True})
+            
+            try:
+                # Activate all agents in parallel, each as soon as its inputs are ready
+                print("[WORKFLOW] Starting agent pipeline")
+                results = await run_agent_pipeline(client_id, session, conversation_history, speculation)
+                summary = results["summary"]
+                actions = results["actions"]
+                routing = results["routing"]
+                
+                # Generate response based on agent outputs
+                print("[WORKFLOW] Generating response to user")
+                try:
+                    # Create a more detailed response using the available information
+                    response_parts = ["Thank you for your message."]
+                    
+                    # Add recommendations with proper formatting
+                    if session.recommendations and len(session.recommendations) > 0:
+                        # Include the first recommendation
+                        first_rec = session.recommendations[0]
+                        response_parts.append(f"I recommend you: {first_rec}")
+                        
+                        # Add second recommendation if available
+                        if len(session.recommendations) > 1:
+                            response_parts.append(f"Additionally, you could try: {session.recommendations[1]}")
+                    else:
+                        response_parts.append("I'll look into this for you and provide a solution shortly.")
+                    
+                    # Add time estimate if available
+                    if session.time_estimate and "Estimated Resolution Time:" in session.time_estimate:
+                        time_line = next((line for line in session.time_estimate.split('\n') if "Estimated Resolution Time:" in line), None)
+                        if time_line:
+                            estimated_time = time_line.split("Estimated Resolution Time:")[1].strip()
+                            response_parts.append(f"I expect this will take approximately {estimated_time} to resolve.")
+                    
+                    # Combine parts with proper spacing
+                    response = " ".join(response_parts)
+                    print(f"[WORKFLOW] Response generated: {response}")
+                except Exception as resp_error:
+                    print(f"[WORKFLOW] Error generating response: {str(resp_error)}")
+                    response = "Thank you for providing those details. I'll analyze your issue and work on a solution for you."
+
+                # Stop typing indicator
+                await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": False})
+                
+                # Queue the ticket for the background writer
+                try:
+                    print("[WORKFLOW] Queueing ticket for database write")
+                    ticket_data = {
+                        "ticket_id": session.ticket_id,
+                        "conversation": session.conversation_history.messages,
+                        "summary": summary,
+                        "actions": actions,
+                        "recommendations": session.recommendations,
+                        "routing": routing,
+                        "time_estimate": session.time_estimate,
+                        "timestamp": timestamp
+                    }
+                    # Only the columns that changed since the last write are sent; the
+                    # session records what was written once the database accepted it
+                    ticket_writer.save_ticket(ticket_data, session, make_ticket_saver(client_id))
+                except Exception as db_error:
+                    print(f"[WORKFLOW] ERROR: Queueing ticket failed: {str(db_error)}")
+            except Exception as agent_error:
+                print(f"[WORKFLOW] ERROR: Agent processing failed: {str(agent_error)}")
+                response = "I apologize, but I encountered an error processing your request. Please try again or contact our technical support team."
+        else:
+            # Handle uncertain or low confidence classifications with a probing response
+            print(f"[WORKFLOW] Uncertain intent classification ({intent_type}, confidence: {confidence})")
+            # Send typing indicator
+            await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": True})
+            response = await intent_classifier.generate_probing_response(
+                user_input,
+                session.conversation_history,
+                on_delta=make_delta_sender(client_id, "chat")
+            )
+            # Stop typing indicator
+            await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": False})
+        
+        # Add assistant response to conversation history
+        print("[WORKFLOW] Adding assistant response to conversation history")
+        response_message = Message("assistant", response)
+        response_timestamp = response_message.timestamp
+        await session_store.append_message(client_id, session, response_message)
+        
+        # Send the response back to the client
         await manager.send_message(client_id, {
-            "type": "init",
-            "data": {
-                "ticket_id": session["ticket_id"],
-                "conversation_history": session["conversation_history"],
-                "current_summary": session["current_summary"],
-                "actions": session["actions"],
-                "recommendations": session["recommendations"],
-                "routing": session["routing"],
-                "time_estimate": session["time_estimate"]
-            }
+            "type": "message",
+            "role": "assistant",
+            "content": response,
+            "timestamp": response_timestamp
         })
+    except asyncio.CancelledError:
+        # Superseded by a newer message, which gets the typing indicator again if needed
+        if speculation is not None:
+            speculation.cancel()
+        await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": False})
+        raise
+
+@app.websocket("/ws/{client_id}")
+async def websocket_endpoint(websocket: WebSocket, client_id: str):
+    session = await get_or_create_session(client_id)
+    # Keep the session in memory for as long as the client is connected
+    session_store.pin(client_id, session)
+    # A reconnecting client passes the last sequence number it received
+    last_seq = websocket.query_params.get("last_seq")
+    # Joining the ticket's topic lets admin actions on any worker reach this client
+    resumed = await manager.connect(
+        websocket, client_id, topics=[f"ticket:{session.ticket_id}"],
+        last_seq=int(last_seq) if last_seq and last_seq.isdigit() else None,
+        stream=websocket.query_params.get("stream")
+    )
+    
+    try:
+        if resumed:
+            print(f"[WEBSOCKET] Client #{client_id} resumed after message {last_seq}")
+        else:
+            # Send initial state to the client, with the replay position it starts from
+            stream, seq = manager.replay_position(client_id)
+            await manager.send_message(client_id, {
+                "type": "init",
+                "data": session.to_dict(),
+                "stream": stream,
+                "seq": seq
+            })
         
         while True:
             data = await websocket.receive_json()
@@ -625,14 +1091,11 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
             if data["type"] == "message":
                 user_input = data["content"]
                 # Add user message to conversation history
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                received_at = int(time.time())
+                timestamp = format_timestamp(received_at)
                 print(f"[WORKFLOW] Received user input at {timestamp}")
                 
-                session["conversation_history"].append({
-                    "role": "user",
-                    "content": user_input,
-                    "timestamp": timestamp
-                })
+                await session_store.append_message(client_id, session, Message("user", user_input, received_at))
                 
                 # Send acknowledgment that message was received
                 await manager.send_message(client_id, {
@@ -640,229 +1103,16 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                     "timestamp": timestamp
                 })
                 
-                # Classify user intent before processing
-                print("[WORKFLOW] Classifying user intent")
-                classification = intent_classifier.classify_intent(user_input)
-                intent_type = classification.get("intent", "unknown")
-                confidence = classification.get("confidence", 0.0)
-                
-                print(f"[WORKFLOW] Classified intent: {intent_type}, Confidence: {confidence}")
-                
-                # Format conversation for agents
-                formatted_conversation = format_conversation_history(session["conversation_history"])
-                
-                # Generate response based on intent classification
-                if intent_type == "greeting" and confidence > 0.6:
-                    # Simple greeting - no need for agent pipeline
-                    print("[WORKFLOW] Handling as simple greeting")
-                    # Send typing indicator
-                    await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": True})
-                    response = intent_classifier.generate_casual_response(
-                        user_input, 
-                        session["conversation_history"]
-                    )
-                    # Stop typing indicator
-                    await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": False})
-                
-                elif intent_type == "farewell" and confidence > 0.6:
-                    # Simple farewell - no need for agent pipeline
-                    print("[WORKFLOW] Handling as farewell")
-                    # Send typing indicator
-                    await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": True})
-                    response = intent_classifier.generate_casual_response(
-                        user_input, 
-                        session["conversation_history"]
-                    )
-                    # Stop typing indicator
-                    await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": False})
-                
-                elif intent_type == "casual" or (intent_type == "issue" and confidence < 0.8):
-                    # Casual conversation or vague mention of a problem - don't activate full pipeline
-                    print("[WORKFLOW] Handling as casual conversation or vague problem mention")
-                    # Send typing indicator
-                    await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": True})
-                    response = intent_classifier.generate_probing_response(
-                        user_input,
-                        session["conversation_history"]
-                    )
-                    # Stop typing indicator
-                    await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": False})
-                
-                elif intent_type == "issue" and confidence >= 0.7:
-                    # Specific support issue - activate full agent pipeline
-                    print("[WORKFLOW] Processing specific support issue with full agent pipeline")
-                    # Send typing indicator
-                    await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": True})
-                    
-                    try:
-                        # Activate all agents in parallel
-                        print("[WORKFLOW] Starting agent processing sequence")
-                        
-                        # Summary Generation
-                        print("[WORKFLOW] Calling Summary Agent")
-                        summary = summary_agent.generate_summary(formatted_conversation)
-                        session["current_summary"] = summary
-                        print(f"[WORKFLOW] Summary generated: {summary[:50]}...")
-                        await manager.send_message(client_id, {
-                            "type": "update_summary",
-                            "data": summary
-                        })
-                        
-                        # Action Extraction
-                        print("[WORKFLOW] Calling Action Agent")
-                        actions = action_agent.extract_actions(formatted_conversation, summary)
-                        session["actions"] = actions
-                        print(f"[WORKFLOW] Actions extracted: {len(actions)} actions found")
-                        await manager.send_message(client_id, {
-                            "type": "update_actions",
-                            "data": actions
-                        })
-                        
-                        # Resolution Recommendation
-                        print("[WORKFLOW] Calling Recommendation Agent")
-                        try:
-                            # Ensure summary is a string and not None
-                            summary_text = summary if summary and isinstance(summary, str) else "No summary available"
-                            recommendations = recommendation_agent.generate_recommendations(
-                                formatted_conversation, 
-                                summary_text, 
-                                actions if actions else []
-                            )
-                            session["recommendations"] = recommendations
-                            print(f"[WORKFLOW] Recommendations generated: {len(recommendations)} recommendations found")
-                            await manager.send_message(client_id, {
-                                "type": "update_recommendations",
-                                "data": recommendations
-                            })
-                        except Exception as rec_error:
-                            print(f"[WORKFLOW] ERROR in Recommendation Agent: {str(rec_error)}")
-                            session["recommendations"] = ["Unable to generate recommendations at this time."]
-                            await manager.send_message(client_id, {
-                                "type": "update_recommendations",
-                                "data": session["recommendations"]
-                            })
-                        
-                        # Task Routing
-                        print("[WORKFLOW] Calling Routing Agent")
-                        routing = routing_agent.determine_routing(formatted_conversation, actions)
-                        session["routing"] = routing
-                        print(f"[WORKFLOW] Routing determined: Primary team - {routing.get('primary_team', 'None')}")
-                        await manager.send_message(client_id, {
-                            "type": "update_routing",
-                            "data": routing
-                        })
-                        
-                        # Time Estimation
-                        print("[WORKFLOW] Calling Time Estimation Agent")
-                        try:
-                            time_estimate = time_agent.estimate_resolution_time(formatted_conversation, actions, routing)
-                            session["time_estimate"] = time_estimate
-                            print(f"[WORKFLOW] Time estimated: {time_estimate[:50] if time_estimate else 'None'}...")
-                            await manager.send_message(client_id, {
-                                "type": "update_time_estimate",
-                                "data": time_estimate
-                            })
-                        except Exception as time_error:
-                            print(f"[WORKFLOW] ERROR in Time Estimation Agent: {str(time_error)}")
-                            session["time_estimate"] = "Unable to estimate resolution time at this moment."
-                            await manager.send_message(client_id, {
-                                "type": "update_time_estimate",
-                                "data": session["time_estimate"]
-                            })
-                        
-                        # Generate response based on agent outputs
-                        print("[WORKFLOW] Generating response to user")
-                        try:
-                            # Create a more detailed response using the available information
-                            response_parts = ["Thank you for your message."]
-                            
-                            # Add recommendations with proper formatting
-                            if session['recommendations'] and len(session['recommendations']) > 0:
-                                # Include the first recommendation
-                                first_rec = session['recommendations'][0]
-                                response_parts.append(f"I recommend you: {first_rec}")
-                                
-                                # Add second recommendation if available
-                                if len(session['recommendations']) > 1:
-                                    response_parts.append(f"Additionally, you could try: {session['recommendations'][1]}")
-                            else:
-                                response_parts.append("I'll look into this for you and provide a solution shortly.")
-                            
-                            # Add time estimate if available
-                            if session['time_estimate'] and "Estimated Resolution Time:" in session['time_estimate']:
-                                time_line = next((line for line in session['time_estimate'].split('\n') if "Estimated Resolution Time:" in line), None)
-                                if time_line:
-                                    estimated_time = time_line.split("Estimated Resolution Time:")[1].strip()
-                                    response_parts.append(f"I expect this will take approximately {estimated_time} to resolve.")
-                            
-                            # Combine parts with proper spacing
-                            response = " ".join(response_parts)
-                            print(f"[WORKFLOW] Response generated: {response}")
-                        except Exception as resp_error:
-                            print(f"[WORKFLOW] Error generating response: {str(resp_error)}")
-                            response = "Thank you for providing those details. I'll analyze your issue and work on a solution for you."
-
-                        # Stop typing indicator
-                        await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": False})
-                        
-                        # Save to database
-                        try:
-                            print("[WORKFLOW] Saving ticket to database")
-                            ticket_data = {
-                                "ticket_id": session["ticket_id"],
-                                "conversation": session["conversation_history"],
-                                "summary": summary,
-                                "actions": actions,
-                                "recommendations": session["recommendations"],
-                                "routing": routing,
-                                "time_estimate": session["time_estimate"],
-                                "timestamp": timestamp
-                            }
-                            save_success = supabase_client.save_ticket(ticket_data)
-                            if save_success:
-                                print(f"[WORKFLOW] Ticket saved successfully: {session['ticket_id']}")
-                            else:
-                                print(f"[WORKFLOW] Failed to save ticket: {session['ticket_id']}")
-                        except Exception as db_error:
-                            print(f"[WORKFLOW] ERROR: Database save failed: {str(db_error)}")
-                    except Exception as agent_error:
-                        print(f"[WORKFLOW] ERROR: Agent processing failed: {str(agent_error)}")
-                        response = "I apologize, but I encountered an error processing your request. Please try again or contact our technical support team."
-                else:
-                    # Handle uncertain or low confidence classifications with a probing response
-                    print(f"[WORKFLOW] Uncertain intent classification ({intent_type}, confidence: {confidence})")
-                    # Send typing indicator
-                    await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": True})
-                    response = intent_classifier.generate_probing_response(
-                        user_input,
-                        session["conversation_history"]
-                    )
-                    # Stop typing indicator
-                    await manager.send_message(client_id, {"type": "typing_indicator", "isTyping": False})
-                
-                # Add assistant response to conversation history
-                print("[WORKFLOW] Adding assistant response to conversation history")
-                response_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                session["conversation_history"].append({            
-                    "role": "assistant",
-                    "content": response,
-                    "timestamp": response_timestamp
-                })
-                
-                # Send the response back to the client
-                await manager.send_message(client_id, {
-                    "type": "message",
-                    "role": "assistant",
-                    "content": response,
-                    "timestamp": response_timestamp
-                })
+                # Answer in the background so control messages are handled meanwhile;
+                # a newer message cancels this turn and answers the conversation as a whole
+                turn_runner.start(client_id, functools.partial(run_turn, client_id, session, user_input, timestamp))
             
             elif data["type"] == "update_status":
                 new_status = data["status"]
                 with_db = data.get("with_db", False)
                 
                 if with_db:
-                    success = supabase_client.update_ticket_status(session["ticket_id"], new_status)
+                    success = await async_supabase_client.update_ticket_status(session.ticket_id, new_status)
                     await manager.send_message(client_id, {
                         "type": "status_update_result",
                         "success": success,
@@ -877,25 +1127,32 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
                     })
     
     except WebSocketDisconnect:
-        manager.disconnect(client_id)
+        await manager.disconnect(client_id, websocket)
         print(f"[WEBSOCKET] Client #{client_id} disconnected")
     except Exception as e:
         print(f"[WEBSOCKET] Error: {str(e)}")
-        manager.disconnect(client_id)
+        await manager.disconnect(client_id, websocket)
+    finally:
+        # Let a turn still running store its results before the session may be evicted
+        await turn_runner.wait(client_id)
+        session_store.unpin(client_id)
 
 @app.get("/api/session/{session_id}")
-async def get_session(session_id: str):
-    """Get session data for a given session ID"""
-    session = get_or_create_session(session_id)
-    return {
-        "ticket_id": session["ticket_id"],
-        "conversation_history": session["conversation_history"],
-        "current_summary": session["current_summary"],
-        "actions": session["actions"],
-        "recommendations": session["recommendations"],
-        "routing": session["routing"],
-        "time_estimate": session["time_estimate"]
-    }
+async def get_session(session_id: str, since_seq: int = None, stream: str = None):
+    """
+    Get session data for a given session ID.
+
+    With since_seq and stream from an earlier response or WebSocket message,
+    only the messages sent after it are returned, as long as this worker still
+    has them; otherwise the full session data is returned.
+    """
+    if since_seq is not None and stream:
+        events = manager.replay_events(session_id, since_seq, stream)
+        if events is not None:
+            return {"stream": stream, "seq": since_seq + len(events), "events": events}
+    session = await get_or_create_session(session_id)
+    current_stream, seq = manager.replay_position(session_id)
+    return {**session.to_dict(), "stream": current_stream, "seq": seq}
 
 @app.get("/api/metrics")
 async def get_metrics():
@@ -926,6 +1183,54 @@ async def get_metrics():
             "db_status": "Connected" if supabase_client._initialized and supabase_client.client else "Disconnected"
         }
 
+@app.get("/api/admin/pipeline-mode")
+async def get_pipeline_mode():
+    """Get the current issue pipeline mode"""
+    return {
+        "mode": pipeline_settings["mode"],
+        "available_modes": list(PIPELINE_MODES),
+        "speculative": pipeline_settings["speculative"]
+    }
+
+@app.put("/api/admin/pipeline-mode")
+async def set_pipeline_mode(data: dict):
+    """Switch between per-agent and fused issue analysis and toggle speculative execution"""
+    mode = data.get("mode", pipeline_settings["mode"])
+    if mode not in PIPELINE_MODES:
+        raise HTTPException(status_code=400, detail=f"Mode must be one of: {', '.join(PIPELINE_MODES)}")
+    pipeline_settings["mode"] = mode
+    if "speculative" in data:
+        pipeline_settings["speculative"] = bool(data["speculative"])
+    print(f"[APP] Issue pipeline mode set to {mode}, speculative: {pipeline_settings['speculative']}")
+    return {"success": True, "mode": mode, "speculative": pipeline_settings["speculative"]}
+
+@app.get("/api/admin/performance")
+async def get_performance_stats():
+    """Get runtime statistics for the LLM layer"""
+    return {
+        "llm_cache": LLMCache.get_shared().get_stats(),
+        "llm_singleflight": SingleFlight.get_shared().get_stats(),
+        "llm_scheduler": LLMScheduler.get_shared().get_stats(),
+        "speculation": Speculation.get_shared().get_stats(),
+        "intent_classifier": intent_classifier.get_classifier_stats(),
+        "fast_responder": fast_responder.get_stats(),
+        "summary": {**summary_agent.stats, "full_refresh_every": summary_agent.full_refresh_every},
+        "context": ContextBuilder.get_shared().get_stats(),
+        "sessions": session_store.get_stats(),
+        "connections": manager.get_stats(),
+        "turns": turn_runner.get_stats(),
+        "database": async_supabase_client.get_stats(),
+        "ticket_ids": TicketIdGenerator.get_shared().get_stats(),
+        "ticket_writer": ticket_writer.get_stats(),
+        "ticket_cache": supabase_client.get_ticket_cache_stats()
+    }
+
+@app.post("/api/admin/intent-model/reload")
+async def reload_intent_model():
+    """Load a newly trained local intent model without restarting"""
+    loaded = intent_classifier.load_local_model()
+    return {"success": loaded, "stats": intent_classifier.get_classifier_stats()}
+
 @app.get("/api/health")
 async def health_check():
     """Simple health check endpoint"""
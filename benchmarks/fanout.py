@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.connection_manager import ConnectionManager, LocalBroker, RedisBroker
+from utils.redis_client import create_redis_client
+
+
+class FakeWebSocket:
+    """Stands in for a client connection and counts what it receives."""
+
+    def __init__(self, counter, delay=0):
+        self.counter = counter
+        self.delay = delay
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.counter[0] += 1
+
+    async def close(self, code=1000):
+        pass
+
+
+async def wait_for(counter, expected, timeout=60):
+    """Wait until the sockets received the expected number of messages."""
+    deadline = time.perf_counter() + timeout
+    while counter[0] < expected:
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"only {counter[0]} of {expected} messages delivered")
+        await asyncio.sleep(0)
+
+
+async def run(args):
+    if args.redis_url:
+        client = create_redis_client(args.redis_url)
+        brokers = [RedisBroker(client) for _ in range(args.workers)]
+    else:
+        shared = LocalBroker()
+        brokers = [shared] * args.workers
+    managers = [ConnectionManager(broker, worker_id=f"worker-{i}") for i, broker in enumerate(brokers)]
+
+    counter = [0]
+    slow_counter = [0]
+    started = time.perf_counter()
+    for i in range(args.sockets):
+        await managers[i % args.workers].connect(FakeWebSocket(counter), f"client-{i}")
+    # Slow clients must not hold up delivery to the others
+    for i in range(args.slow):
+        await managers[i % args.workers].connect(FakeWebSocket(slow_counter, args.slow_delay), f"slow-{i}")
+    print(f"[BENCH] Connected {args.sockets} sockets ({args.slow} slow) to {args.workers} workers "
+          f"({type(brokers[0]).__name__}) in {time.perf_counter() - started:.2f}s")
+
+    message = {"type": "status_update_result", "success": True, "status": "In Progress"}
+
+    # Broadcast from one worker to every socket on every worker
+    counter[0] = 0
+    started = time.perf_counter()
+    for _ in range(args.messages):
+        await managers[0].broadcast(message)
+    await wait_for(counter, args.sockets * args.messages)
+    elapsed = time.perf_counter() - started
+    print(f"[BENCH] broadcast: {args.messages} x {args.sockets} sockets in {elapsed:.2f}s, "
+          f"{counter[0] / elapsed:,.0f} deliveries/s")
+
+    # Addressed sends from one worker, most of them to clients on other workers
+    counter[0] = 0
+    started = time.perf_counter()
+    for i in range(args.sockets):
+        await managers[0].send_message(f"client-{i}", message)
+    await wait_for(counter, args.sockets)
+    elapsed = time.perf_counter() - started
+    print(f"[BENCH] send_message: {args.sockets} clients in {elapsed:.2f}s, {counter[0] / elapsed:,.0f} messages/s")
+
+    # Fast clients were served above while the slow ones still had broadcasts queued
+    stats = [manager.get_stats() for manager in managers]
+    print(f"[BENCH] slow clients had received {slow_counter[0]} of {args.slow * args.messages} broadcasts, "
+          f"max queue depth {max(s['max_queue_depth'] for s in stats)}")
+    started = time.perf_counter()
+    await wait_for(slow_counter, args.slow * args.messages)
+    stats = [manager.get_stats() for manager in managers]
+    print(f"[BENCH] slow clients caught up {time.perf_counter() - started:.2f}s later; "
+          f"coalesced {sum(s['coalesced'] for s in stats)}, dropped {sum(s['dropped'] for s in stats)}, "
+          f"slow disconnects {sum(s['slow_disconnects'] for s in stats)}")
+
+    for manager in managers:
+        await manager.close()
+    if args.redis_url:
+        await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure WebSocket fan-out through the connection manager")
+    parser.add_argument("--sockets", type=int, default=10000, help="Connected sockets")
+    parser.add_argument("--workers", type=int, default=4, help="Simulated workers sharing the broker")
+    parser.add_argument("--messages", type=int, default=10, help="Broadcasts to send")
+    parser.add_argument("--slow", type=int, default=10, help="Additional clients that are slow to receive")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="Seconds each send to a slow client takes")
+    parser.add_argument("--redis-url", help="Use RedisBroker on this Redis instead of LocalBroker")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
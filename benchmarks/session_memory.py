@@ -0,0 +1,100 @@
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.session import Session
+from utils.transcript import Message
+
+SAMPLE_MESSAGES = [
+    ("user", "Hi, I can't log in to my account since this morning"),
+    ("assistant", "Sorry to hear that. Could you tell me what error message you see?"),
+    ("user", "It says error 403 forbidden after I enter my password"),
+    ("assistant", "Thanks. Have you changed your password recently or enabled two-factor authentication?"),
+    ("user", "No changes, it worked fine yesterday"),
+    ("assistant", "I'll escalate this to our account team and get back to you shortly."),
+]
+
+
+def message_content(session_index, message_index):
+    role, text = SAMPLE_MESSAGES[message_index % len(SAMPLE_MESSAGES)]
+    # Unique text per session so content is not shared between sessions
+    return role, f"{text} (ref {session_index}-{message_index})"
+
+
+def build_dict_sessions(count, messages, started):
+    """The previous representation: a dict per session and a dict per message."""
+    sessions = {}
+    for i in range(count):
+        history = []
+        for j in range(messages):
+            role, content = message_content(i, j)
+            history.append({
+                "role": role,
+                "content": content,
+                "timestamp": datetime.fromtimestamp(started + j).strftime("%Y-%m-%d %H:%M:%S")
+            })
+        sessions[f"client-{i}"] = {
+            "ticket_id": f"TICKET-{started}-{i}",
+            "conversation_history": history,
+            "current_summary": "",
+            "actions": [],
+            "recommendations": [],
+            "routing": {},
+            "time_estimate": ""
+        }
+    return sessions
+
+
+def build_compact_sessions(count, messages, started):
+    """The current representation: Session and Message slot classes with epoch timestamps."""
+    sessions = {}
+    for i in range(count):
+        session = Session(f"TICKET-{started}-{i}")
+        for j in range(messages):
+            role, content = message_content(i, j)
+            session.conversation_history.append(Message(role, content, started + j))
+        # Agents read the rendered text every turn; it is joined on demand, not kept
+        session.conversation_history.text
+        sessions[f"client-{i}"] = session
+    return sessions
+
+
+def measure(builder, count, messages):
+    """Return (bytes per session, build seconds) for one representation."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    sessions = builder(count, messages, int(time.time()))
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del sessions
+    return used / count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory per session for the session representations")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10000, 100000], help="Session counts to test")
+    parser.add_argument("--messages", type=int, default=6, help="Messages per session")
+    args = parser.parse_args()
+
+    print(f"[BENCH] {args.messages} messages per session")
+    print(f"[BENCH] {'sessions':>9} {'dict B/session':>15} {'compact B/session':>18} {'saved':>7}")
+    for count in args.sessions:
+        dict_bytes, dict_time = measure(build_dict_sessions, count, args.messages)
+        compact_bytes, compact_time = measure(build_compact_sessions, count, args.messages)
+        saved = 1 - compact_bytes / dict_bytes
+        print(f"[BENCH] {count:>9} {dict_bytes:>15.0f} {compact_bytes:>18.0f} {saved:>7.1%}"
+              f"   (build {dict_time:.2f}s vs {compact_time:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
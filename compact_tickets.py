@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import re
+
+from database.async_supabase_client import AsyncSupabaseClient
+from database.supabase_client import SupabaseClient
+
+# Rows the old ID probing added for later turns of a ticket: TICKET-1712345678-2, -3, ...
+# The base must itself end in a number, so distinct IDs like T-1 and T-2 are never merged
+SUFFIX_PATTERN = re.compile(r"^(?P<base>.+-\d+)-(?P<number>\d{1,3})$")
+# Later statuses win when duplicates disagree, e.g. one row was resolved by an agent
+STATUS_RANK = {"Open": 1, "In Progress": 2, "Resolved": 3}
+
+
+def group_duplicates(rows):
+    """
+    Group rows that the old ID probing created for one ticket.
+
+    Args:
+        rows (iterable): Ticket rows
+
+    Returns:
+        dict: Base ticket ID to its rows, oldest first, for tickets with more than one row
+    """
+    groups = {}
+    for row in rows:
+        match = SUFFIX_PATTERN.match(row["ticket_id"])
+        base, number = (match["base"], int(match["number"])) if match else (row["ticket_id"], 0)
+        groups.setdefault(base, []).append((number, row))
+    return {
+        base: [row for _, row in sorted(members, key=lambda member: member[0])]
+        for base, members in groups.items() if len(members) > 1
+    }
+
+
+def merge_rows(base, rows):
+    """
+    Merge the rows of one ticket into a single row.
+
+    Args:
+        base (str): Ticket ID the merged row is stored under
+        rows (list): The ticket's rows, oldest first
+
+    Returns:
+        dict: Row with the latest non-empty value of each column and the most
+            advanced resolution status
+    """
+    merged = {column: None for column in SupabaseClient.TICKET_FIELDS}
+    for row in rows:
+        merged.update({column: value for column, value in row.items() if value not in (None, "")})
+    status_row = max(rows, key=lambda row: STATUS_RANK.get(row.get("resolution_status"), 0))
+    merged["resolution_status"] = status_row.get("resolution_status") or merged["resolution_status"]
+    merged["date_of_resolution"] = status_row.get("date_of_resolution") or merged["date_of_resolution"]
+    merged["ticket_id"] = base
+    return merged
+
+
+async def compact(client, dry_run=False, page_size=1000, batch_size=100):
+    """
+    Merge duplicate-suffix ticket rows into one row per ticket.
+
+    The merged row is written before the duplicates are deleted, so an
+    interrupted run loses nothing and can simply be run again.
+
+    Args:
+        client (AsyncSupabaseClient): Database client
+        dry_run (bool): Only report what would be merged
+        page_size (int): Rows read per request
+        batch_size (int): Tickets written and deleted per request
+
+    Returns:
+        dict: Counts of rows scanned, tickets merged and rows deleted
+    """
+    rows = [row async for row in client.iter_ticket_rows(page_size=page_size)]
+    groups = group_duplicates(rows)
+    duplicates = sum(len(members) - 1 for members in groups.values())
+    print(f"[COMPACT] Scanned {len(rows)} rows: {len(groups)} tickets have {duplicates} duplicate rows")
+
+    bases = list(groups)
+    deleted = 0
+    for start in range(0, len(bases), batch_size):
+        batch = bases[start:start + batch_size]
+        merged = [merge_rows(base, groups[base]) for base in batch]
+        stale = [row["ticket_id"] for base in batch for row in groups[base] if row["ticket_id"] != base]
+        if dry_run:
+            for base in batch:
+                print(f"[COMPACT] Would merge {', '.join(row['ticket_id'] for row in groups[base])} into {base}")
+            continue
+        if not await client.upsert_tickets(merged):
+            print("[COMPACT] Writing merged tickets failed; stopping, run again to continue")
+            break
+        if not await client.delete_tickets(stale):
+            print("[COMPACT] Deleting duplicate rows failed; stopping, run again to continue")
+            break
+        deleted += len(stale)
+        print(f"[COMPACT] Merged {min(start + batch_size, len(bases))}/{len(bases)} tickets")
+
+    return {"scanned": len(rows), "tickets": len(groups), "duplicates": duplicates, "deleted": deleted}
+
+
+async def run(args):
+    client = AsyncSupabaseClient()
+    try:
+        result = await compact(client, dry_run=args.dry_run, page_size=args.page_size, batch_size=args.batch_size)
+    finally:
+        await client.aclose()
+    print(f"[COMPACT] Done: {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the -2, -3, ... rows saved per issue turn into one row per ticket")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the tickets that would be merged")
+    parser.add_argument("--page-size", type=int, default=1000, help="Rows read per request")
+    parser.add_argument("--batch-size", type=int, default=100, help="Tickets written and deleted per request")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
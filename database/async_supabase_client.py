@@ -0,0 +1,640 @@
+import asyncio
+import copy
+import json
+import os
+import time
+from datetime import datetime
+
+import httpx
+
+from database.supabase_client import SupabaseClient
+
+# SUPABASE_URL value that selects an in-process stand-in instead of a server
+LOCAL_POSTGREST_URL = "local://"
+
+
+class AsyncSupabaseClient:
+    """
+    Non-blocking client for the Supabase tickets table, for async request handlers.
+
+    Talks to the PostgREST API directly over a pooled httpx.AsyncClient. Up to
+    SUPABASE_MAX_CONCURRENCY queries run at once, so concurrent handlers share
+    the pool instead of each waiting for a blocking round trip. Methods mirror
+    SupabaseClient, with the same return values and fallbacks, and accept a
+    per-call timeout. SupabaseClient stays the client for synchronous callers.
+    """
+
+    # Shared instance used by the app
+    _shared = None
+
+    def __init__(self, url=None, key=None, table_name=None, timeout=None, connect_timeout=None,
+                 max_connections=None, max_concurrency=None, transport=None):
+        """
+        Initialize the client. Every setting falls back to an environment variable.
+
+        Args:
+            url (str, optional): Supabase project URL (SUPABASE_URL); "local://" uses
+                an in-process LocalPostgREST
+            key (str, optional): API key (SUPABASE_KEY)
+            table_name (str, optional): Tickets table (SUPABASE_TABLE)
+            timeout (float, optional): Default seconds a query may take (SUPABASE_TIMEOUT)
+            connect_timeout (float, optional): Connect timeout in seconds (SUPABASE_CONNECT_TIMEOUT)
+            max_connections (int, optional): Maximum open connections (SUPABASE_MAX_CONNECTIONS)
+            max_concurrency (int, optional): Queries in flight at most (SUPABASE_MAX_CONCURRENCY)
+            transport (httpx.AsyncBaseTransport, optional): Transport to send requests with
+        """
+        # Row conversions and sample data are shared with the sync client
+        self.sync_client = SupabaseClient()
+        self.url = url or self.sync_client.url
+        self.key = key or self.sync_client.key
+        self.table_name = table_name or self.sync_client.table_name
+        self.timeout = httpx.Timeout(
+            timeout if timeout is not None else float(os.environ.get("SUPABASE_TIMEOUT", "10")),
+            connect=connect_timeout if connect_timeout is not None else float(os.environ.get("SUPABASE_CONNECT_TIMEOUT", "5"))
+        )
+        max_connections = max_connections or int(os.environ.get("SUPABASE_MAX_CONNECTIONS", "20"))
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.max_concurrency = max_concurrency or int(os.environ.get("SUPABASE_MAX_CONCURRENCY", str(max_connections)))
+        self.transport = transport
+        self.local_db = None
+        if self.url == LOCAL_POSTGREST_URL and transport is None:
+            print("[DATABASE] Using LocalPostgREST in-process database")
+            self.local_db = LocalPostgREST()
+            self.transport = self.local_db.transport()
+        self._client = None
+        self._loop = None
+        self._semaphore = None
+        self.stats = {"queries": 0, "errors": 0, "timeouts": 0, "in_flight": 0, "max_in_flight": 0, "total_ms": 0.0}
+
+    @classmethod
+    def get_shared(cls):
+        """Return the process-wide client, creating it on first use."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def _get_client(self):
+        """Return the pooled client and concurrency limit bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # Pools cannot be shared across event loops (e.g. repeated asyncio.run in scripts)
+            base_url = "http://localpostgrest" if self.url == LOCAL_POSTGREST_URL else self.url.rstrip("/")
+            self._client = httpx.AsyncClient(
+                base_url=f"{base_url}/rest/v1",
+                headers={"apikey": self.key, "Authorization": f"Bearer {self.key}"},
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self.transport
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client
+
+    async def _request(self, method, params=None, json_body=None, prefer=None, timeout=None):
+        """
+        Run one PostgREST request against the tickets table.
+
+        Args:
+            method (str): HTTP method: GET selects, POST inserts, PATCH updates, DELETE deletes
+            params (dict, optional): Query parameters, e.g. {"ticket_id": "eq.TICKET-1"}
+            json_body (dict or list, optional): Rows to write
+            prefer (str, optional): PostgREST Prefer header
+            timeout (float, optional): Seconds this request may take
+
+        Returns:
+            list: Rows returned by PostgREST
+
+        Raises:
+            httpx.HTTPError: If the request fails or times out
+        """
+        client = self._get_client()
+        headers = {"Prefer": prefer} if prefer else None
+        async with self._semaphore:
+            self.stats["queries"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+            started = time.perf_counter()
+            try:
+                response = await client.request(
+                    method, f"/{self.table_name}", params=params, json=json_body, headers=headers,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+                )
+                response.raise_for_status()
+            except httpx.TimeoutException:
+                self.stats["timeouts"] += 1
+                raise
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+            finally:
+                self.stats["in_flight"] -= 1
+                self.stats["total_ms"] += (time.perf_counter() - started) * 1000
+        return response.json() if response.content else []
+
+    async def check_ticket_exists(self, ticket_id, timeout=None):
+        """
+        Check if a ticket with the given ID already exists.
+
+        Args:
+            ticket_id (str): The ticket ID to check
+            timeout (float, optional): Seconds the query may take
+
+        Returns:
+            bool: True if ticket exists, False otherwise
+        """
+        print(f"[DATABASE] Checking if ticket {ticket_id} already exists...")
+        try:
+            rows = await self._request("GET", {"select": "ticket_id", "ticket_id": f"eq.{ticket_id}"}, timeout=timeout)
+            exists = len(rows) > 0
+            print(f"[DATABASE] Ticket {ticket_id} exists: {exists}")
+            return exists
+        except Exception as e:
+            print(f"[DATABASE] Error checking if ticket exists: {str(e)}")
+            return False
+
+    async def save_ticket(self, ticket_data, timeout=None):
+        """
+        Save a ticket to the database.
+
+        Args:
+            ticket_data (dict): Ticket data to save
+            timeout (float, optional): Seconds the query may take
+
+        Returns:
+            bool: Success status
+        """
+        ticket_id = ticket_data.get('ticket_id', 'unknown')
+        print(f"[DATABASE] Attempting to save ticket {ticket_id}...")
+        if await self.upsert_tickets([self.ticket_row(ticket_data)], timeout=timeout):
+            print(f"[DATABASE] Ticket {ticket_id} saved successfully to Supabase.")
+            return True
+        return False
+
+    def ticket_row(self, ticket_data):
+        """
+        Convert ticket data from the agents into a row of the tickets table.
+
+        Args:
+            ticket_data (dict): Ticket data with ticket_id, summary, actions, recommendations and routing
+
+        Returns:
+            dict: Row matching the table schema
+        """
+        return self.sync_client._ticket_row(ticket_data, ticket_data.get('ticket_id', 'unknown'))
+
+    async def upsert_tickets(self, rows, timeout=None):
+        """
+        Write ticket rows, inserting new tickets and updating saved ones.
+
+        Rows may hold only some columns, e.g. the ones that changed; the other
+        columns of a saved ticket are left as they are. PostgREST writes the
+        same columns for every row of a request, so there is one request per
+        set of columns.
+
+        Args:
+            rows (list): Rows with ticket_id and any other columns of the table
+            timeout (float, optional): Seconds each query may take
+
+        Returns:
+            bool: Success status
+        """
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        try:
+            for columns, group in groups.items():
+                await self._request(
+                    "POST", {"on_conflict": "ticket_id", "columns": ",".join(columns)}, json_body=group,
+                    prefer="resolution=merge-duplicates", timeout=timeout
+                )
+            return True
+        except Exception as e:
+            print(f"[DATABASE] Error saving {len(rows)} tickets to Supabase: {str(e)}")
+            return False
+        finally:
+            # Also after a failure, since some groups may have been written
+            for row in rows:
+                self.sync_client.invalidate_ticket(row["ticket_id"])
+
+    async def insert_tickets(self, rows, timeout=None):
+        """
+        Insert new tickets, leaving tickets that already exist untouched.
+
+        A ticket that already exists with the same values as its row counts as
+        inserted, e.g. by an earlier request that timed out after reaching the
+        database.
+
+        Args:
+            rows (list): Rows with ticket_id and any other columns of the table
+            timeout (float, optional): Seconds each query may take
+
+        Returns:
+            list: IDs of the rows that were not inserted because another ticket
+                has the ID, or None if the query fails
+        """
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        try:
+            inserted = set()
+            for columns, group in groups.items():
+                written = await self._request(
+                    "POST", {"on_conflict": "ticket_id", "columns": ",".join(columns)}, json_body=group,
+                    prefer="resolution=ignore-duplicates,return=representation", timeout=timeout
+                )
+                inserted.update(row["ticket_id"] for row in written)
+            skipped = [row for row in rows if row["ticket_id"] not in inserted]
+            if not skipped:
+                return []
+            existing = await self._request(
+                "GET", {"select": "*", "ticket_id": f"in.({','.join(row['ticket_id'] for row in skipped)})"},
+                timeout=timeout
+            )
+            existing = {row["ticket_id"]: row for row in existing}
+            return [
+                row["ticket_id"] for row in skipped
+                if any(existing.get(row["ticket_id"], {}).get(column) != value for column, value in row.items())
+            ]
+        except Exception as e:
+            print(f"[DATABASE] Error inserting {len(rows)} tickets into Supabase: {str(e)}")
+            return None
+        finally:
+            for row in rows:
+                self.sync_client.invalidate_ticket(row["ticket_id"])
+
+    async def get_ticket(self, ticket_id, timeout=None):
+        """
+        Retrieve a ticket by ID, from the ticket cache shared with the sync client when possible.
+
+        Args:
+            ticket_id (str): The ticket ID to retrieve
+            timeout (float, optional): Seconds the query may take
+
+        Returns:
+            dict: The ticket data or None if not found
+        """
+        return await self.cached_ticket_read("ticket", ticket_id, lambda: self._load_ticket(ticket_id, timeout))
+
+    async def cached_ticket_read(self, kind, ticket_id, load):
+        """
+        Read ticket data through the sync client's cache for it.
+
+        Args:
+            kind (str): Cache to use ("ticket", "conversations" or "insights")
+            ticket_id (str): The ticket ID
+            load (callable): Returns an awaitable reading the data on a cache miss;
+                None results are not cached
+
+        Returns:
+            A copy of the cached or loaded data, which the caller may change
+        """
+        cache = self.sync_client.ticket_caches[kind]
+        value = cache.get(ticket_id)
+        if value is None:
+            version = self.sync_client.begin_ticket_read(ticket_id)
+            try:
+                value = await load()
+            finally:
+                current = self.sync_client.end_ticket_read(ticket_id, version)
+            if value is None:
+                return None
+            if current:
+                cache.set(ticket_id, value)
+        return copy.deepcopy(value)
+
+    async def _load_ticket(self, ticket_id, timeout):
+        print(f"[DATABASE] Attempting to retrieve ticket {ticket_id}...")
+        try:
+            rows = await self._request("GET", {"select": "*", "ticket_id": f"eq.{ticket_id}"}, timeout=timeout)
+            if rows:
+                print(f"[DATABASE] Ticket {ticket_id} retrieved successfully.")
+                return rows[0]
+            print(f"[DATABASE] Ticket {ticket_id} not found.")
+            return None
+        except Exception as e:
+            print(f"[DATABASE] Error retrieving ticket from Supabase: {str(e)}")
+            return None
+
+    async def get_ticket_conversations(self, ticket_id):
+        """
+        Get conversations for a specific ticket, from the cache shared with the sync client when possible.
+
+        Args:
+            ticket_id (str): The ticket ID
+
+        Returns:
+            list: Conversations or None if not found
+        """
+        async def load():
+            # No conversations table yet: the sync client's sample data needs no query
+            return self.sync_client._load_ticket_conversations(ticket_id)
+        return await self.cached_ticket_read("conversations", ticket_id, load)
+
+    async def get_ticket_insights(self, ticket_id):
+        """
+        Get additional insights for a ticket, from the cache shared with the sync client when possible.
+
+        Args:
+            ticket_id (str): The ticket ID
+
+        Returns:
+            dict: Ticket insights or empty dict if not found
+        """
+        async def load():
+            # No insights table yet: the sync client's sample data needs no query
+            return self.sync_client._load_ticket_insights(ticket_id)
+        return await self.cached_ticket_read("insights", ticket_id, load)
+
+    async def update_ticket(self, ticket_id, update_data, timeout=None):
+        """
+        Update an existing ticket.
+
+        Args:
+            ticket_id (str): The ticket ID to update
+            update_data (dict): The data to update
+            timeout (float, optional): Seconds the query may take
+
+        Returns:
+            bool: Success status
+        """
+        print(f"[DATABASE] Attempting to update ticket {ticket_id}...")
+        filtered_data = {k: v for k, v in update_data.items() if k in SupabaseClient.TICKET_FIELDS}
+        try:
+            await self._request("PATCH", {"ticket_id": f"eq.{ticket_id}"}, json_body=filtered_data, timeout=timeout)
+            self.sync_client.invalidate_ticket(ticket_id)
+            print(f"[DATABASE] Ticket {ticket_id} updated successfully.")
+            return True
+        except Exception as e:
+            print(f"[DATABASE] Error updating ticket in Supabase: {str(e)}")
+            return False
+
+    async def update_ticket_status(self, ticket_id, status, timeout=None):
+        """
+        Update a ticket's resolution status.
+
+        Args:
+            ticket_id (str): The ticket ID to update
+            status (str): The new status ('Open', 'In Progress', 'Resolved')
+            timeout (float, optional): Seconds the query may take
+
+        Returns:
+            bool: Success status
+        """
+        print(f"[DATABASE] Updating ticket {ticket_id} status to {status}...")
+        update_data = {'resolution_status': status}
+        if status.lower() == 'resolved':
+            update_data['date_of_resolution'] = datetime.now().isoformat()
+        try:
+            await self._request("PATCH", {"ticket_id": f"eq.{ticket_id}"}, json_body=update_data, timeout=timeout)
+            self.sync_client.invalidate_ticket(ticket_id)
+            print(f"[DATABASE] Ticket {ticket_id} status updated to {status} successfully.")
+            return True
+        except Exception as e:
+            print(f"[DATABASE] Error updating ticket status in Supabase: {str(e)}")
+            return False
+
+    async def get_all_tickets(self, timeout=None):
+        """
+        Get all tickets from the database.
+
+        Args:
+            timeout (float, optional): Seconds the query may take
+
+        Returns:
+            list: All tickets, or sample tickets if the query fails
+        """
+        print("[DATABASE] Getting all tickets from database...")
+        try:
+            rows = await self._request("GET", {"select": "*"}, timeout=timeout)
+            print(f"[DATABASE] Retrieved {len(rows)} tickets")
+            # Replace None values that might cause issues
+            return [{key: value if value is not None else "" for key, value in row.items()} for row in rows]
+        except Exception as e:
+            print(f"[DATABASE] Error getting all tickets: {str(e)}")
+            return self.sync_client._generate_sample_tickets(15)
+
+    async def get_recent_tickets(self, limit=5, timeout=None):
+        """
+        Get the most recent tickets.
+
+        Args:
+            limit (int): Maximum number of tickets to return
+            timeout (float, optional): Seconds the query may take
+
+        Returns:
+            list: Recent tickets, or sample tickets if the query fails
+        """
+        print(f"[DATABASE] Getting {limit} recent tickets...")
+        try:
+            rows = await self._request(
+                "GET", {"select": "*", "order": "date_of_resolution.desc", "limit": str(limit)}, timeout=timeout
+            )
+            print(f"[DATABASE] Retrieved {len(rows)} recent tickets")
+            return rows
+        except Exception as e:
+            print(f"[DATABASE] Error getting recent tickets: {str(e)}")
+            return self.sync_client._generate_sample_tickets(limit)
+
+    async def iter_ticket_rows(self, page_size=1000, timeout=None):
+        """
+        Read the whole tickets table, a page at a time, in ticket ID order.
+
+        Args:
+            page_size (int): Rows per request
+            timeout (float, optional): Seconds each query may take
+
+        Yields:
+            dict: Rows as stored, None values included
+
+        Raises:
+            httpx.HTTPError: If a query fails
+        """
+        offset = 0
+        while True:
+            rows = await self._request("GET", {
+                "select": "*", "order": "ticket_id.asc", "limit": str(page_size), "offset": str(offset)
+            }, timeout=timeout)
+            for row in rows:
+                yield row
+            if len(rows) < page_size:
+                return
+            offset += page_size
+
+    async def delete_tickets(self, ticket_ids, timeout=None):
+        """
+        Delete tickets.
+
+        Args:
+            ticket_ids (list): IDs of the tickets to delete
+            timeout (float, optional): Seconds the query may take
+
+        Returns:
+            bool: Success status
+        """
+        try:
+            await self._request("DELETE", {"ticket_id": f"in.({','.join(ticket_ids)})"}, timeout=timeout)
+            for ticket_id in ticket_ids:
+                self.sync_client.invalidate_ticket(ticket_id)
+            print(f"[DATABASE] Deleted {len(ticket_ids)} tickets.")
+            return True
+        except Exception as e:
+            print(f"[DATABASE] Error deleting tickets from Supabase: {str(e)}")
+            return False
+
+    async def aclose(self):
+        """Release pooled connections, e.g. on shutdown."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+    def get_stats(self):
+        """
+        Get query counters.
+
+        Returns:
+            dict: Pool limits, queries in flight and query, error and timeout counts
+                with the average latency
+        """
+        queries = self.stats["queries"]
+        return {
+            "backend": "local" if self.local_db is not None else "postgrest",
+            "max_connections": self.limits.max_connections,
+            "max_concurrency": self.max_concurrency,
+            **{key: value for key, value in self.stats.items() if key != "total_ms"},
+            "avg_ms": round(self.stats["total_ms"] / queries, 2) if queries else 0.0
+        }
+
+
+class LocalPostgREST:
+    """
+    In-process stand-in for the subset of the PostgREST API the app uses.
+
+    Serves selects with eq/neq/gt/gte/lt/lte/in/is filters, order, limit and
+    offset, inserts (with on_conflict upserts), updates and deletes on
+    in-memory tables, through an httpx transport. State is private to the
+    process, so it is meant for tests and single-worker runs.
+    """
+
+    def __init__(self, tables=None, primary_key="ticket_id"):
+        """
+        Initialize the database.
+
+        Args:
+            tables (dict, optional): Table name to list of rows to start with
+            primary_key (str): Column that must be unique in every table
+        """
+        self.tables = {name: [dict(row) for row in rows] for name, rows in (tables or {}).items()}
+        self.primary_key = primary_key
+        self.requests = 0
+
+    def transport(self):
+        """Return an httpx transport answering requests from this database."""
+        return httpx.MockTransport(self.handle)
+
+    def handle(self, request):
+        """
+        Answer one PostgREST request.
+
+        Args:
+            request (httpx.Request): The request
+
+        Returns:
+            httpx.Response: PostgREST-style response
+        """
+        self.requests += 1
+        table = self.tables.setdefault(request.url.path.rsplit("/", 1)[-1], [])
+        params = request.url.params
+        filters = [(column, value) for column, value in params.multi_items()
+                   if column not in ("select", "order", "limit", "offset", "on_conflict", "columns")]
+        prefer = request.headers.get("prefer", "")
+
+        if request.method == "GET":
+            rows = [row for row in table if self._matches(row, filters)]
+            for order in reversed(params.get("order", "").split(",") if params.get("order") else []):
+                column, _, direction = order.partition(".")
+                descending = direction.startswith("desc")
+                # None sorts last in both directions, like PostgREST's default for desc
+                present = sorted((row for row in rows if row.get(column) is not None),
+                                 key=lambda row: row[column], reverse=descending)
+                rows = present + [row for row in rows if row.get(column) is None]
+            offset = int(params.get("offset", "0"))
+            rows = rows[offset:offset + int(params["limit"])] if "limit" in params else rows[offset:]
+            return httpx.Response(200, json=[self._select(row, params.get("select", "*")) for row in rows])
+
+        if request.method == "POST":
+            body = json.loads(request.content or b"[]")
+            new_rows = body if isinstance(body, list) else [body]
+            key = params.get("on_conflict", self.primary_key)
+            merge = "resolution=merge-duplicates" in prefer
+            ignore = "resolution=ignore-duplicates" in prefer
+            written = []
+            for new_row in new_rows:
+                existing = next((row for row in table if row.get(key) == new_row.get(key)), None)
+                if existing is None:
+                    table.append(dict(new_row))
+                    written.append(table[-1])
+                elif merge:
+                    existing.update(new_row)
+                    written.append(existing)
+                elif not ignore:
+                    return httpx.Response(409, json={
+                        "code": "23505", "message": f"duplicate key value violates unique constraint on {key}"
+                    })
+            return self._written(201, written, prefer)
+
+        if request.method == "PATCH":
+            changes = json.loads(request.content or b"{}")
+            rows = [row for row in table if self._matches(row, filters)]
+            for row in rows:
+                row.update(changes)
+            return self._written(200, rows, prefer)
+
+        if request.method == "DELETE":
+            rows = [row for row in table if self._matches(row, filters)]
+            table[:] = [row for row in table if not self._matches(row, filters)]
+            return self._written(200, rows, prefer)
+
+        return httpx.Response(405, json={"message": f"Method {request.method} not supported"})
+
+    @staticmethod
+    def _written(status, rows, prefer):
+        if "return=representation" in prefer:
+            return httpx.Response(status, json=[dict(row) for row in rows])
+        return httpx.Response(204 if status == 200 else status)
+
+    @staticmethod
+    def _select(row, select):
+        if select == "*":
+            return dict(row)
+        return {column: row.get(column) for column in select.split(",")}
+
+    @staticmethod
+    def _matches(row, filters):
+        for column, condition in filters:
+            operator, _, operand = condition.partition(".")
+            value = row.get(column)
+            if operator == "is":
+                if (value is None) != (operand == "null"):
+                    return False
+                continue
+            if operator == "in":
+                if str(value) not in operand.strip("()").split(","):
+                    return False
+                continue
+            if value is None:
+                return False
+            value = str(value)
+            if operator == "eq" and value != operand:
+                return False
+            if operator == "neq" and value == operand:
+                return False
+            if operator == "gt" and not value > operand:
+                return False
+            if operator == "gte" and not value >= operand:
+                return False
+            if operator == "lt" and not value < operand:
+                return False
+            if operator == "lte" and not value <= operand:
+                return False
+        return True
@@ -0,0 +1,346 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+
+from utils.ticket_ids import TicketIdGenerator
+
+# Key marking a queued or spooled row that creates its ticket; not a table column
+CREATE_FLAG = "_create"
+
+
+class TicketWriter:
+    """
+    Write-behind persistence for tickets.
+
+    save_ticket() only queues the row, so a conversation turn never waits for
+    the database. A background task writes queued rows as one bulk upsert once
+    batch_size tickets are waiting or flush_interval seconds have passed; rows
+    for a ticket that is already queued are merged into one. When a write
+    fails, the rows are appended to a JSONL spool on disk and later writes go
+    straight to the spool until retry_interval has passed. The spool is
+    replayed, oldest rows first, as soon as the database accepts writes again,
+    including after a restart.
+
+    A session's ticket_row only advances once its row is written, so changes
+    lost with a dropped or spooled row are sent again with the next turn.
+    A session's first row is inserted rather than upserted: if its ticket ID
+    is already taken by another ticket, the ticket gets a new ID instead of
+    overwriting the other one.
+    """
+
+    def __init__(self, client, batch_size=None, flush_interval=None, spool_path=None, retry_interval=None):
+        """
+        Initialize the writer.
+
+        Args:
+            client (AsyncSupabaseClient): Client the rows are written with
+            batch_size (int, optional): Rows per bulk upsert at most, and the queue
+                length that triggers a write (TICKET_WRITE_BATCH_SIZE)
+            flush_interval (float, optional): Seconds a row waits at most before it
+                is written (TICKET_WRITE_FLUSH_SECONDS)
+            spool_path (str, optional): JSONL file rows are kept in while the database
+                is unreachable (TICKET_SPOOL_PATH); an empty string disables the spool
+            retry_interval (float, optional): Seconds to wait after a failed write
+                before trying the database again (TICKET_SPOOL_RETRY_SECONDS)
+        """
+        self.client = client
+        self.batch_size = batch_size or int(os.environ.get("TICKET_WRITE_BATCH_SIZE", "50"))
+        self.flush_interval = flush_interval or float(os.environ.get("TICKET_WRITE_FLUSH_SECONDS", "0.5"))
+        if spool_path is None:
+            spool_path = os.environ.get("TICKET_SPOOL_PATH", os.path.join("data", "ticket_spool.jsonl"))
+        self.spool_path = spool_path or None
+        self.retry_interval = retry_interval or float(os.environ.get("TICKET_SPOOL_RETRY_SECONDS", "30"))
+
+        self._pending = OrderedDict()  # ticket_id -> row, in the order tickets were first queued
+        self._owners = {}              # ticket_id -> (session, on_saved) of the queued row
+        self._wake = None   # set when enough rows are queued, created by start()
+        self._task = None
+        self._retry_at = 0             # while in the future, writes go to the spool
+        self.spool_rows = 0
+        if self.spool_path:
+            os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+            self.spool_rows = len(self._read_spool())
+            if self.spool_rows:
+                print(f"[DATABASE] {self.spool_rows} spooled ticket writes will be replayed")
+        self.stats = {
+            "submitted": 0, "unchanged": 0, "coalesced": 0, "batches": 0, "rows_written": 0, "max_batch_size": 0,
+            "max_queue_depth": 0, "failed_batches": 0, "spooled": 0, "replayed": 0, "dropped": 0, "id_conflicts": 0,
+            "last_flush_ms": 0.0, "max_flush_ms": 0.0, "total_flush_ms": 0.0
+        }
+
+    @property
+    def _replay_path(self):
+        return f"{self.spool_path}.replaying"
+
+    def save_ticket(self, ticket_data, session=None, on_saved=None):
+        """
+        Queue a ticket to be saved, without waiting for the database.
+
+        Args:
+            ticket_data (dict): Ticket data to save, as for SupabaseClient.save_ticket
+            session (Session, optional): Session the ticket belongs to; only the
+                columns that changed since the session last saved it are written
+            on_saved (callable, optional): Coroutine function called as
+                on_saved(session, *fields) after the write changed session attributes
+
+        Returns:
+            bool: False if nothing changed and no write was queued
+        """
+        row = self.client.ticket_row(ticket_data)
+        if session is not None:
+            row = session.ticket_changes(row)
+            if row is None:
+                self.stats["unchanged"] += 1
+                return False
+        if session is None:
+            self.submit(row)
+        else:
+            self.submit(row, (session, on_saved), create=session.ticket_row is None)
+        return True
+
+    def submit(self, row, owner=None, create=False):
+        """
+        Queue a row of the tickets table to be upserted.
+
+        Args:
+            row (dict): Row with at least ticket_id
+            owner (tuple, optional): (session, on_saved) told when the row is written
+            create (bool): The row creates the ticket, so it must not overwrite
+                an existing ticket with the same ID
+        """
+        self.stats["submitted"] += 1
+        if create:
+            row = {**row, CREATE_FLAG: True}
+        if owner is not None:
+            self._owners[row["ticket_id"]] = owner
+        queued = self._pending.get(row["ticket_id"])
+        if queued is not None:
+            queued.update(row)
+            self.stats["coalesced"] += 1
+            return
+        self._pending[row["ticket_id"]] = dict(row)
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._pending))
+        if len(self._pending) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+
+    def start(self):
+        """Start writing queued rows in the background."""
+        if self._task is None:
+            # Created here so the event belongs to the running event loop
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[DATABASE] ERROR: Ticket write-behind flush failed: {str(e)}")
+
+    async def flush(self):
+        """Write every queued row, replaying the spool first if the database is available."""
+        if self.spool_rows and time.time() >= self._retry_at:
+            await self._replay()
+        while self._pending:
+            rows = []
+            owners = {}
+            while self._pending and len(rows) < self.batch_size:
+                ticket_id, row = self._pending.popitem(last=False)
+                rows.append(row)
+                if ticket_id in self._owners:
+                    owners[ticket_id] = self._owners.pop(ticket_id)
+            if time.time() < self._retry_at or self.spool_rows:
+                # Database unavailable, or older rows are still spooled and must be written first
+                await self._spool(rows)
+                continue
+            try:
+                failed = await self._write(rows, owners)
+            except asyncio.CancelledError:
+                # Stopped mid-write: keep the rows rather than lose them
+                await self._spool(rows)
+                raise
+            if failed:
+                await self._spool(failed)
+
+    async def _write(self, rows, owners=None):
+        """Write rows, returning the ones that failed."""
+        owners = owners or {}
+        creates, updates = [], []
+        for row in rows:
+            owner = owners.get(row["ticket_id"])
+            # A create queued again before the session's first write finished only updates
+            if row.get(CREATE_FLAG) and (owner is None or owner[0].ticket_row is None):
+                creates.append(row)
+            else:
+                updates.append(row)
+
+        started = time.perf_counter()
+        failed = []
+        if creates:
+            taken = await self.client.insert_tickets([self._columns(row) for row in creates])
+            if taken is None:
+                failed.extend(creates)
+            else:
+                for row in creates:
+                    if row["ticket_id"] in taken:
+                        await self._reassign(row, owners.get(row["ticket_id"]))
+                    elif row["ticket_id"] in owners:
+                        await self._saved(self._columns(row), *owners[row["ticket_id"]])
+        if updates:
+            if await self.client.upsert_tickets([self._columns(row) for row in updates]):
+                for row in updates:
+                    if row["ticket_id"] in owners:
+                        await self._saved(self._columns(row), *owners[row["ticket_id"]])
+            else:
+                failed.extend(updates)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats["last_flush_ms"] = round(elapsed_ms, 2)
+        self.stats["max_flush_ms"] = round(max(self.stats["max_flush_ms"], elapsed_ms), 2)
+        self.stats["total_flush_ms"] += elapsed_ms
+        self.stats["batches"] += 1
+        if failed:
+            self.stats["failed_batches"] += 1
+            self._retry_at = time.time() + self.retry_interval
+            print(f"[DATABASE] Ticket write of {len(failed)} rows failed, retrying in {self.retry_interval}s")
+        else:
+            self._retry_at = 0
+        self.stats["rows_written"] += len(rows) - len(failed)
+        self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(rows) - len(failed))
+        return failed
+
+    @staticmethod
+    def _columns(row):
+        return {column: value for column, value in row.items() if column != CREATE_FLAG}
+
+    async def _saved(self, row, session, on_saved, fields=("ticket_row",)):
+        if "ticket_id" not in fields:
+            session.ticket_saved(row)
+        if on_saved is None:
+            return
+        try:
+            await on_saved(session, *fields)
+        except Exception as e:
+            print(f"[DATABASE] Error recording saved ticket {row['ticket_id']} in its session: {str(e)}")
+
+    async def _reassign(self, row, owner):
+        # Another ticket has this ID, e.g. made by a worker sharing this one's worker ID.
+        # A create that timed out after reaching the database and changed since also ends
+        # up here; a second ticket is the safer outcome than overwriting someone else's.
+        ticket_id = TicketIdGenerator.get_shared().next_id()
+        self.stats["id_conflicts"] += 1
+        print(f"[DATABASE] Ticket ID {row['ticket_id']} is taken by another ticket, saving it as {ticket_id}")
+        if owner is not None and owner[0].ticket_id == row["ticket_id"]:
+            owner[0].ticket_id = ticket_id
+            owner[0].ticket_row = None
+            await self._saved(row, *owner, fields=("ticket_id", "ticket_row"))
+        self.submit({**self._columns(row), "ticket_id": ticket_id}, owner, create=True)
+
+    async def _spool(self, rows):
+        if not self.spool_path:
+            self.stats["dropped"] += len(rows)
+            print(f"[DATABASE] No ticket spool configured, dropped {len(rows)} ticket writes")
+            return
+        try:
+            await asyncio.to_thread(self._append_file, self.spool_path, rows)
+        except OSError as e:
+            self.stats["dropped"] += len(rows)
+            print(f"[DATABASE] Error spooling {len(rows)} ticket writes: {str(e)}")
+            return
+        self.spool_rows += len(rows)
+        self.stats["spooled"] += len(rows)
+
+    async def _replay(self):
+        # Keep the rows in the replay file until they are written, so a crash loses none
+        rows = await asyncio.to_thread(self._take_spool)
+        print(f"[DATABASE] Replaying {len(rows)} spooled ticket writes")
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            failed = await self._write(batch)
+            self.stats["replayed"] += len(batch) - len(failed)
+            if failed:
+                # Still unavailable: the rest goes back to the spool, ahead of newer rows
+                rest = failed + rows[start + self.batch_size:]
+                await asyncio.to_thread(self._append_file, self.spool_path, rest)
+                break
+        else:
+            print(f"[DATABASE] Replayed {len(rows)} spooled ticket writes")
+        self.spool_rows = len(self._read_spool(replaying=False))
+        await asyncio.to_thread(self._remove_file, self._replay_path)
+
+    def _read_spool(self, replaying=True):
+        # Rows of an interrupted replay are older than those spooled since
+        rows = OrderedDict()
+        for path in ((self._replay_path, self.spool_path) if replaying else (self.spool_path,)):
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by a crash
+                    rows.setdefault(row["ticket_id"], {}).update(row)
+        return list(rows.values())
+
+    def _take_spool(self):
+        rows = self._read_spool()
+        temp_path = f"{self._replay_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._replay_path)
+        self._remove_file(self.spool_path)
+        return rows
+
+    @staticmethod
+    def _append_file(path, rows):
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _remove_file(path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    async def close(self):
+        """Stop the background task and write or spool what is still queued, e.g. on shutdown."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def get_stats(self):
+        """
+        Get write-behind counters.
+
+        Returns:
+            dict: Queue depth, batch sizes, flush latency and spool counts
+        """
+        batches = self.stats["batches"]
+        return {
+            "queue_depth": len(self._pending),
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "spool_rows": self.spool_rows,
+            "database_available": time.time() >= self._retry_at,
+            **{key: value for key, value in self.stats.items() if key != "total_flush_ms"},
+            "avg_batch_size": round(self.stats["rows_written"] / (batches - self.stats["failed_batches"]), 2)
+            if batches > self.stats["failed_batches"] else 0.0,
+            "avg_flush_ms": round(self.stats["total_flush_ms"] / batches, 2) if batches else 0.0
+        }
@@ -78,7 +78,27 @@ def setup_sample_data():
 def start_app():
     """Start the FastAPI app."""
     print("[SETUP] Starting the AI-Driven Customer Support System...")
-    subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--host", "0.0.0.0", "--port", "8000", "--reload"])
+    command = [sys.executable, "-m", "uvicorn", "app:app", "--host", "0.0.0.0", "--port", "8000"]
+    workers = int(os.environ.get("WEB_WORKERS", "1"))
+    if workers > 1:
+        # Workers claim distinct ticket worker IDs through Redis; a shared TICKET_WORKER_ID
+        # or a process-private local:// Redis would let two of them make the same ticket ID
+        if os.environ.get("TICKET_WORKER_ID"):
+            print("[SETUP] Error: TICKET_WORKER_ID would be shared by all workers; unset it to run several workers.")
+            sys.exit(1)
+        if "redis" not in (os.environ.get("SESSION_BACKEND"), os.environ.get("PUBSUB_BACKEND")) \
+                or os.environ.get("REDIS_URL") == "local://":
+            print("[SETUP] Error: several workers need a Redis server (SESSION_BACKEND=redis or PUBSUB_BACKEND=redis) to get distinct ticket worker IDs.")
+            sys.exit(1)
+        # Reloading only works with a single worker
+        command += ["--workers", str(workers)]
+        if os.environ.get("SESSION_BACKEND") != "redis":
+            print("[SETUP] Warning: running several workers without SESSION_BACKEND=redis, reconnecting clients may lose their session.")
+        if os.environ.get("PUBSUB_BACKEND") != "redis":
+            print("[SETUP] Warning: running several workers without PUBSUB_BACKEND=redis, admin updates only reach clients on the same worker.")
+    else:
+        command.append("--reload")
+    subprocess.Popen(command)
     print("[SETUP] FastAPI server has been launched.")
 
 if __name__ == "__main__":
@@ -8,6 +8,15 @@ let sessionId;
 let reconnectAttempts = 0;
 const MAX_RECONNECT_ATTEMPTS = 5;
 
+// Replay position: the server's stream for this page and the last sequence number
+// received, so a reconnect only gets the missed messages. Kept in memory only, since
+// a reloaded page has to start from the full state.
+let replayStream = null;
+let lastSeq = 0;
+
+// Text streamed so far for each target ("chat", "summary", "actions")
+const streamingBuffers = {};
+
 // Generate a session ID if needed
 function generateSessionId() {
     return localStorage.getItem('sessionId') || Math.random().toString(36).substring(2, 15);
@@ -21,7 +30,10 @@ function initWebSocket() {
     
     // Determine WebSocket URL
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = `${protocol}//${window.location.host}/ws/${sessionId}`;
+    let wsUrl = `${protocol}//${window.location.host}/ws/${sessionId}`;
+    if (replayStream) {
+        wsUrl += `?last_seq=${lastSeq}&stream=${encodeURIComponent(replayStream)}`;
+    }
     
     // Connect to WebSocket
     socket = new WebSocket(wsUrl);
@@ -52,15 +64,29 @@ function handleSocketMessage(event) {
         const data = JSON.parse(event.data);
         console.log('Received message:', data);
         
+        // Skip messages already received before a reconnect
+        if (data.seq !== undefined && data.type !== 'init' && data.type !== 'resume') {
+            if (data.seq <= lastSeq) return;
+            lastSeq = data.seq;
+        }
+        
         // Hide empty state when receiving any message
         document.getElementById('empty-state').classList.add('hidden');
         
         // Handle different message types
         switch(data.type) {
             case 'init':
-                handleInitMessage(data);
+                replayStream = data.stream;
+                lastSeq = data.seq || 0;
+                Object.keys(streamingBuffers).forEach(clearStreamingTarget);
+                handleInitMessage(data.data || data);
+                break;
+            case 'resume':
+                console.log(`Resumed session, ${data.missed} missed messages follow`);
                 break;
             case 'message':
+                // The final message replaces any streamed partial reply
+                clearStreamingTarget('chat');
                 // Ensure the timestamp is in the right format
                 if (data.timestamp) {
                     // Append new message to chat
@@ -71,13 +97,18 @@ function handleSocketMessage(event) {
                     });
                 }
                 break;
+            case 'message_delta':
+                handleMessageDelta(data);
+                break;
             case 'typing_indicator':
                 toggleTypingIndicator(data.isTyping);
                 break;
             case 'update_summary':
+                clearStreamingTarget('summary');
                 updateSummary(data.data);
                 break;
             case 'update_actions':
+                clearStreamingTarget('actions');
                 updateActions(data.data);
                 break;
             case 'update_recommendations':
@@ -89,6 +120,10 @@ function handleSocketMessage(event) {
             case 'update_time_estimate':
                 updateTimeEstimate(data.data);
                 break;
+            case 'update_ticket_id':
+                document.getElementById('ticket-id').textContent = data.data;
+                appState.ticketId = data.data;
+                break;
             case 'status_update_result':
                 handleStatusUpdateResult(data);
                 break;
@@ -100,6 +135,69 @@ function handleSocketMessage(event) {
     }
 }
 
+// Handle WebSocket close event by reconnecting with backoff
+function handleSocketClose(event) {
+    console.log('WebSocket connection closed:', event.code);
+    updateConnectionStatus('disconnected');
+    
+    if (reconnectAttempts < MAX_RECONNECT_ATTEMPTS) {
+        const delay = Math.min(1000 * Math.pow(2, reconnectAttempts), 10000);
+        reconnectAttempts++;
+        updateConnectionStatus('connecting');
+        setTimeout(initWebSocket, delay);
+    }
+}
+
+// Handle WebSocket error event; the close event that follows reconnects
+function handleSocketError(error) {
+    console.error('WebSocket error:', error);
+}
+
+// Render partial LLM output as it streams in
+function handleMessageDelta(data) {
+    const target = data.target;
+    streamingBuffers[target] = (streamingBuffers[target] || '') + data.delta;
+    const text = streamingBuffers[target];
+    
+    if (target === 'chat') {
+        toggleTypingIndicator(false);
+        let bubble = document.getElementById('streaming-message');
+        if (!bubble) {
+            bubble = createMessageElement({
+                role: 'assistant',
+                content: '',
+                timestamp: new Date().toISOString().replace('T', ' ').substring(0, 19)
+            });
+            bubble.id = 'streaming-message';
+            document.getElementById('chat-messages').appendChild(bubble);
+        }
+        bubble.querySelector('.message-content').textContent = text;
+        bubble.scrollIntoView({ block: 'end' });
+    } else if (target === 'summary') {
+        const summaryContent = document.getElementById('summary-content');
+        if (summaryContent) summaryContent.textContent = text;
+    } else if (target === 'actions') {
+        const actionsList = document.getElementById('actions-list');
+        if (actionsList) {
+            actionsList.innerHTML = '';
+            text.split('\n').filter(line => line.trim()).forEach(line => {
+                const item = document.createElement('li');
+                item.textContent = line.trim();
+                actionsList.appendChild(item);
+            });
+        }
+    }
+}
+
+// Drop streamed text once the final event for a target arrives
+function clearStreamingTarget(target) {
+    delete streamingBuffers[target];
+    if (target === 'chat') {
+        const bubble = document.getElementById('streaming-message');
+        if (bubble) bubble.remove();
+    }
+}
+
 // Send a message via WebSocket
 function sendMessage(message) {
     if (socket && socket.readyState === WebSocket.OPEN) {
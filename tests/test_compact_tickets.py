@@ -0,0 +1,79 @@
+import asyncio
+
+from compact_tickets import compact, group_duplicates, merge_rows
+from database.async_supabase_client import AsyncSupabaseClient, LocalPostgREST
+
+TABLE = "Historical_ticket_data"
+
+
+def row(ticket_id, **columns):
+    return {"ticket_id": ticket_id, **columns}
+
+
+def test_group_duplicates_only_merges_suffixed_rows():
+    rows = [
+        row("T-1-2"), row("T-1"), row("T-2"), row("T-1-3"),
+        row("TICKET-1712345678"), row("TICKET-1712345678-2"), row("TICKET-99")
+    ]
+
+    groups = group_duplicates(rows)
+
+    assert {base: [r["ticket_id"] for r in members] for base, members in groups.items()} == {
+        "T-1": ["T-1", "T-1-2", "T-1-3"],
+        "TICKET-1712345678": ["TICKET-1712345678", "TICKET-1712345678-2"],
+    }
+
+
+def test_merge_rows_keeps_latest_values_and_most_advanced_status():
+    rows = [
+        row("T-1", issue_category="Login", solution="Pending", resolution_status="Resolved",
+            date_of_resolution="2024-01-02", priority="Medium"),
+        row("T-1-2", issue_category="Login after update", solution="", resolution_status="Open",
+            date_of_resolution=None, priority=None),
+    ]
+
+    merged = merge_rows("T-1", rows)
+
+    assert merged["ticket_id"] == "T-1"
+    assert merged["issue_category"] == "Login after update"
+    assert merged["solution"] == "Pending"
+    assert merged["priority"] == "Medium"
+    assert (merged["resolution_status"], merged["date_of_resolution"]) == ("Resolved", "2024-01-02")
+
+
+def test_compact_merges_into_the_base_row_and_can_run_again():
+    async def scenario():
+        db = LocalPostgREST({TABLE: [
+            row("T-1", issue_category="Login", resolution_status="Open"),
+            row("T-1-2", issue_category="Login after update", resolution_status="Open"),
+            row("T-2", issue_category="Billing", resolution_status="Open"),
+        ]})
+        client = AsyncSupabaseClient(url="http://x", transport=db.transport())
+        try:
+            result = await compact(client, batch_size=1)
+            again = await compact(client)
+        finally:
+            await client.aclose()
+
+        assert result == {"scanned": 3, "tickets": 1, "duplicates": 1, "deleted": 1}
+        assert again["tickets"] == 0
+        rows = {r["ticket_id"]: r for r in db.tables[TABLE]}
+        assert set(rows) == {"T-1", "T-2"}
+        assert rows["T-1"]["issue_category"] == "Login after update"
+
+    asyncio.run(scenario())
+
+
+def test_dry_run_changes_nothing():
+    async def scenario():
+        db = LocalPostgREST({TABLE: [row("T-1"), row("T-1-2")]})
+        client = AsyncSupabaseClient(url="http://x", transport=db.transport())
+        try:
+            result = await compact(client, dry_run=True)
+        finally:
+            await client.aclose()
+
+        assert result["deleted"] == 0
+        assert len(db.tables[TABLE]) == 2
+
+    asyncio.run(scenario())
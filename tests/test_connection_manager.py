@@ -0,0 +1,100 @@
+import asyncio
+
+from utils.connection_manager import ConnectionManager, ReplayLog
+
+
+class RecordingWebSocket:
+    """Stands in for a client connection and keeps what it receives."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        pass
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_replay_log_since():
+    log = ReplayLog(3)
+    for n in range(5):
+        log.record({"type": "message", "n": n})
+
+    assert [m["seq"] for m in log.since(2)] == [3, 4, 5]
+    assert log.since(5) == []
+    assert log.since(1) is None  # seq 2 is no longer kept
+    assert log.since(6) is None
+
+
+def test_reconnect_replays_only_missed_messages():
+    async def scenario():
+        manager = ConnectionManager(queue_size=16, replay_size=16)
+        first = RecordingWebSocket()
+        assert not await manager.connect(first, "c1")
+        await manager.send_message("c1", {"type": "message", "data": "one"})
+        await manager.send_message("c1", {"type": "message_delta", "target": "a", "delta": "x"})
+        await settle()
+        stream, last_seq = manager.replay_position("c1")
+        assert [m.get("seq") for m in first.sent] == [1, None]
+
+        await manager.disconnect("c1", first)
+        await manager.send_message("c1", {"type": "message", "data": "two"})
+        await manager.send_message("c1", {"type": "update_summary", "data": "three"})
+
+        second = RecordingWebSocket()
+        assert await manager.connect(second, "c1", last_seq=last_seq, stream=stream)
+        await settle()
+        assert second.sent[0] == {"type": "resume", "stream": stream, "seq": 1, "missed": 2}
+        assert [(m["seq"], m["data"]) for m in second.sent[1:]] == [(2, "two"), (3, "three")]
+        assert manager.stats["resumed"] == 1
+        assert manager.stats["replayed"] == 2
+        await manager.close()
+
+    asyncio.run(scenario())
+
+
+def test_gap_or_other_stream_is_a_resume_miss():
+    async def scenario():
+        manager = ConnectionManager(queue_size=16, replay_size=2)
+        websocket = RecordingWebSocket()
+        await manager.connect(websocket, "c1")
+        stream, _ = manager.replay_position("c1")
+        await manager.disconnect("c1")
+        for n in range(3):
+            await manager.send_message("c1", {"type": "message", "data": n})
+
+        # seq 1 was pushed out of the two kept messages
+        assert not await manager.connect(RecordingWebSocket(), "c1", last_seq=0, stream=stream)
+        await manager.disconnect("c1")
+        assert not await manager.connect(RecordingWebSocket(), "c1", last_seq=3, stream="restarted")
+        assert manager.stats["resume_misses"] == 2
+        assert manager.replay_events("c1", 2, stream) == [{"type": "message", "data": 2, "seq": 3}]
+        assert manager.replay_events("c1", 2, "restarted") is None
+        await manager.close()
+
+    asyncio.run(scenario())
+
+
+def test_topic_messages_follow_set_topics():
+    async def scenario():
+        manager = ConnectionManager(queue_size=16)
+        websocket = RecordingWebSocket()
+        await manager.connect(websocket, "c1", topics=["ticket:T-1"])
+        await manager.set_topics("c1", ["ticket:T-2"])
+        await manager.send_to_topic("ticket:T-1", {"type": "message", "data": "old"})
+        await manager.send_to_topic("ticket:T-2", {"type": "message", "data": "new"})
+        await settle()
+
+        assert [m["data"] for m in websocket.sent] == ["new"]
+        await manager.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,49 @@
+import asyncio
+import threading
+
+from agents.llm_cache import LLMCache
+
+
+def test_disk_tier_outlives_the_memory_tier(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = LLMCache(db_path=path)
+    key = cache.make_key("llama3", "Summarize   this")
+    cache.set(key, "summary")
+
+    reopened = LLMCache(db_path=path)
+    assert reopened.get(key) == "summary"
+    assert reopened.get_stats()["disk"]["hits"] == 1
+    assert reopened.get(cache.make_key("llama3", "Summarize this")) == "summary"  # now from memory
+    assert reopened.get_stats()["disk"]["hits"] == 1
+
+
+def test_async_variants_use_the_disk_tier_off_the_event_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.db")
+    threads = []
+    for name in ("_get_disk", "_set_disk"):
+        method = getattr(LLMCache, name)
+
+        def record(self, *args, method=method):
+            threads.append(threading.current_thread())
+            return method(self, *args)
+        monkeypatch.setattr(LLMCache, name, record)
+
+    async def scenario():
+        await LLMCache(db_path=path).set_async("key", "response", ttl=60)
+        reopened = LLMCache(db_path=path)
+        assert await reopened.get_async("key") == "response"
+        assert await reopened.get_async("missing") is None
+
+    asyncio.run(scenario())
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
+
+
+def test_expired_disk_entries_are_misses(tmp_path):
+    path = str(tmp_path / "cache.db")
+    LLMCache(db_path=path).set("key", "response", ttl=-1)
+
+    async def scenario():
+        return await LLMCache(db_path=path).get_async("key")
+
+    assert asyncio.run(scenario()) is None
@@ -0,0 +1,98 @@
+import json
+
+import numpy as np
+import pytest
+
+from agents.local_intent_model import LocalIntentModel, load_examples
+
+TEXTS = [
+    "hello", "hi there", "good morning", "hey",
+    "bye", "thanks, goodbye", "see you later", "thank you",
+    "my app crashes with error 500 when I save my profile",
+    "login fails with invalid credentials after the update",
+    "the export button gives error 404 on the reports page",
+    "payment failed with card declined error on checkout",
+]
+LABELS = ["greeting"] * 4 + ["farewell"] * 4 + ["issue"] * 4
+
+
+def test_fit_learns_training_examples():
+    model = LocalIntentModel(n_features=2 ** 12)
+    model.fit(TEXTS, LABELS, epochs=60)
+
+    assert model.evaluate(TEXTS, LABELS)["accuracy"] == 1.0
+    assert model.predict("my app crashes with error 500 when I upload a photo")[0] == "issue"
+
+
+def test_fit_matches_dense_gradient_descent():
+    model = LocalIntentModel(n_features=2 ** 10)
+    model.fit(TEXTS, LABELS, epochs=3, batch_size=5, learning_rate=0.5, l2=1e-3)
+
+    # The same training on dense rows, as a reference for the sparse updates
+    weights = np.zeros((2 ** 10, len(model.labels)), dtype=np.float32)
+    bias = np.zeros(len(model.labels), dtype=np.float32)
+    matrix = np.zeros((len(TEXTS), 2 ** 10), dtype=np.float32)
+    for row, text in enumerate(TEXTS):
+        indices, values = model.featurize(text)
+        matrix[row, indices] = values
+    one_hot = np.eye(len(model.labels), dtype=np.float32)[[model.labels.index(label) for label in LABELS]]
+    rng = np.random.default_rng(0)
+    for _ in range(3):
+        order = rng.permutation(len(TEXTS))
+        for start in range(0, len(order), 5):
+            batch = order[start:start + 5]
+            error = (LocalIntentModel._softmax(matrix[batch] @ weights + bias) - one_hot[batch]) / len(batch)
+            weights -= 0.5 * (matrix[batch].T @ error + 1e-3 * weights)
+            bias -= 0.5 * error.sum(axis=0)
+
+    np.testing.assert_allclose(model.weights, weights, atol=1e-6)
+    np.testing.assert_allclose(model.bias, bias, atol=1e-6)
+
+
+def test_featurize_all_keeps_features_per_message():
+    model = LocalIntentModel()
+    indptr, indices, values = model.featurize_all(TEXTS[:3])
+
+    for row, text in enumerate(TEXTS[:3]):
+        expected_indices, expected_values = model.featurize(text)
+        np.testing.assert_array_equal(indices[indptr[row]:indptr[row + 1]], expected_indices)
+        np.testing.assert_array_equal(values[indptr[row]:indptr[row + 1]], expected_values)
+
+
+def test_fit_without_examples_fails():
+    with pytest.raises(ValueError):
+        LocalIntentModel().fit([], [])
+
+
+def test_save_and_load_round_trip(tmp_path):
+    model = LocalIntentModel(n_features=2 ** 10)
+    model.fit(TEXTS, LABELS, epochs=5)
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+
+    loaded = LocalIntentModel.load(path)
+
+    assert loaded.trained
+    assert loaded.labels == model.labels
+    np.testing.assert_allclose(loaded.predict_proba("hello there"), model.predict_proba("hello there"))
+
+
+def test_load_examples_skips_bad_lines(tmp_path):
+    path = tmp_path / "log.jsonl"
+    lines = [
+        json.dumps({"message": "hi", "intent": "greeting", "confidence": None}),
+        json.dumps({"message": "help", "intent": "casual", "confidence": "very"}),
+        json.dumps({"message": "what", "intent": "not-a-label", "confidence": 0.9}),
+        json.dumps([1, 2]),
+        "{not json",
+        json.dumps({"message": "My app crashes", "intent": "casual", "confidence": 0.6}),
+        json.dumps({"message": "my app crashes ", "intent": "issue", "confidence": 0.9}),
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    assert load_examples(str(path)) == (["hi", "my app crashes "], ["greeting", "issue"])
+    assert load_examples(str(path), min_confidence=0.5) == (["my app crashes "], ["issue"])
+
+
+def test_load_examples_without_log(tmp_path):
+    assert load_examples(str(tmp_path / "missing.jsonl")) == ([], [])
@@ -0,0 +1,103 @@
+import asyncio
+
+from utils.connection_manager import OutboundQueue
+
+
+class GatedWebSocket:
+    """Records sent messages; sends wait until the gate is opened."""
+
+    def __init__(self, fail=False):
+        self.sent = []
+        self.gate = asyncio.Event()
+        self.fail = fail
+
+    async def send_json(self, message):
+        await self.gate.wait()
+        if self.fail:
+            raise ConnectionError("closed")
+        self.sent.append(message)
+
+
+def make_queue(websocket, max_size=3, failures=None):
+    stats = {"queued": 0, "sent": 0, "coalesced": 0, "dropped": 0}
+    on_failure = (lambda client_id, reason: failures.append(reason)) if failures is not None else (lambda *args: None)
+    return OutboundQueue(websocket, "c1", max_size, stats, on_failure), stats
+
+
+async def drain(websocket, queue):
+    websocket.gate.set()
+    while len(queue):
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+
+def test_update_messages_supersede_pending_ones():
+    async def scenario():
+        websocket = GatedWebSocket()
+        queue, stats = make_queue(websocket)
+        queue.put({"type": "update_summary", "data": "first", "seq": 1})
+        queue.put({"type": "message", "data": "hi", "seq": 2})
+        queue.put({"type": "update_summary", "data": "second", "seq": 3})
+
+        assert len(queue) == 2
+        await drain(websocket, queue)
+        # The newer update goes after the message, keeping sequence order
+        assert [m["seq"] for m in websocket.sent] == [2, 3]
+        assert stats["coalesced"] == 1
+        queue.close()
+
+    asyncio.run(scenario())
+
+
+def test_consecutive_deltas_are_joined():
+    async def scenario():
+        websocket = GatedWebSocket()
+        queue, stats = make_queue(websocket)
+        queue.put({"type": "message_delta", "target": "a", "delta": "Hel"})
+        queue.put({"type": "message_delta", "target": "a", "delta": "lo"})
+        queue.put({"type": "message_delta", "target": "b", "delta": "!"})
+
+        await drain(websocket, queue)
+        assert [m["delta"] for m in websocket.sent] == ["Hello", "!"]
+        assert stats["coalesced"] == 1
+        queue.close()
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_drops_deltas_and_rejects_other_messages():
+    async def scenario():
+        websocket = GatedWebSocket()
+        queue, stats = make_queue(websocket, max_size=2)
+        queue.put({"type": "message", "seq": 1})
+        await asyncio.sleep(0)  # the writer takes it and waits on the send
+        queue.put({"type": "message", "seq": 2})
+        queue.put({"type": "update_actions", "seq": 3})
+
+        assert queue.put({"type": "message_delta", "target": "a", "delta": "x"})
+        assert stats["dropped"] == 1
+        assert not queue.put({"type": "message", "seq": 4})
+        # A panel update replacing a pending one still fits
+        assert queue.put({"type": "update_actions", "seq": 5})
+
+        await drain(websocket, queue)
+        assert [m["seq"] for m in websocket.sent] == [1, 2, 5]
+        queue.close()
+
+    asyncio.run(scenario())
+
+
+def test_send_failure_is_reported():
+    async def scenario():
+        websocket = GatedWebSocket(fail=True)
+        failures = []
+        queue, stats = make_queue(websocket, failures=failures)
+        queue.put({"type": "message", "seq": 1})
+        websocket.gate.set()
+        await asyncio.sleep(0.01)
+
+        assert failures == ["send failed: closed"]
+        assert stats["sent"] == 0
+        queue.close()
+
+    asyncio.run(scenario())
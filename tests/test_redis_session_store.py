@@ -0,0 +1,83 @@
+import asyncio
+
+from utils.redis_client import LocalRedis
+from utils.redis_session_store import RedisSessionStore
+from utils.session import Session
+from utils.transcript import Message
+
+
+def make_session(ticket_id):
+    session = Session(ticket_id)
+    session.conversation_history.append(Message("user", "hello", 1700000000.0))
+    session.summary_watermark = 1
+    session.actions = ["Check the logs"]
+    session.ticket_row = {"ticket_id": ticket_id, "priority": "High"}
+    return session
+
+
+def test_put_and_get_round_trip():
+    async def scenario():
+        store = RedisSessionStore(client=LocalRedis(), ttl=60)
+        await store.put("a", make_session("T-a"))
+
+        loaded = await store.get("a")
+        assert loaded.ticket_id == "T-a"
+        assert loaded.summary_watermark == 1
+        assert loaded.actions == ["Check the logs"]
+        assert loaded.routing is None
+        assert loaded.ticket_row == {"ticket_id": "T-a", "priority": "High"}
+        assert loaded.conversation_history.messages[0]["content"] == "hello"
+        assert await store.get("missing") is None
+
+    asyncio.run(scenario())
+
+
+def test_put_keeps_the_first_session():
+    async def scenario():
+        client = LocalRedis()
+        first, second = RedisSessionStore(client=client), RedisSessionStore(client=client)
+        await first.put("a", make_session("T-first"))
+
+        stored = await second.put("a", make_session("T-second"))
+        assert stored.ticket_id == "T-first"
+        assert second.stats["created"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_save_and_append_message_write_through():
+    async def scenario():
+        client = LocalRedis()
+        store = RedisSessionStore(client=client)
+        session = await store.put("a", make_session("T-a"))
+
+        session.ticket_row = {"ticket_id": "T-a", "priority": "Low"}
+        session.current_summary = "Login issue"
+        await store.save("a", session, "ticket_row", "current_summary")
+        await store.append_message("a", session, Message("assistant", "Which browser?", 1700000001.0))
+
+        # Another worker reads the changes from Redis
+        loaded = await RedisSessionStore(client=client).get("a")
+        assert loaded.ticket_row == {"ticket_id": "T-a", "priority": "Low"}
+        assert loaded.current_summary == "Login issue"
+        assert [m["content"] for m in loaded.conversation_history.messages] == ["hello", "Which browser?"]
+        assert store.stats["field_writes"] == 2
+        assert store.stats["messages_appended"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_pinned_session_is_served_from_memory():
+    async def scenario():
+        store = RedisSessionStore(client=LocalRedis())
+        session = await store.put("a", make_session("T-a"))
+        store.pin("a", session)
+
+        assert await store.get("a") is session
+        assert store.stats["loads"] == 0
+
+        store.unpin("a")
+        assert await store.get("a") is not session
+        assert len(store) == 0
+
+    asyncio.run(scenario())
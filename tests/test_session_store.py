@@ -0,0 +1,114 @@
+import asyncio
+import os
+import time
+
+from utils.session import Session
+from utils.session_store import SessionStore
+from utils.transcript import Message
+
+
+def make_session(ticket_id, text="hello"):
+    session = Session(ticket_id)
+    session.conversation_history.append(Message("user", text, 1700000000.0))
+    session.actions = ["Check the logs"]
+    session.ticket_row = {"ticket_id": ticket_id, "priority": "High"}
+    return session
+
+
+def test_lru_eviction_writes_snapshot_and_get_restores_it(tmp_path):
+    async def scenario():
+        store = SessionStore(max_sessions=2, snapshot_dir=str(tmp_path))
+        await store.put("a", make_session("T-a", "first"))
+        await store.put("b", make_session("T-b"))
+        await store.get("a")  # b is now the least recently used
+        await store.put("c", make_session("T-c"))
+
+        assert len(store) == 2
+        assert store.stats["evicted_lru"] == 1
+        assert len(os.listdir(tmp_path)) == 1
+
+        restored = await store.get("b")
+        assert restored.ticket_id == "T-b"
+        assert restored.conversation_history.messages[0]["content"] == "hello"
+        assert restored.actions == ["Check the logs"]
+        assert restored.ticket_row == {"ticket_id": "T-b", "priority": "High"}
+        assert store.stats["snapshots_loaded"] == 1
+        # Restoring evicted the least recently used session in turn
+        assert list(store._sessions) == ["c", "b"]
+        assert store.stats["evicted_lru"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_pinned_sessions_are_not_evicted(tmp_path):
+    async def scenario():
+        store = SessionStore(max_sessions=1, snapshot_dir=str(tmp_path))
+        session = await store.put("a", make_session("T-a"))
+        store.pin("a", session)
+        await store.put("b", make_session("T-b"))
+
+        assert len(store) == 2
+        assert store.stats["evicted_lru"] == 0
+
+        store.unpin("a")
+        await store.put("c", make_session("T-c"))
+        assert len(store) == 1
+
+    asyncio.run(scenario())
+
+
+def test_sweep_evicts_idle_unpinned_sessions(tmp_path, monkeypatch):
+    async def scenario():
+        store = SessionStore(idle_ttl=60, snapshot_dir=str(tmp_path))
+        await store.put("idle", make_session("T-idle"))
+        await store.put("pinned", make_session("T-pinned"))
+        store.pin("pinned")
+        now = time.time()
+        await store.put("fresh", make_session("T-fresh"))
+        store._sessions["fresh"] = (store._sessions["fresh"][0], now + 100)
+
+        monkeypatch.setattr(time, "time", lambda: now + 90)
+        assert await store.sweep() == 1
+        assert set(store._sessions) == {"pinned", "fresh"}
+        assert store.stats["evicted_idle"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_gets_share_one_snapshot_load(tmp_path):
+    async def scenario():
+        store = SessionStore(snapshot_dir=str(tmp_path))
+        await store.put("a", make_session("T-a"))
+        await store.evict("a")
+
+        first, second = await asyncio.gather(store.get("a"), store.get("a"))
+        assert first is second
+        assert store.stats["snapshots_loaded"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_without_snapshots_evicted_sessions_are_gone():
+    async def scenario():
+        store = SessionStore(max_sessions=1, snapshot_dir="")
+        await store.put("a", make_session("T-a"))
+        await store.put("b", make_session("T-b"))
+
+        assert await store.get("a") is None
+        assert store.stats["snapshots_written"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_close_snapshots_every_session(tmp_path):
+    async def scenario():
+        store = SessionStore(snapshot_dir=str(tmp_path))
+        await store.put("a", make_session("T-a"))
+        await store.put("b", make_session("T-b"))
+        await store.close()
+
+        assert len(store) == 0
+        reopened = SessionStore(snapshot_dir=str(tmp_path))
+        assert (await reopened.get("a")).ticket_id == "T-a"
+
+    asyncio.run(scenario())
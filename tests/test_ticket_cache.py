@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+
+from database.async_supabase_client import AsyncSupabaseClient, LocalPostgREST
+
+TABLE = "Historical_ticket_data"
+
+
+class SlowReads(httpx.AsyncBaseTransport):
+    """Answers reads from the database as it was when they arrived, a little later."""
+
+    def __init__(self, db, delay=0.05):
+        self.db = db
+        self.delay = delay
+
+    async def handle_async_request(self, request):
+        response = self.db.handle(request)
+        if request.method == "GET":
+            await asyncio.sleep(self.delay)
+        return response
+
+
+def make_client(ticket_id, transport_for):
+    db = LocalPostgREST({TABLE: [{"ticket_id": ticket_id, "resolution_status": "Open"}]})
+    client = AsyncSupabaseClient(url="http://x", transport=transport_for(db))
+    # The sync client, and with it the caches, is shared by the whole process
+    for cache in client.sync_client.ticket_caches.values():
+        cache.clear()
+    return client, db
+
+
+def test_reads_are_cached_until_a_write():
+    async def scenario():
+        client, db = make_client("T-cache-1", lambda db: db.transport())
+        try:
+            assert (await client.get_ticket("T-cache-1"))["resolution_status"] == "Open"
+            requests = db.requests
+            (await client.get_ticket("T-cache-1"))["resolution_status"] = "changed by the caller"
+            assert (await client.get_ticket("T-cache-1"))["resolution_status"] == "Open"
+            assert db.requests == requests
+
+            await client.update_ticket_status("T-cache-1", "Resolved")
+            assert (await client.get_ticket("T-cache-1"))["resolution_status"] == "Resolved"
+        finally:
+            await client.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_read_racing_a_write_is_not_cached():
+    async def scenario():
+        client, db = make_client("T-cache-2", SlowReads)
+        stale_reads = client.sync_client.stale_reads
+        try:
+            read = asyncio.create_task(client.get_ticket("T-cache-2"))
+            await asyncio.sleep(0.01)
+            await client.update_ticket_status("T-cache-2", "Resolved")
+
+            # The read began before the write and may return the old row, but not cache it
+            assert (await read)["resolution_status"] == "Open"
+            assert (await client.get_ticket("T-cache-2"))["resolution_status"] == "Resolved"
+            assert client.sync_client.stale_reads == stale_reads + 1
+            assert "T-cache-2" not in client.sync_client._ticket_reads
+        finally:
+            await client.aclose()
+
+    asyncio.run(scenario())
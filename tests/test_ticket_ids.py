@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from utils.redis_client import LocalRedis
+from utils.ticket_ids import ID_DIGITS, TicketIdGenerator
+
+
+def test_ids_increase_and_sort_as_text():
+    generator = TicketIdGenerator(worker_id=5)
+    ids = [generator.next_id() for _ in range(5000)]
+
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+    assert all(len(ticket_id) == len("TICKET-") + ID_DIGITS for ticket_id in ids)
+
+
+def test_workers_claim_distinct_ids_unless_configured(monkeypatch):
+    monkeypatch.delenv("TICKET_WORKER_ID", raising=False)
+
+    async def scenario():
+        client = LocalRedis()
+        generators = [TicketIdGenerator() for _ in range(3)]
+        claimed = [await generator.claim_worker_id(client) for generator in generators]
+        configured = TicketIdGenerator(worker_id=7)
+
+        assert claimed == [0, 1, 2]
+        assert generators[0].get_stats()["worker_id_source"] == "redis"
+        assert await configured.claim_worker_id(client) == 7
+
+    asyncio.run(scenario())
+
+
+def test_worker_id_out_of_range_fails():
+    with pytest.raises(ValueError):
+        TicketIdGenerator(worker_id=1024)
@@ -0,0 +1,230 @@
+import asyncio
+import json
+
+import httpx
+
+from database.async_supabase_client import AsyncSupabaseClient, LocalPostgREST
+from database.ticket_writer import TicketWriter
+from utils.session import Session
+
+TABLE = "Historical_ticket_data"
+
+
+class FlakyDatabase:
+    """LocalPostgREST behind a transport that can be taken down."""
+
+    def __init__(self):
+        self.db = LocalPostgREST()
+        self.up = True
+        self.client = AsyncSupabaseClient(url="http://x", transport=httpx.MockTransport(self.handle))
+
+    def handle(self, request):
+        if not self.up:
+            raise httpx.ConnectError("down")
+        return self.db.handle(request)
+
+    def rows(self):
+        return {row["ticket_id"]: row for row in self.db.tables.get(TABLE, [])}
+
+
+def make_writer(database, spool_path, batch_size=10):
+    return TicketWriter(database.client, batch_size=batch_size, flush_interval=0.05,
+                        spool_path=spool_path, retry_interval=0.01)
+
+
+def test_rows_for_one_ticket_are_coalesced_into_one_write(tmp_path):
+    async def scenario():
+        database = FlakyDatabase()
+        writer = make_writer(database, str(tmp_path / "spool.jsonl"))
+        writer.save_ticket({"ticket_id": "T-1", "summary": "first"})
+        writer.save_ticket({"ticket_id": "T-2", "summary": "other"})
+        writer.save_ticket({"ticket_id": "T-1", "summary": "second"})
+        await writer.flush()
+
+        assert database.rows()["T-1"]["issue_category"] == "second"
+        assert len(database.rows()) == 2
+        assert writer.stats["coalesced"] == 1
+        assert writer.stats["batches"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_spool_is_replayed_oldest_first_after_a_restart(tmp_path):
+    async def scenario():
+        database = FlakyDatabase()
+        spool_path = str(tmp_path / "spool.jsonl")
+        writer = make_writer(database, spool_path, batch_size=2)
+        database.up = False
+        for n in range(3):
+            writer.save_ticket({"ticket_id": f"T-{n}", "summary": "old"})
+        await writer.flush()
+        await writer.close()
+        assert writer.spool_rows == 3
+        assert [json.loads(line)["ticket_id"] for line in open(spool_path)] == ["T-0", "T-1", "T-2"]
+
+        database.up = True
+        restarted = make_writer(database, spool_path, batch_size=2)
+        assert restarted.spool_rows == 3
+        restarted.save_ticket({"ticket_id": "T-1", "summary": "new"})
+        await asyncio.sleep(0.02)
+        await restarted.flush()
+
+        # The spooled row went first, so the newer one is what is stored
+        assert database.rows()["T-1"]["issue_category"] == "new"
+        assert len(database.rows()) == 3
+        assert restarted.stats["replayed"] == 3
+        assert restarted.spool_rows == 0
+        assert list(tmp_path.iterdir()) == []
+
+    asyncio.run(scenario())
+
+
+def test_rows_queued_while_rows_are_spooled_go_behind_them(tmp_path):
+    async def scenario():
+        database = FlakyDatabase()
+        writer = make_writer(database, str(tmp_path / "spool.jsonl"))
+        database.up = False
+        writer.save_ticket({"ticket_id": "T-1", "summary": "old"})
+        await writer.flush()
+
+        # Still within the retry interval: the new row is spooled after the old one
+        writer.save_ticket({"ticket_id": "T-1", "summary": "new"})
+        await writer.flush()
+        database.up = True
+        await asyncio.sleep(0.02)
+        await writer.flush()
+
+        assert database.rows()["T-1"]["issue_category"] == "new"
+        assert writer.stats["spooled"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_replay_keeps_the_remaining_rows_ahead_of_newer_ones(tmp_path):
+    async def scenario():
+        database = FlakyDatabase()
+        spool_path = str(tmp_path / "spool.jsonl")
+        writer = make_writer(database, spool_path, batch_size=1)
+        database.up = False
+        writer.save_ticket({"ticket_id": "T-1", "summary": "old"})
+        writer.save_ticket({"ticket_id": "T-2", "summary": "old"})
+        await writer.flush()
+        await asyncio.sleep(0.02)
+        writer.save_ticket({"ticket_id": "T-3", "summary": "new"})
+        await writer.flush()
+
+        assert [json.loads(line)["ticket_id"] for line in open(spool_path)] == ["T-1", "T-2", "T-3"]
+        assert writer.spool_rows == 3
+
+    asyncio.run(scenario())
+
+
+def test_without_spool_failed_rows_are_dropped():
+    async def scenario():
+        database = FlakyDatabase()
+        writer = make_writer(database, "")
+        database.up = False
+        writer.save_ticket({"ticket_id": "T-1", "summary": "lost"})
+        await writer.flush()
+
+        assert writer.stats["dropped"] == 1
+        assert writer.spool_rows == 0
+        assert writer.get_stats()["database_available"] is False
+
+    asyncio.run(scenario())
+
+
+def test_session_rows_send_only_changed_columns_once_written(tmp_path):
+    async def scenario():
+        database = FlakyDatabase()
+        writer = make_writer(database, str(tmp_path / "spool.jsonl"))
+        session = Session("T-1")
+        saved = []
+
+        async def on_saved(session, *fields):
+            saved.append(fields)
+
+        assert writer.save_ticket({"ticket_id": "T-1", "summary": "login"}, session, on_saved)
+        assert session.ticket_row is None  # not written yet
+        await writer.flush()
+        assert session.ticket_row["issue_category"] == "login"
+        assert saved == [("ticket_row",)]
+
+        assert not writer.save_ticket({"ticket_id": "T-1", "summary": "login"}, session, on_saved)
+        writer.save_ticket({"ticket_id": "T-1", "summary": "login", "recommendations": ["Reset password"]}, session, on_saved)
+        assert writer._pending["T-1"] == {"ticket_id": "T-1", "solution": "Reset password"}
+        await writer.flush()
+
+        row = database.rows()["T-1"]
+        assert (row["issue_category"], row["solution"]) == ("login", "Reset password")
+        assert writer.stats["unchanged"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_changes_of_a_dropped_write_are_sent_again():
+    async def scenario():
+        database = FlakyDatabase()
+        writer = make_writer(database, "")
+        session = Session("T-1")
+        writer.save_ticket({"ticket_id": "T-1", "summary": "login"}, session)
+        await writer.flush()
+
+        database.up = False
+        writer.save_ticket({"ticket_id": "T-1", "summary": "password"}, session)
+        await writer.flush()
+        assert writer.stats["dropped"] == 1
+        assert session.ticket_row["issue_category"] == "login"
+
+        database.up = True
+        await asyncio.sleep(0.02)
+        # The next turn has no new changes but still carries the lost one
+        assert writer.save_ticket({"ticket_id": "T-1", "summary": "password"}, session)
+        await writer.flush()
+        assert database.rows()["T-1"]["issue_category"] == "password"
+        assert session.ticket_row["issue_category"] == "password"
+
+    asyncio.run(scenario())
+
+
+def test_new_ticket_with_a_taken_id_gets_a_new_id(tmp_path):
+    async def scenario():
+        database = FlakyDatabase()
+        database.db.tables[TABLE] = [{"ticket_id": "T-1", "issue_category": "someone else's"}]
+        writer = make_writer(database, str(tmp_path / "spool.jsonl"))
+        session = Session("T-1")
+        saved = []
+
+        async def on_saved(session, *fields):
+            saved.append(fields)
+
+        writer.save_ticket({"ticket_id": "T-1", "summary": "mine"}, session, on_saved)
+        await writer.flush()
+        await writer.flush()
+
+        rows = database.rows()
+        assert rows["T-1"]["issue_category"] == "someone else's"
+        assert session.ticket_id != "T-1"
+        assert rows[session.ticket_id]["issue_category"] == "mine"
+        assert session.ticket_row["ticket_id"] == session.ticket_id
+        assert saved == [("ticket_id", "ticket_row"), ("ticket_row",)]
+        assert writer.stats["id_conflicts"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_create_already_written_is_not_a_conflict(tmp_path):
+    async def scenario():
+        database = FlakyDatabase()
+        writer = make_writer(database, str(tmp_path / "spool.jsonl"))
+        row = database.client.ticket_row({"ticket_id": "T-1", "summary": "mine"})
+        # An earlier request that timed out after reaching the database
+        database.db.tables[TABLE] = [dict(row)]
+
+        writer.save_ticket({"ticket_id": "T-1", "summary": "mine"}, Session("T-1"))
+        await writer.flush()
+
+        assert writer.stats["id_conflicts"] == 0
+        assert list(database.rows()) == ["T-1"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,41 @@
+from utils.conversation_utils import format_message
+from utils.transcript import ConversationTranscript, Message
+
+MESSAGES = [
+    Message("user", "My login fails", 1700000000),
+    Message("assistant", "Which browser?", 1700000010),
+    Message("system", "Routed to Level 1", 1700000020),
+    Message("user", "Firefox", 1700000030),
+]
+
+
+def test_text_is_the_rendered_messages_in_order():
+    transcript = ConversationTranscript(MESSAGES)
+
+    assert transcript.text == "".join(format_message(message) for message in MESSAGES)
+    assert transcript.last(2).text == format_message(MESSAGES[3])
+    assert transcript.since(1).text == format_message(MESSAGES[1]) + format_message(MESSAGES[3])
+    assert transcript.rendered(1) == format_message(MESSAGES[1])
+
+
+def test_messages_are_read_back_from_their_rendered_text():
+    transcript = ConversationTranscript()
+    for message in MESSAGES:
+        transcript.append(message)
+        # Reading between appends must not change what is stored
+        assert transcript[-1].content == message.content
+
+    assert [(m.role, m.content, m.created_at) for m in transcript] == [
+        (m.role, m.content, m.created_at) for m in MESSAGES
+    ]
+    assert transcript[2] is MESSAGES[2]  # kept whole, since it does not render
+
+
+def test_snapshot_does_not_grow():
+    transcript = ConversationTranscript(MESSAGES[:2])
+    snapshot = transcript.snapshot()
+    transcript.append(MESSAGES[3])
+
+    assert len(snapshot) == 2
+    assert snapshot.text == format_message(MESSAGES[0]) + format_message(MESSAGES[1])
+    assert snapshot.tokens < transcript.tokens
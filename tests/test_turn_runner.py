@@ -0,0 +1,74 @@
+import asyncio
+
+from utils.turn_runner import TurnRunner
+
+
+def test_new_turn_cancels_the_one_in_progress_and_waits_for_it():
+    async def scenario():
+        runner = TurnRunner()
+        events = []
+
+        async def slow_turn():
+            try:
+                events.append("first started")
+                await asyncio.sleep(10)
+            finally:
+                await asyncio.sleep(0.01)  # cleanup after cancellation
+                events.append("first cleaned up")
+
+        async def next_turn():
+            events.append("second started")
+
+        first = runner.start("s1", slow_turn)
+        await asyncio.sleep(0)
+        runner.start("s1", next_turn)
+        await runner.wait("s1")
+
+        assert first.cancelled()
+        assert events == ["first started", "first cleaned up", "second started"]
+        assert runner.get_stats() == {"running": 0, "started": 2, "completed": 1, "superseded": 1, "failed": 0}
+
+    asyncio.run(scenario())
+
+
+def test_sessions_run_independently_and_failures_are_counted():
+    async def scenario():
+        runner = TurnRunner()
+        done = []
+
+        async def failing_turn():
+            raise RuntimeError("model unavailable")
+
+        async def turn():
+            done.append("s2")
+
+        runner.start("s1", failing_turn)
+        runner.start("s2", turn)
+        await asyncio.gather(runner.wait("s1"), runner.wait("s2"))
+
+        assert done == ["s2"]
+        assert runner.stats["failed"] == 1
+        assert runner.stats["superseded"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_wait_covers_turns_started_meanwhile():
+    async def scenario():
+        runner = TurnRunner()
+        done = []
+
+        async def turn(name):
+            await asyncio.sleep(0.01)
+            done.append(name)
+
+        async def restart():
+            await asyncio.sleep(0)
+            runner.start("s1", lambda: turn("second"))
+
+        runner.start("s1", lambda: turn("first"))
+        await asyncio.gather(runner.wait("s1"), restart())
+
+        assert done == ["second"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,114 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from agents.intent_classifier_agent import IntentClassifierAgent
+from agents.local_intent_model import LocalIntentModel, load_examples
+
+DEFAULT_LOG_PATH = os.environ.get("INTENT_LOG_PATH", "data/intent_classifications.jsonl")
+DEFAULT_MODEL_PATH = os.environ.get("INTENT_MODEL_PATH", "data/intent_model.npz")
+DEFAULT_THRESHOLD = float(os.environ.get("INTENT_MODEL_THRESHOLD", "0.85"))
+
+
+def split_examples(texts, labels, holdout, seed):
+    """Shuffle and split examples into training and held-out sets."""
+    order = np.random.default_rng(seed).permutation(len(texts))
+    cut = int(len(order) * (1 - holdout))
+    train = [(texts[i], labels[i]) for i in order[:cut]]
+    test = [(texts[i], labels[i]) for i in order[cut:]]
+    return [t for t, _ in train], [l for _, l in train], [t for t, _ in test], [l for _, l in test]
+
+
+def print_report(title, report):
+    """Print an evaluation report."""
+    print(f"[TRAIN] {title}: {report['examples']} examples, accuracy {report['accuracy']:.2%}")
+    if "coverage" in report:
+        print(f"[TRAIN]   at threshold {report['threshold']}: answers {report['coverage']:.2%} locally, "
+              f"accuracy on those {report['accepted_accuracy'] or 0:.2%}")
+    for label, recall in report["recall"].items():
+        if recall is not None:
+            print(f"[TRAIN]   {label:<9} recall {recall:.2%}")
+
+
+def train(args):
+    """Train a model from logged LLM labels plus the keyword rules and save it."""
+    texts, labels = load_examples(args.log, min_confidence=args.min_confidence)
+    print(f"[TRAIN] Loaded {len(texts)} logged LLM classifications from {args.log}")
+    if not texts:
+        print("[TRAIN] Nothing to train on; run the app to collect LLM classifications first")
+        return 1
+
+    train_texts, train_labels, test_texts, test_labels = split_examples(texts, labels, args.holdout, args.seed)
+    rule_texts, rule_labels = IntentClassifierAgent.rule_examples()
+    train_texts += rule_texts
+    train_labels += rule_labels
+
+    model = LocalIntentModel(n_features=args.features)
+    started = time.time()
+    loss = model.fit(train_texts, train_labels, epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2)
+    print(f"[TRAIN] Trained on {len(train_texts)} examples in {time.time() - started:.1f}s, final loss {loss:.4f}")
+
+    print_report("Training set", model.evaluate(train_texts, train_labels))
+    if test_texts:
+        print_report("Held-out LLM labels", model.evaluate(test_texts, test_labels, threshold=args.threshold))
+
+    model.save(args.model)
+    print(f"[TRAIN] Model saved to {args.model}")
+    return 0
+
+
+def evaluate(args):
+    """Evaluate a saved model against logged LLM labels."""
+    if not os.path.exists(args.model):
+        print(f"[TRAIN] No model found at {args.model}")
+        return 1
+    model = LocalIntentModel.load(args.model)
+    texts, labels = load_examples(args.log, min_confidence=args.min_confidence)
+    if not texts:
+        print(f"[TRAIN] No logged classifications in {args.log}")
+        return 1
+
+    report = model.evaluate(texts, labels, threshold=args.threshold)
+    print_report("LLM labels", report)
+
+    started = time.perf_counter()
+    for text in texts:
+        model.predict(text)
+    print(f"[TRAIN] Average prediction time {(time.perf_counter() - started) / len(texts) * 1e6:.0f}us")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and evaluate the local intent classifier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("train", "eval"):
+        sub = subparsers.add_parser(name)
+        sub.add_argument("--log", default=DEFAULT_LOG_PATH, help="JSONL log of LLM classifications")
+        sub.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Model file")
+        sub.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                         help="Confidence needed to answer without the LLM")
+        sub.add_argument("--min-confidence", type=float, default=0.0,
+                         help="Ignore LLM labels below this confidence")
+
+    train_parser = subparsers.choices["train"]
+    train_parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of LLM labels held out for evaluation")
+    train_parser.add_argument("--epochs", type=int, default=40)
+    train_parser.add_argument("--learning-rate", type=float, default=1.0)
+    train_parser.add_argument("--l2", type=float, default=1e-4)
+    train_parser.add_argument("--features", type=int, default=2 ** 14, help="Number of hash buckets")
+    train_parser.add_argument("--seed", type=int, default=0)
+    subparsers.choices["eval"].add_argument("--json", action="store_true", help="Also print the full report as JSON")
+
+    args = parser.parse_args()
+    return train(args) if args.command == "train" else evaluate(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,653 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+
+from utils.lru_cache import LRUCache
+
+# Pub/sub channels: one per client, one per topic and one for broadcasts
+CLIENT_CHANNEL = "ws:client:"
+TOPIC_CHANNEL = "ws:topic:"
+BROADCAST_CHANNEL = "ws:broadcast"
+
+# Messages without a sequence number: streamed chunks are superseded by the
+# final message, and init/resume frames carry the position themselves
+UNSEQUENCED_TYPES = ("message_delta", "init", "resume")
+
+
+class LocalBroker:
+    """
+    In-process pub/sub broker.
+
+    Connection managers sharing one instance behave like workers sharing Redis,
+    which makes it the stand-in for tests, benchmarks and single-worker runs.
+    """
+
+    def __init__(self):
+        self._handlers = {}  # channel -> handlers receiving published strings
+
+    async def subscribe(self, channel, handler):
+        """
+        Call a handler for every message published to a channel.
+
+        Args:
+            channel (str): Channel name
+            handler (callable): Coroutine function receiving the message string
+        """
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def unsubscribe(self, channel, handler):
+        """Stop calling a handler for a channel."""
+        handlers = self._handlers.get(channel)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self._handlers[channel]
+
+    async def publish(self, channel, data):
+        """
+        Deliver a message to the channel's subscribers.
+
+        Args:
+            channel (str): Channel name
+            data (str): Serialized message
+
+        Returns:
+            int: Number of subscribers that received it
+        """
+        handlers = list(self._handlers.get(channel, ()))
+        for handler in handlers:
+            try:
+                await handler(data)
+            except Exception as e:
+                print(f"[WEBSOCKET] Error delivering message on {channel}: {str(e)}")
+        return len(handlers)
+
+    async def close(self):
+        self._handlers.clear()
+
+
+class RedisBroker:
+    """Pub/sub broker on Redis, reaching subscribers in every worker."""
+
+    def __init__(self, client):
+        """
+        Initialize the broker.
+
+        Args:
+            client: Asyncio Redis client with string responses, see utils.redis_client
+        """
+        self.client = client
+        self._pubsub = None
+        self._reader = None
+        self._handlers = {}
+
+    async def subscribe(self, channel, handler):
+        """
+        Call a handler for every message published to a channel.
+
+        Args:
+            channel (str): Channel name
+            handler (callable): Coroutine function receiving the message string
+        """
+        handlers = self._handlers.setdefault(channel, [])
+        handlers.append(handler)
+        if len(handlers) > 1:
+            return
+        if self._pubsub is None:
+            self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(channel)
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read())
+
+    async def unsubscribe(self, channel, handler):
+        """Stop calling a handler for a channel."""
+        handlers = self._handlers.get(channel)
+        if not handlers or handler not in handlers:
+            return
+        handlers.remove(handler)
+        if not handlers:
+            del self._handlers[channel]
+            await self._pubsub.unsubscribe(channel)
+
+    async def publish(self, channel, data):
+        """
+        Publish a message to every worker subscribed to the channel.
+
+        Args:
+            channel (str): Channel name
+            data (str): Serialized message
+
+        Returns:
+            int: Number of Redis subscriptions that received it
+        """
+        return await self.client.publish(channel, data)
+
+    async def _read(self):
+        # One reader per worker dispatches every subscribed channel
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[WEBSOCKET] Error reading from Redis pub/sub: {str(e)}")
+                await asyncio.sleep(1)
+                continue
+            if message is None:
+                continue
+            for handler in list(self._handlers.get(message["channel"], ())):
+                try:
+                    await handler(message["data"])
+                except Exception as e:
+                    print(f"[WEBSOCKET] Error delivering message on {message['channel']}: {str(e)}")
+
+    async def close(self):
+        """Stop reading and release the pub/sub connection; the Redis client stays open."""
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        if self._pubsub is not None:
+            await self._pubsub.reset()
+            self._pubsub = None
+        self._handlers.clear()
+
+
+class ReplayLog:
+    """
+    Numbers a client's messages and keeps the latest ones for replay.
+
+    Sequence numbers increase by one per message within a stream, which is
+    identified by a random ID, so a client cannot mistake the numbers of a
+    log that was lost, e.g. on a worker restart, for those of this one.
+    """
+
+    __slots__ = ("stream", "last_seq", "_events")
+
+    def __init__(self, size):
+        """
+        Initialize the log.
+
+        Args:
+            size (int): Messages kept for replay
+        """
+        self.stream = uuid.uuid4().hex[:12]
+        self.last_seq = 0
+        self._events = deque(maxlen=size)
+
+    def record(self, message):
+        """
+        Number a message and keep it for replay.
+
+        Args:
+            message (dict): JSON-serializable message
+
+        Returns:
+            dict: The message with its "seq" number added
+        """
+        self.last_seq += 1
+        message = {**message, "seq": self.last_seq}
+        self._events.append(message)
+        return message
+
+    def since(self, seq):
+        """
+        Get the messages after a sequence number.
+
+        Args:
+            seq (int): Last sequence number the client received
+
+        Returns:
+            list: Messages in order, or None if some of them are no longer kept
+                or the number is not from this log
+        """
+        if seq > self.last_seq or seq < self.last_seq - len(self._events):
+            return None
+        missing = self.last_seq - seq
+        return list(self._events)[len(self._events) - missing:] if missing else []
+
+
+class OutboundQueue:
+    """
+    Bounded queue of messages for one connection, drained by its own writer task.
+
+    Queued messages are merged where a newer one makes an older one redundant:
+    an update_* panel message supersedes the pending one of the same type, and
+    consecutive message_delta chunks for the same target are joined. The newer
+    panel message goes to the end of the queue, so messages are always sent in
+    the order of their sequence numbers. When the
+    queue is full, deltas are dropped, since the final message or panel update
+    replaces the streamed text anyway; any other message means the consumer is
+    too slow and put() reports it.
+    """
+
+    def __init__(self, websocket, client_id, max_size, stats, on_failure):
+        """
+        Initialize the queue and start its writer.
+
+        Args:
+            websocket (WebSocket): The connection to write to
+            client_id (str): Client ID, for logging
+            max_size (int): Messages queued at most
+            stats (dict): Counters shared by every queue of the manager
+            on_failure (callable): Called with the client ID and a reason when a send fails
+        """
+        self.websocket = websocket
+        self.client_id = client_id
+        self.max_size = max_size
+        self.send_started = None  # when the send in progress started, checked by the manager
+        self.stats = stats
+        self.on_failure = on_failure
+        self._pending = deque()  # [message] entries; superseded ones are set to [None]
+        self._latest = {}        # update_* type -> its pending entry
+        self._superseded = 0     # superseded entries still in _pending
+        self._ready = asyncio.Event()
+        self._writer = asyncio.create_task(self._write())
+
+    def __len__(self):
+        return len(self._pending) - self._superseded
+
+    def put(self, message):
+        """
+        Queue a message without waiting for the connection.
+
+        Args:
+            message (dict): JSON-serializable message
+
+        Returns:
+            bool: False if the queue is full and the message could not be dropped
+        """
+        kind = message.get("type", "")
+        superseded = False
+        if kind.startswith("update_"):
+            entry = self._latest.get(kind)
+            if entry is not None:
+                entry[0] = None
+                self._superseded += 1
+                self.stats["coalesced"] += 1
+                superseded = True
+        elif kind == "message_delta" and self._pending:
+            last = self._pending[-1][0]
+            if last.get("type") == "message_delta" and last.get("target") == message.get("target"):
+                self._pending[-1][0] = {**last, "delta": last["delta"] + message["delta"]}
+                self.stats["coalesced"] += 1
+                return True
+
+        if not superseded and len(self) >= self.max_size:
+            if kind == "message_delta":
+                self.stats["dropped"] += 1
+                return True
+            return False
+
+        entry = [message]
+        self._pending.append(entry)
+        if not superseded:
+            self.stats["queued"] += 1
+        if kind.startswith("update_"):
+            self._latest[kind] = entry
+        self._ready.set()
+        return True
+
+    async def _write(self):
+        while True:
+            if not self._pending:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            entry = self._pending.popleft()
+            message = entry[0]
+            if message is None:
+                self._superseded -= 1
+                continue
+            kind = message.get("type", "")
+            if self._latest.get(kind) is entry:
+                del self._latest[kind]
+            self.send_started = time.monotonic()
+            try:
+                await self.websocket.send_json(message)
+            except Exception as e:
+                self.on_failure(self.client_id, f"send failed: {str(e)}")
+                return
+            self.send_started = None
+            self.stats["sent"] += 1
+
+    def close(self):
+        """Stop the writer, discarding queued messages."""
+        self._writer.cancel()
+        self._pending.clear()
+        self._latest.clear()
+        self._superseded = 0
+
+
+class ConnectionManager:
+    """
+    WebSocket connections of this worker.
+
+    Messages for a client connected here go into the connection's outbound
+    queue, so sending never waits for the client and one slow client cannot
+    hold up others. Messages for other clients go through the broker on the
+    client's channel and are queued by the worker holding the connection.
+    Clients can also join topics, e.g. their ticket, so a message can be
+    addressed without knowing the client ID. Clients that cannot keep up are
+    disconnected.
+
+    Every message except streamed chunks carries a sequence number from the
+    client's replay log. The log outlives the connection for a while, so a
+    client reconnecting to this worker with the last number it received gets
+    just the messages it missed instead of the full state.
+    """
+
+    def __init__(self, broker=None, worker_id=None, queue_size=None, send_timeout=None,
+                 replay_size=None, replay_ttl=None):
+        """
+        Initialize the manager.
+
+        Args:
+            broker (optional): LocalBroker or RedisBroker; a private LocalBroker by default
+            worker_id (str, optional): Identifies this worker's own broadcasts
+            queue_size (int, optional): Messages queued per connection at most (WS_QUEUE_SIZE)
+            send_timeout (float, optional): Seconds a send may take before the client
+                is disconnected as too slow (WS_SEND_TIMEOUT_SECONDS)
+            replay_size (int, optional): Messages kept per client for replay (WS_REPLAY_BUFFER_SIZE)
+            replay_ttl (float, optional): Seconds a disconnected client's messages are
+                kept for it to resume (WS_REPLAY_TTL_SECONDS)
+        """
+        self.active_connections = {}
+        self.broker = broker or LocalBroker()
+        self.worker_id = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.queue_size = queue_size or int(os.environ.get("WS_QUEUE_SIZE", "256"))
+        self.send_timeout = send_timeout or float(os.environ.get("WS_SEND_TIMEOUT_SECONDS", "10"))
+        self._queues = {}          # client_id -> OutboundQueue
+        self._client_topics = {}   # client_id -> topics joined
+        self._topic_members = {}   # topic -> local client IDs
+        self._broadcast_subscribed = False
+        self._watchdog = None      # task disconnecting clients whose sends stall
+        self._closing = set()      # slow clients being disconnected
+        self.replay_size = replay_size or int(os.environ.get("WS_REPLAY_BUFFER_SIZE", "200"))
+        self._logs = {}            # client_id -> ReplayLog of connected clients
+        # Logs of disconnected clients, until they reconnect or expire
+        self._detached = LRUCache(
+            max_entries=int(os.environ.get("WS_REPLAY_MAX_DETACHED", "10000")),
+            default_ttl=replay_ttl or float(os.environ.get("WS_REPLAY_TTL_SECONDS", "600"))
+        )
+        self.stats = {
+            "queued": 0, "sent": 0, "coalesced": 0, "dropped": 0, "slow_disconnects": 0,
+            "published": 0, "received_remote": 0, "broadcasts": 0,
+            "resumed": 0, "replayed": 0, "resume_misses": 0
+        }
+
+    async def connect(self, websocket, client_id, topics=(), last_seq=None, stream=None):
+        """
+        Accept a connection and subscribe to its client channel and topics.
+
+        Args:
+            websocket (WebSocket): The new connection
+            client_id (str): Client ID
+            topics (iterable): Topics the client receives messages for
+            last_seq (int, optional): Last sequence number a reconnecting client received
+            stream (str, optional): Replay stream that number belongs to
+
+        Returns:
+            bool: True if the client resumed: a "resume" message and the messages
+                it missed are queued. Otherwise the client needs the full state.
+        """
+        await websocket.accept()
+        # A client reconnecting before its old connection closed replaces it
+        replaced = client_id in self.active_connections
+        if replaced:
+            self._queues.pop(client_id).close()
+        self.active_connections[client_id] = websocket
+        queue = OutboundQueue(websocket, client_id, self.queue_size, self.stats, self._on_send_failure)
+        self._queues[client_id] = queue
+        log = self._logs.get(client_id) or self._detached.get(client_id)
+        if log is None:
+            log = ReplayLog(self.replay_size)
+        self._detached.invalidate(client_id)
+        self._logs[client_id] = log
+        # Queue the missed messages before anything new can be sent
+        resumed = self._resume(queue, log, last_seq, stream)
+        if self._watchdog is None:
+            self._watchdog = asyncio.create_task(self._watch_sends())
+        if not self._broadcast_subscribed:
+            self._broadcast_subscribed = True
+            await self.broker.subscribe(BROADCAST_CHANNEL, self._receive_broadcast)
+        if not replaced:
+            await self.broker.subscribe(CLIENT_CHANNEL + client_id, self._receive_client_message)
+        await self.set_topics(client_id, topics)
+        return resumed
+
+    async def set_topics(self, client_id, topics):
+        """
+        Replace the topics a client connected to this worker receives messages for.
+
+        Args:
+            client_id (str): Client ID
+            topics (iterable): Topics to join; topics left out are left
+        """
+        if client_id not in self.active_connections:
+            return
+        await self._leave_topics(client_id)
+        self._client_topics[client_id] = list(topics)
+        for topic in topics:
+            members = self._topic_members.setdefault(topic, set())
+            if not members:
+                await self.broker.subscribe(TOPIC_CHANNEL + topic, self._receive_topic_message)
+            members.add(client_id)
+
+    async def _leave_topics(self, client_id):
+        for topic in self._client_topics.pop(client_id, ()):
+            members = self._topic_members.get(topic)
+            if members is None:
+                continue
+            members.discard(client_id)
+            if not members:
+                del self._topic_members[topic]
+                await self.broker.unsubscribe(TOPIC_CHANNEL + topic, self._receive_topic_message)
+
+    def _resume(self, queue, log, last_seq, stream):
+        if last_seq is None:
+            return False
+        events = log.since(last_seq) if stream == log.stream else None
+        if events is None or len(events) >= self.queue_size:
+            self.stats["resume_misses"] += 1
+            return False
+        queue.put({"type": "resume", "stream": log.stream, "seq": last_seq, "missed": len(events)})
+        for event in events:
+            queue.put(event)
+        self.stats["resumed"] += 1
+        self.stats["replayed"] += len(events)
+        return True
+
+    def replay_position(self, client_id):
+        """
+        Get the position of a client's replay log, to send along with the full state.
+
+        Args:
+            client_id (str): Client ID
+
+        Returns:
+            tuple: Stream ID and last sequence number, or (None, 0) without a log
+        """
+        log = self._logs.get(client_id) or self._detached.get(client_id)
+        if log is None:
+            return None, 0
+        return log.stream, log.last_seq
+
+    def replay_events(self, client_id, since_seq, stream):
+        """
+        Get the messages a client missed after a sequence number.
+
+        Args:
+            client_id (str): Client ID
+            since_seq (int): Last sequence number the client received
+            stream (str): Replay stream that number belongs to
+
+        Returns:
+            list: Missed messages in order, or None if the client needs the full state
+        """
+        log = self._logs.get(client_id) or self._detached.get(client_id)
+        if log is None or log.stream != stream:
+            return None
+        return log.since(since_seq)
+
+    async def disconnect(self, client_id, websocket=None):
+        """
+        Forget a connection and its subscriptions.
+
+        Args:
+            client_id (str): Client ID
+            websocket (WebSocket, optional): Only disconnect if this is still the
+                client's current connection, e.g. after the client reconnected
+        """
+        current = self.active_connections.get(client_id)
+        if current is None or (websocket is not None and current is not websocket):
+            return
+        del self.active_connections[client_id]
+        self._queues.pop(client_id).close()
+        # Keep numbering the client's messages while it is away, for it to resume
+        self._detached.set(client_id, self._logs.pop(client_id))
+        await self.broker.unsubscribe(CLIENT_CHANNEL + client_id, self._receive_client_message)
+        await self._leave_topics(client_id)
+
+    async def send_message(self, client_id, message):
+        """
+        Send a message to a client, on whichever worker it is connected to.
+
+        Args:
+            client_id (str): Client ID
+            message (dict): JSON-serializable message
+        """
+        if client_id in self.active_connections:
+            self._send_local(client_id, message)
+            return
+        log = self._detached.get(client_id)
+        if log is not None and message.get("type") not in UNSEQUENCED_TYPES:
+            log.record(message)
+        self.stats["published"] += 1
+        await self.broker.publish(CLIENT_CHANNEL + client_id, json.dumps({"client_id": client_id, "message": message}))
+
+    async def send_to_topic(self, topic, message):
+        """
+        Send a message to every client that joined a topic, on any worker.
+
+        Args:
+            topic (str): Topic name
+            message (dict): JSON-serializable message
+        """
+        for client_id in list(self._topic_members.get(topic, ())):
+            self._send_local(client_id, message)
+        self.stats["published"] += 1
+        await self.broker.publish(TOPIC_CHANNEL + topic, json.dumps({
+            "origin": self.worker_id, "topic": topic, "message": message
+        }))
+
+    async def broadcast(self, message):
+        """
+        Send a message to every connected client, on every worker.
+
+        Args:
+            message (dict): JSON-serializable message
+        """
+        self.stats["broadcasts"] += 1
+        self._broadcast_local(message)
+        self.stats["published"] += 1
+        await self.broker.publish(BROADCAST_CHANNEL, json.dumps({"origin": self.worker_id, "message": message}))
+
+    def _send_local(self, client_id, message):
+        queue = self._queues.get(client_id)
+        if queue is None:
+            return
+        if message.get("type") not in UNSEQUENCED_TYPES:
+            message = self._logs[client_id].record(message)
+        if not queue.put(message):
+            self._on_send_failure(client_id, f"{len(queue)} messages waiting")
+
+    def _broadcast_local(self, message):
+        # Queue for every client; their writers deliver concurrently
+        for client_id in list(self._queues):
+            self._send_local(client_id, message)
+
+    def _on_send_failure(self, client_id, reason):
+        websocket = self.active_connections.get(client_id)
+        if websocket is None or client_id in self._closing:
+            return
+        self._closing.add(client_id)
+        self.stats["slow_disconnects"] += 1
+        print(f"[WEBSOCKET] Disconnecting slow client #{client_id}: {reason}")
+        asyncio.ensure_future(self._close_connection(client_id, websocket))
+
+    async def _watch_sends(self):
+        # One periodic check for every connection instead of a timeout per send
+        while True:
+            await asyncio.sleep(min(self.send_timeout, 1.0))
+            cutoff = time.monotonic() - self.send_timeout
+            for client_id, queue in list(self._queues.items()):
+                if queue.send_started is not None and queue.send_started < cutoff:
+                    self._on_send_failure(client_id, f"send took longer than {self.send_timeout}s")
+
+    async def _close_connection(self, client_id, websocket):
+        try:
+            await self.disconnect(client_id, websocket)
+        finally:
+            self._closing.discard(client_id)
+        try:
+            # 1013 "try again later": the client reconnects and resumes from its last message
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+
+    async def _receive_client_message(self, data):
+        payload = json.loads(data)
+        self.stats["received_remote"] += 1
+        self._send_local(payload["client_id"], payload["message"])
+
+    async def _receive_topic_message(self, data):
+        payload = json.loads(data)
+        if payload["origin"] == self.worker_id:
+            return
+        self.stats["received_remote"] += 1
+        for client_id in list(self._topic_members.get(payload["topic"], ())):
+            self._send_local(client_id, payload["message"])
+
+    async def _receive_broadcast(self, data):
+        payload = json.loads(data)
+        if payload["origin"] == self.worker_id:
+            return
+        self.stats["received_remote"] += 1
+        self._broadcast_local(payload["message"])
+
+    async def close(self):
+        """Stop the writers and release the broker's subscriptions, e.g. on shutdown."""
+        for queue in self._queues.values():
+            queue.close()
+        self._queues.clear()
+        self._logs.clear()
+        self._detached.clear()
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+        await self.broker.close()
+
+    def get_stats(self):
+        """
+        Get connection and delivery counters.
+
+        Returns:
+            dict: Local connections, worker ID, broker type, outbound queue
+                depths, replay logs and message counts
+        """
+        depths = [len(queue) for queue in self._queues.values()]
+        return {
+            "worker_id": self.worker_id,
+            "broker": type(self.broker).__name__,
+            "connections": len(self.active_connections),
+            "topics": len(self._topic_members),
+            "queue_size": self.queue_size,
+            "queued_now": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "replay_buffer_size": self.replay_size,
+            "detached_logs": len(self._detached),
+            **self.stats
+        }
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+
+from utils.conversation_utils import TOKEN_PATTERN, estimate_tokens
+from utils.transcript import ConversationTranscript, TranscriptView
+
+
+class ContextBuilder:
+    """Fits conversation context into a token budget: rolling summary plus the most recent messages verbatim."""
+
+    # Shared instance used by BaseAgent
+    _shared = None
+
+    def __init__(self, max_recent_messages=None, budgets=None):
+        """
+        Initialize the builder.
+
+        Args:
+            max_recent_messages (int, optional): Messages kept verbatim at most
+                (CONTEXT_MAX_RECENT_MESSAGES)
+            budgets (dict, optional): Token budget overrides by agent name
+                (CONTEXT_BUDGETS, a JSON object)
+        """
+        self.max_recent_messages = max_recent_messages or int(os.environ.get("CONTEXT_MAX_RECENT_MESSAGES", "8"))
+        if budgets is None:
+            try:
+                budgets = json.loads(os.environ.get("CONTEXT_BUDGETS", "{}"))
+            except ValueError:
+                print("[UTILS] Ignoring invalid CONTEXT_BUDGETS, expected a JSON object")
+                budgets = {}
+        self.budgets = budgets
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_shared(cls):
+        """Return the process-wide builder, creating it on first use."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def budget_for(self, label, default):
+        """
+        Get the token budget for an agent.
+
+        Args:
+            label (str): Agent name
+            default (int): The agent's own budget
+
+        Returns:
+            int: Configured override or the default
+        """
+        return int(self.budgets.get(label, default))
+
+    def build(self, conversation_history, summary=None, budget=1200, label="default"):
+        """
+        Build conversation context that fits the budget.
+
+        Messages are taken newest first until the message limit or the budget is
+        reached. If older messages had to be left out, the summary stands in for
+        them. The latest message is always included, cut to the budget if needed.
+
+        Args:
+            conversation_history (ConversationTranscript or TranscriptView): Conversation
+                messages, oldest first; their per-message renderings and token
+                counts are reused, so only the kept messages are visited. A plain
+                list is accepted and measured on the fly.
+            summary (str, optional): Rolling summary of the conversation
+            budget (int): Maximum tokens for the returned context
+            label (str): Name the call is reported under, usually the agent name
+
+        Returns:
+            str: Context text for the prompt
+        """
+        view = conversation_history
+        if not isinstance(view, TranscriptView):
+            view = ConversationTranscript(view)
+        full_tokens = view.tokens
+
+        if full_tokens <= budget and len(view) <= self.max_recent_messages:
+            self._record(label, full_tokens, full_tokens, truncated=False)
+            return view.text
+
+        summary_block = ""
+        summary_tokens = 0
+        if summary:
+            summary_block = f"Summary of earlier conversation:\n{summary.strip()}\n\nRecent messages:\n"
+            summary_tokens = estimate_tokens(summary_block)
+            if summary_tokens > budget // 2:
+                # Keep the summary from crowding out the recent messages
+                summary_block = self._truncate(summary_block, budget // 2) + "\n\nRecent messages:\n"
+                summary_tokens = estimate_tokens(summary_block)
+
+        kept = []
+        used = summary_tokens
+        cut = False
+        index = len(view) - 1
+        while index >= 0:
+            line = view.rendered(index)
+            tokens = view.token_count(index)
+            if line:
+                if len(kept) >= self.max_recent_messages or (kept and used + tokens > budget):
+                    break
+                if not kept and used + tokens > budget:
+                    line = self._truncate(line, max(budget - used, 1)) + "\n\n"
+                    tokens = estimate_tokens(line)
+                    cut = True
+                kept.append(line)
+                used += tokens
+            index -= 1
+
+        if (index < 0 and not cut) or (full_tokens <= budget and used >= full_tokens):
+            # Nothing was left out, or the summary costs more than the messages it replaces
+            self._record(label, full_tokens, full_tokens, truncated=False)
+            return view.text
+        context = summary_block + "".join(reversed(kept))
+        self._record(label, full_tokens, used, truncated=True)
+        return context
+
+    @staticmethod
+    def _truncate(text, max_tokens):
+        """Cut text to roughly max_tokens tokens at a piece boundary."""
+        used = 0
+        for match in TOKEN_PATTERN.finditer(text):
+            used += 1 + len(match.group()) // 8
+            if used > max_tokens:
+                return text[:match.start()].rstrip() + " ..."
+        return text
+
+    def _record(self, label, full_tokens, sent_tokens, truncated):
+        with self._lock:
+            stats = self._stats.setdefault(label, {
+                "calls": 0, "truncated_calls": 0, "tokens_full": 0, "tokens_sent": 0, "tokens_saved": 0, "last_saved": 0
+            })
+            stats["calls"] += 1
+            stats["truncated_calls"] += truncated
+            stats["tokens_full"] += full_tokens
+            stats["tokens_sent"] += sent_tokens
+            stats["tokens_saved"] += max(full_tokens - sent_tokens, 0)
+            stats["last_saved"] = max(full_tokens - sent_tokens, 0)
+        if truncated:
+            print(f"[UTILS] {label} context fitted to {sent_tokens} of {full_tokens} tokens")
+
+    def get_stats(self):
+        """
+        Get per-agent token accounting.
+
+        Returns:
+            dict: Calls, truncated calls and full/sent/saved token totals per agent
+        """
+        with self._lock:
+            agents = {label: dict(stats) for label, stats in self._stats.items()}
+        return {
+            "max_recent_messages": self.max_recent_messages,
+            "agents": agents
+        }
@@ -1,25 +1,58 @@
+import re
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def format_message(message):
+    """
+    Format a single conversation message the way agents see it.
+    
+    Args:
+        message (dict): Message with role, content and timestamp
+        
+    Returns:
+        str: Formatted message, or an empty string for unknown roles
+    """
+    role = message.get("role", "unknown")
+    content = message.get("content", "")
+    timestamp = message.get("timestamp", "")
+    
+    if role == "user":
+        return f"Customer [{timestamp}]: {content}\n\n"
+    elif role == "assistant":
+        return f"Support Agent [{timestamp}]: {content}\n\n"
+    return ""
+
+def estimate_tokens(text):
+    """
+    Estimate the number of model tokens in a text.
+    
+    Counts words and punctuation marks, with long words counted as several
+    sub-word pieces the way BPE tokenizers split them.
+    
+    Args:
+        text (str): Text to measure
+        
+    Returns:
+        int: Approximate token count
+    """
+    return sum(1 + len(piece) // 8 for piece in TOKEN_PATTERN.findall(text))
+
 def format_conversation_history(conversation_history):
     """
     Format the conversation history for agent consumption.
     
     Args:
-        conversation_history (list): List of conversation messages
+        conversation_history (list or ConversationTranscript): Conversation messages;
+            transcripts return their cached rendering
         
     Returns:
         str: Formatted conversation string
     """
     print(f"[UTILS] Formatting conversation history with {len(conversation_history)} messages")
-    formatted_conversation = ""
-    
-    for message in conversation_history:
-        role = message.get("role", "unknown")
-        content = message.get("content", "")
-        timestamp = message.get("timestamp", "")
-        
-        if role == "user":
-            formatted_conversation += f"Customer [{timestamp}]: {content}\n\n"
-        elif role == "assistant":
-            formatted_conversation += f"Support Agent [{timestamp}]: {content}\n\n"
+    if hasattr(conversation_history, "rendered"):
+        formatted_conversation = conversation_history.text
+    else:
+        formatted_conversation = "".join(format_message(message) for message in conversation_history)
     
     print(f"[UTILS] Formatted conversation is {len(formatted_conversation)} characters long")
     return formatted_conversation
@@ -110,7 +143,7 @@ def get_conversation_metadata(conversation_history):
     Extract metadata from a conversation.
     
     Args:
-        conversation_history (list): List of message dictionaries
+        conversation_history (list or ConversationTranscript): Conversation messages
         
     Returns:
         dict: Conversation metadata
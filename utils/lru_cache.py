@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with per-entry TTL and size limits."""
+
+    def __init__(self, max_entries=1024, default_ttl=None, max_bytes=None, size_of=len):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of entries kept
+            default_ttl (float, optional): Seconds an entry lives when set() gets no ttl;
+                None keeps entries until evicted
+            max_bytes (int, optional): Approximate size limit across all values
+            size_of (callable): Function estimating the size of a value for max_bytes
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """
+        Get a value and mark it as recently used.
+
+        Args:
+            key: Cache key
+            default: Returned on a miss
+
+        Returns:
+            The cached value, or default if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value, evicting least recently used entries when over the limits.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl (float, optional): Seconds until the entry expires; defaults to default_ttl
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        size = self.size_of(value) if self.max_bytes else 0
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """
+        Remove an entry if present.
+
+        Returns:
+            bool: True if an entry was removed
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                return True
+            return False
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Size, hit/miss counts and hit ratio
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes if self.max_bytes else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
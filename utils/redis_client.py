@@ -0,0 +1,199 @@
+import asyncio
+import os
+import time
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+try:
+    import fakeredis.aioredis as fakeredis_asyncio
+except ImportError:
+    fakeredis_asyncio = None
+
+# REDIS_URL value that selects an in-process stand-in instead of a server
+LOCAL_REDIS_URL = "local://"
+
+
+def create_redis_client(url=None):
+    """
+    Create an asyncio Redis client with string responses.
+
+    Args:
+        url (str, optional): Redis URL (REDIS_URL); "local://" gives an in-process
+            stand-in, fakeredis when installed and LocalRedis otherwise
+
+    Returns:
+        Redis client exposing the redis.asyncio command methods
+    """
+    url = url or os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+    if url == LOCAL_REDIS_URL:
+        if fakeredis_asyncio is not None:
+            print("[UTILS] Using fakeredis in-process Redis")
+            return fakeredis_asyncio.FakeRedis(decode_responses=True)
+        print("[UTILS] Using LocalRedis in-process Redis")
+        return LocalRedis()
+    if redis_asyncio is None:
+        raise ImportError("The redis package is required for REDIS_URL " + url + " (pip install redis)")
+    print(f"[UTILS] Connecting to Redis at {url.split('@')[-1]}")
+    return redis_asyncio.from_url(url, decode_responses=True)
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the subset of Redis commands the app uses.
+
+    Values are kept as strings, like a client created with decode_responses=True.
+    Pub/sub reaches subscriptions of the same LocalRedis. State is private to the
+    process, so it is meant for tests and single-worker runs.
+    """
+
+    def __init__(self):
+        self._data = {}     # key -> str, dict or list
+        self._expires = {}  # key -> expiry time
+        self._subscriptions = {}  # channel -> LocalPubSub objects subscribed to it
+
+    def _live(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return self._data.get(key)
+
+    async def hset(self, name, key=None, value=None, mapping=None):
+        fields = dict(mapping or {})
+        if key is not None:
+            fields[key] = value
+        stored = self._live(name)
+        if stored is None:
+            stored = self._data[name] = {}
+        added = sum(1 for field in fields if field not in stored)
+        stored.update({field: str(value) for field, value in fields.items()})
+        return added
+
+    async def hsetnx(self, name, key, value):
+        stored = self._live(name)
+        if stored is not None and key in stored:
+            return 0
+        return await self.hset(name, key, value)
+
+    async def hgetall(self, name):
+        return dict(self._live(name) or {})
+
+    async def incr(self, name, amount=1):
+        value = int(self._live(name) or 0) + amount
+        self._data[name] = str(value)
+        return value
+
+    async def rpush(self, name, *values):
+        stored = self._live(name)
+        if stored is None:
+            stored = self._data[name] = []
+        stored.extend(str(value) for value in values)
+        return len(stored)
+
+    async def lrange(self, name, start, end):
+        stored = self._live(name) or []
+        end = len(stored) if end == -1 else end + 1
+        return list(stored[start:end])
+
+    async def expire(self, name, seconds):
+        if self._live(name) is None:
+            return False
+        self._expires[name] = time.time() + seconds
+        return True
+
+    async def delete(self, *names):
+        removed = 0
+        for name in names:
+            if self._live(name) is not None:
+                del self._data[name]
+                removed += 1
+            self._expires.pop(name, None)
+        return removed
+
+    def pipeline(self, transaction=True):
+        return LocalPipeline(self)
+
+    async def publish(self, channel, message):
+        subscribers = list(self._subscriptions.get(channel, ()))
+        for pubsub in subscribers:
+            pubsub.deliver(channel, message)
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return LocalPubSub(self)
+
+    async def aclose(self):
+        pass
+
+
+class LocalPipeline:
+    """Queues LocalRedis commands and runs them in order on execute(), like a Redis pipeline."""
+
+    def __init__(self, client):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        commands, self._commands = self._commands, []
+        return [await method(*args, **kwargs) for method, args, kwargs in commands]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._commands = []
+
+
+class LocalPubSub:
+    """
+    Subscription connection of a LocalRedis, like redis.asyncio.client.PubSub.
+
+    Only published messages are queued; subscribe and unsubscribe confirmations
+    are never produced, as if ignore_subscribe_messages were always set.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._channels = set()
+        self._messages = asyncio.Queue()
+
+    def deliver(self, channel, message):
+        self._messages.put_nowait({"type": "message", "pattern": None, "channel": channel, "data": str(message)})
+
+    async def subscribe(self, *channels):
+        for channel in channels:
+            self._channels.add(channel)
+            self._client._subscriptions.setdefault(channel, set()).add(self)
+
+    async def unsubscribe(self, *channels):
+        for channel in channels or list(self._channels):
+            self._channels.discard(channel)
+            subscribers = self._client._subscriptions.get(channel)
+            if subscribers is not None:
+                subscribers.discard(self)
+                if not subscribers:
+                    del self._client._subscriptions[channel]
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            return await asyncio.wait_for(self._messages.get(), timeout=timeout or 0.001)
+        except asyncio.TimeoutError:
+            return None
+
+    async def reset(self):
+        await self.unsubscribe()
+        self._messages = asyncio.Queue()
+
+    async def aclose(self):
+        await self.reset()
@@ -0,0 +1,231 @@
+import json
+import os
+
+from utils.redis_client import create_redis_client
+from utils.session import Session
+from utils.transcript import Message
+
+
+class RedisSessionStore:
+    """
+    Session store shared by every worker through Redis.
+
+    Each session is a hash of its scalar fields plus a list of its messages,
+    each stored as a compact [role, content, epoch seconds] JSON array. Changes
+    are written per field and per appended message rather than as a whole
+    session, and both keys expire after SESSION_REDIS_TTL_SECONDS without use.
+    Sessions with an open connection on this worker are kept in memory and are
+    read from Redis again after they are released. Same interface as SessionStore.
+    """
+
+    # Session attributes stored in the hash and how they are encoded
+    FIELDS = (
+        "ticket_id", "current_summary", "summary_watermark", "summary_updates",
+        "actions", "recommendations", "routing", "time_estimate", "ticket_row"
+    )
+    INT_FIELDS = ("summary_watermark", "summary_updates")
+    JSON_FIELDS = ("actions", "recommendations", "routing", "ticket_row")
+
+    def __init__(self, client=None, ttl=None, key_prefix=None):
+        """
+        Initialize the store.
+
+        Args:
+            client (optional): Asyncio Redis client, created from REDIS_URL by default
+            ttl (int, optional): Seconds an unused session is kept (SESSION_REDIS_TTL_SECONDS)
+            key_prefix (str, optional): Prefix of the Redis keys (SESSION_REDIS_PREFIX)
+        """
+        self.client = client or create_redis_client()
+        self.ttl = ttl or int(os.environ.get("SESSION_REDIS_TTL_SECONDS", str(7 * 24 * 3600)))
+        self.key_prefix = key_prefix or os.environ.get("SESSION_REDIS_PREFIX", "session:")
+        self._pinned = {}  # session_id -> [session, open connections]
+        self.stats = {"created": 0, "loads": 0, "field_writes": 0, "messages_appended": 0}
+
+    def _keys(self, session_id):
+        key = f"{self.key_prefix}{session_id}"
+        return key, f"{key}:messages"
+
+    @classmethod
+    def encode_fields(cls, session, fields):
+        """
+        Encode session attributes as Redis hash values.
+
+        Args:
+            session (Session): The session
+            fields (iterable): Attribute names to encode
+
+        Returns:
+            dict: Field name to string value
+        """
+        encoded = {}
+        for field in fields:
+            value = getattr(session, field)
+            encoded[field] = json.dumps(value, separators=(",", ":")) if field in cls.JSON_FIELDS else str(value)
+        return encoded
+
+    @staticmethod
+    def encode_message(message):
+        """Encode a message as a compact JSON array."""
+        return json.dumps([message.role, message.content, message.created_at], separators=(",", ":"))
+
+    @classmethod
+    def decode(cls, fields, messages):
+        """
+        Rebuild a session from its hash and message list.
+
+        Args:
+            fields (dict): The session hash
+            messages (list): Encoded messages, oldest first
+
+        Returns:
+            Session: The session
+        """
+        session = Session(fields["ticket_id"])
+        for field in cls.FIELDS[1:]:
+            if field not in fields:
+                continue
+            value = fields[field]
+            if field in cls.INT_FIELDS:
+                value = int(value)
+            elif field in cls.JSON_FIELDS:
+                value = json.loads(value)
+            setattr(session, field, value)
+        for encoded in messages:
+            role, content, created_at = json.loads(encoded)
+            session.conversation_history.append(Message(role, content, created_at))
+        return session
+
+    async def get(self, session_id):
+        """
+        Get a session.
+
+        Args:
+            session_id (str): Session ID
+
+        Returns:
+            Session: The session, or None if it is unknown or expired
+        """
+        pinned = self._pinned.get(session_id)
+        if pinned is not None:
+            return pinned[0]
+
+        key, messages_key = self._keys(session_id)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(key)
+            pipe.lrange(messages_key, 0, -1)
+            pipe.expire(key, self.ttl)
+            pipe.expire(messages_key, self.ttl)
+            fields, messages, _, _ = await pipe.execute()
+        if not fields or "ticket_id" not in fields:
+            return None
+        self.stats["loads"] += 1
+        return self.decode(fields, messages)
+
+    async def put(self, session_id, session, created=True):
+        """
+        Add a session unless one is already stored under the ID.
+
+        Args:
+            session_id (str): Session ID
+            session (Session): The session
+            created (bool): Whether the session is new, for the stats
+
+        Returns:
+            Session: The stored session, which is an existing one if another
+                request or worker added it first
+        """
+        key, messages_key = self._keys(session_id)
+        # Claiming the ticket ID field decides which worker's session is kept
+        if not await self.client.hsetnx(key, "ticket_id", session.ticket_id):
+            existing = await self.get(session_id)
+            if existing is not None:
+                return existing
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=self.encode_fields(session, self.FIELDS))
+            pipe.delete(messages_key)
+            if len(session.conversation_history):
+                pipe.rpush(messages_key, *[self.encode_message(message) for message in session.conversation_history])
+                pipe.expire(messages_key, self.ttl)
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+        if created:
+            self.stats["created"] += 1
+        return session
+
+    async def save(self, session_id, session, *fields):
+        """
+        Write changed session attributes.
+
+        Args:
+            session_id (str): Session ID
+            session (Session): The session
+            *fields (str): Names of the attributes that changed
+        """
+        key, _ = self._keys(session_id)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping=self.encode_fields(session, fields))
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+        self.stats["field_writes"] += len(fields)
+
+    async def append_message(self, session_id, session, message):
+        """
+        Add a message to the session's conversation and to Redis.
+
+        Args:
+            session_id (str): Session ID
+            session (Session): The session
+            message (Message): The new message
+        """
+        session.conversation_history.append(message)
+        key, messages_key = self._keys(session_id)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.rpush(messages_key, self.encode_message(message))
+            pipe.expire(messages_key, self.ttl)
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+        self.stats["messages_appended"] += 1
+
+    def pin(self, session_id, session=None):
+        """Keep a session in this worker's memory while a connection uses it."""
+        pinned = self._pinned.get(session_id)
+        if pinned is None:
+            self._pinned[session_id] = [session, 1]
+        else:
+            pinned[1] += 1
+
+    def unpin(self, session_id):
+        """Release a pin; once unpinned, the session is read from Redis again."""
+        pinned = self._pinned.get(session_id)
+        if pinned is None:
+            return
+        pinned[1] -= 1
+        if pinned[1] <= 0:
+            del self._pinned[session_id]
+
+    async def run_sweeper(self, interval=None):
+        """Nothing to sweep: Redis expires unused sessions itself."""
+        return
+
+    async def close(self):
+        """Close the Redis connection, e.g. on shutdown; sessions are already stored."""
+        self._pinned.clear()
+        await self.client.aclose()
+
+    def __len__(self):
+        return len(self._pinned)
+
+    def get_stats(self):
+        """
+        Get store counters.
+
+        Returns:
+            dict: Backend, sessions pinned on this worker and read/write counts
+        """
+        return {
+            "backend": "redis",
+            "pinned": len(self._pinned),
+            "ttl": self.ttl,
+            **self.stats
+        }
@@ -0,0 +1,128 @@
+from utils.transcript import ConversationTranscript, Message
+
+
+class Session:
+    """Per-client support session, kept small since thousands can be live at once."""
+
+    __slots__ = (
+        "ticket_id", "conversation_history", "current_summary", "summary_watermark", "summary_updates",
+        "actions", "recommendations", "routing", "time_estimate", "ticket_row"
+    )
+
+    def __init__(self, ticket_id):
+        """
+        Initialize an empty session.
+
+        Insight fields start as None rather than empty containers and are
+        rendered as empty values by to_dict().
+
+        Args:
+            ticket_id (str): Ticket the session's conversation is saved under
+        """
+        self.ticket_id = ticket_id
+        self.conversation_history = ConversationTranscript()
+        self.current_summary = ""
+        # Messages covered by current_summary and incremental updates since the last full summary
+        self.summary_watermark = 0
+        self.summary_updates = 0
+        self.actions = None
+        self.recommendations = None
+        self.routing = None
+        self.time_estimate = ""
+        # Ticket table row as last saved, to send only changed columns next time
+        self.ticket_row = None
+
+    def to_dict(self):
+        """
+        Get the session state in the format sent to clients.
+
+        Returns:
+            dict: Ticket ID, conversation history and the current insights
+        """
+        return {
+            "ticket_id": self.ticket_id,
+            "conversation_history": self.conversation_history.messages,
+            "current_summary": self.current_summary,
+            "actions": self.actions or [],
+            "recommendations": self.recommendations or [],
+            "routing": self.routing or {},
+            "time_estimate": self.time_estimate
+        }
+
+    def to_record(self):
+        """
+        Get the complete session state for storage.
+
+        Unlike to_dict(), this keeps summary bookkeeping and stores messages
+        compactly as [role, content, epoch seconds] lists.
+
+        Returns:
+            dict: JSON-serializable session state
+        """
+        return {
+            "ticket_id": self.ticket_id,
+            "messages": [[message.role, message.content, message.created_at] for message in self.conversation_history],
+            "current_summary": self.current_summary,
+            "summary_watermark": self.summary_watermark,
+            "summary_updates": self.summary_updates,
+            "actions": self.actions,
+            "recommendations": self.recommendations,
+            "routing": self.routing,
+            "time_estimate": self.time_estimate,
+            "ticket_row": self.ticket_row
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        """
+        Rebuild a session stored with to_record().
+
+        Args:
+            record (dict): Stored session state
+
+        Returns:
+            Session: The restored session
+        """
+        session = cls(record["ticket_id"])
+        for role, content, created_at in record.get("messages", []):
+            session.conversation_history.append(Message(role, content, created_at))
+        session.current_summary = record.get("current_summary", "")
+        session.summary_watermark = record.get("summary_watermark", 0)
+        session.summary_updates = record.get("summary_updates", 0)
+        session.actions = record.get("actions")
+        session.recommendations = record.get("recommendations")
+        session.routing = record.get("routing")
+        session.time_estimate = record.get("time_estimate", "")
+        session.ticket_row = record.get("ticket_row")
+        return session
+
+    def ticket_changes(self, row):
+        """
+        Get the columns of the session's ticket row that changed since it was last saved.
+
+        Nothing is remembered here: until ticket_saved() reports the write,
+        the same changes are returned again, so a write that is lost is
+        simply repeated. While nothing is saved, the whole row is returned,
+        which creates the ticket.
+
+        Args:
+            row (dict): Current ticket row, including ticket_id
+
+        Returns:
+            dict: ticket_id and the changed columns, or None if nothing changed
+        """
+        saved = self.ticket_row or {}
+        dirty = {column for column, value in row.items() if column not in saved or saved[column] != value}
+        if self.ticket_row is not None and not dirty:
+            return None
+        return {"ticket_id": row["ticket_id"], **{column: row[column] for column in dirty}}
+
+    def ticket_saved(self, row):
+        """
+        Remember columns of the session's ticket row as written to the database.
+
+        Args:
+            row (dict): The written row or changed columns, including ticket_id
+        """
+        if row["ticket_id"] == self.ticket_id:
+            self.ticket_row = {**(self.ticket_row or {}), **row}
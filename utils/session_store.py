@@ -0,0 +1,283 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+from utils.session import Session
+
+
+class SessionStore:
+    """
+    Bounded in-memory session store.
+
+    Sessions are kept in least recently used order. A session is evicted when
+    the store is over max_sessions or the session has been idle for idle_ttl
+    seconds, unless a connection has it pinned. Evicted sessions are written to
+    snapshot_dir, when set, and loaded again the next time they are requested.
+    """
+
+    def __init__(self, max_sessions=None, idle_ttl=None, snapshot_dir=None, snapshot_ttl=None):
+        """
+        Initialize the store.
+
+        Args:
+            max_sessions (int, optional): Sessions kept in memory at most (SESSION_MAX_ACTIVE)
+            idle_ttl (float, optional): Seconds an unpinned session stays in memory
+                without being used (SESSION_IDLE_TTL_SECONDS)
+            snapshot_dir (str, optional): Directory evicted sessions are written to
+                (SESSION_SNAPSHOT_DIR); an empty string disables snapshots
+            snapshot_ttl (float, optional): Seconds a snapshot is kept before the
+                sweeper deletes it (SESSION_SNAPSHOT_TTL_SECONDS)
+        """
+        self.max_sessions = max_sessions or int(os.environ.get("SESSION_MAX_ACTIVE", "10000"))
+        self.idle_ttl = idle_ttl or float(os.environ.get("SESSION_IDLE_TTL_SECONDS", "1800"))
+        if snapshot_dir is None:
+            snapshot_dir = os.environ.get("SESSION_SNAPSHOT_DIR", os.path.join("data", "sessions"))
+        self.snapshot_dir = snapshot_dir or None
+        self.snapshot_ttl = snapshot_ttl or float(os.environ.get("SESSION_SNAPSHOT_TTL_SECONDS", str(7 * 24 * 3600)))
+        if self.snapshot_dir:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+
+        self._sessions = OrderedDict()  # session_id -> (session, last_used)
+        self._pins = {}                 # session_id -> open connections using the session
+        self._loading = {}              # session_id -> snapshot load in progress
+        self._evicting = {}             # session_id -> session whose snapshot is being written
+        self.stats = {
+            "created": 0, "evicted_lru": 0, "evicted_idle": 0,
+            "snapshots_written": 0, "snapshots_loaded": 0, "snapshot_errors": 0
+        }
+
+    async def get(self, session_id):
+        """
+        Get a session, loading it from its snapshot if it was evicted.
+
+        Args:
+            session_id (str): Session ID
+
+        Returns:
+            Session: The session, or None if it is unknown
+        """
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            self._sessions[session_id] = (entry[0], time.time())
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+        session = self._evicting.get(session_id)
+        if session is not None:
+            # Requested again while its snapshot is being written, keep using it
+            return await self.put(session_id, session, created=False)
+
+        # Concurrent requests for an evicted session share one snapshot load
+        load = self._loading.get(session_id)
+        if load is None:
+            load = asyncio.ensure_future(self._restore(session_id))
+            self._loading[session_id] = load
+            load.add_done_callback(lambda _: self._loading.pop(session_id, None))
+        return await asyncio.shield(load)
+
+    async def _restore(self, session_id):
+        session = await self._load_snapshot(session_id)
+        if session is not None:
+            session = await self.put(session_id, session, created=False)
+        return session
+
+    async def put(self, session_id, session, created=True):
+        """
+        Add a session unless one is already stored under the ID, evicting least
+        recently used sessions when the store is full.
+
+        Args:
+            session_id (str): Session ID
+            session (Session): The session
+            created (bool): Whether the session is new, for the stats
+
+        Returns:
+            Session: The stored session, which is an existing one if another
+                request added it first
+        """
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            return entry[0]
+        self._sessions[session_id] = (session, time.time())
+        if created:
+            self.stats["created"] += 1
+
+        if len(self._sessions) > self.max_sessions:
+            for candidate in list(self._sessions):
+                if len(self._sessions) <= self.max_sessions:
+                    break
+                if candidate != session_id and not self._pins.get(candidate):
+                    await self.evict(candidate)
+                    self.stats["evicted_lru"] += 1
+        return session
+
+    async def save(self, session_id, session, *fields):
+        """Nothing to write: sessions are changed in place in memory."""
+        return
+
+    async def append_message(self, session_id, session, message):
+        """
+        Add a message to the session's conversation.
+
+        Args:
+            session_id (str): Session ID
+            session (Session): The session
+            message (Message): The new message
+        """
+        session.conversation_history.append(message)
+
+    def pin(self, session_id, session=None):
+        """Keep a session in memory while a connection uses it."""
+        self._pins[session_id] = self._pins.get(session_id, 0) + 1
+
+    def unpin(self, session_id):
+        """Release a pin; the session's idle time starts now."""
+        count = self._pins.get(session_id, 0) - 1
+        if count > 0:
+            self._pins[session_id] = count
+        else:
+            self._pins.pop(session_id, None)
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            self._sessions[session_id] = (entry[0], time.time())
+
+    async def evict(self, session_id):
+        """
+        Remove a session from memory, writing its snapshot first.
+
+        Args:
+            session_id (str): Session ID
+
+        Returns:
+            bool: True if a session was removed
+        """
+        entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return False
+        self._evicting[session_id] = entry[0]
+        try:
+            await self._write_snapshot(session_id, entry[0])
+        finally:
+            self._evicting.pop(session_id, None)
+        return True
+
+    async def sweep(self):
+        """
+        Evict unpinned sessions idle for longer than idle_ttl and delete expired snapshots.
+
+        Returns:
+            int: Number of sessions evicted
+        """
+        cutoff = time.time() - self.idle_ttl
+        idle = [
+            session_id for session_id, (_, last_used) in self._sessions.items()
+            if last_used < cutoff and not self._pins.get(session_id)
+        ]
+        for session_id in idle:
+            await self.evict(session_id)
+        self.stats["evicted_idle"] += len(idle)
+        if idle:
+            print(f"[UTILS] Evicted {len(idle)} idle sessions, {len(self._sessions)} in memory")
+        if self.snapshot_dir:
+            await asyncio.to_thread(self._delete_expired_snapshots)
+        return len(idle)
+
+    async def run_sweeper(self, interval=None):
+        """Sweep every interval seconds (SESSION_SWEEP_SECONDS) until cancelled."""
+        interval = interval or float(os.environ.get("SESSION_SWEEP_SECONDS", "60"))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"[UTILS] Error sweeping sessions: {str(e)}")
+
+    async def close(self):
+        """Snapshot every session still in memory, e.g. on shutdown."""
+        sessions = list(self._sessions)
+        for session_id in sessions:
+            await self.evict(session_id)
+        if sessions and self.snapshot_dir:
+            print(f"[UTILS] Saved {len(sessions)} sessions to {self.snapshot_dir}")
+
+    def _snapshot_path(self, session_id):
+        # Session IDs come from client URLs, so never use them as file names directly
+        name = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.snapshot_dir, f"{name}.json")
+
+    async def _write_snapshot(self, session_id, session):
+        if not self.snapshot_dir:
+            return
+        path = self._snapshot_path(session_id)
+        data = json.dumps({"session_id": session_id, "session": session.to_record()}, separators=(",", ":"))
+        try:
+            await asyncio.to_thread(self._write_file, path, data)
+            self.stats["snapshots_written"] += 1
+        except OSError as e:
+            self.stats["snapshot_errors"] += 1
+            print(f"[UTILS] Error writing session snapshot for {session_id}: {str(e)}")
+
+    @staticmethod
+    def _write_file(path, data):
+        # Write to a temporary file first so a crash never leaves a partial snapshot
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    async def _load_snapshot(self, session_id):
+        if not self.snapshot_dir:
+            return None
+        path = self._snapshot_path(session_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            data = await asyncio.to_thread(self._read_and_remove, path)
+            session = Session.from_record(json.loads(data)["session"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.stats["snapshot_errors"] += 1
+            print(f"[UTILS] Error loading session snapshot for {session_id}: {str(e)}")
+            return None
+        self.stats["snapshots_loaded"] += 1
+        print(f"[UTILS] Restored session {session_id} from snapshot")
+        return session
+
+    @staticmethod
+    def _read_and_remove(path):
+        # The session is resident again and is snapshotted anew when evicted
+        with open(path, encoding="utf-8") as f:
+            data = f.read()
+        os.remove(path)
+        return data
+
+    def _delete_expired_snapshots(self):
+        cutoff = time.time() - self.snapshot_ttl
+        for entry in os.scandir(self.snapshot_dir):
+            if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get_stats(self):
+        """
+        Get store counters.
+
+        Returns:
+            dict: Sessions in memory, pinned sessions, limits and eviction/snapshot counts
+        """
+        return {
+            "backend": "memory",
+            "in_memory": len(self._sessions),
+            "pinned": len(self._pins),
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            "snapshot_dir": self.snapshot_dir,
+            **self.stats
+        }
@@ -0,0 +1,135 @@
+import hashlib
+import os
+import socket
+import threading
+import time
+
+# Milliseconds since the Unix epoch at which IDs start counting (2024-01-01 UTC)
+TICKET_EPOCH_MS = 1704067200000
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+# Digits of the largest 63-bit ID, so IDs sort as text in the order they were made
+ID_DIGITS = 19
+# Redis counter workers claim their IDs from
+WORKER_COUNTER_KEY = "ticket_ids:next_worker"
+
+
+class TicketIdGenerator:
+    """
+    Makes unique, time-ordered ticket IDs without asking the database.
+
+    Each ID packs the milliseconds since TICKET_EPOCH_MS, the worker ID and a
+    per-millisecond sequence number into one 63-bit number, snowflake style,
+    written as "TICKET-" and fixed-width decimal digits. Workers need distinct
+    IDs: set TICKET_WORKER_ID per process, or let each worker claim one from a
+    shared Redis counter with claim_worker_id(). IDs of one worker always
+    increase, even if the clock goes back or more than 4096 IDs are made in a
+    millisecond.
+    """
+
+    # Shared instance used by the app
+    _shared = None
+
+    def __init__(self, worker_id=None, prefix="TICKET-"):
+        """
+        Initialize the generator.
+
+        Args:
+            worker_id (int, optional): This worker's ID from 0 to 1023 (TICKET_WORKER_ID);
+                derived from the host name and process ID until claim_worker_id() is called
+            prefix (str): Text in front of the number
+        """
+        if worker_id is None:
+            worker_id = os.environ.get("TICKET_WORKER_ID")
+        # Where the worker ID came from: "configured", "redis" or "derived"
+        self.worker_id_source = "configured"
+        if worker_id is None or worker_id == "":
+            # Only safe for a single process; several workers claim IDs with claim_worker_id()
+            self.worker_id_source = "derived"
+            digest = hashlib.sha1(f"{socket.gethostname()}:{os.getpid()}".encode()).digest()
+            worker_id = int.from_bytes(digest[:4], "big") & MAX_WORKER_ID
+        worker_id = int(worker_id)
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"TICKET_WORKER_ID must be between 0 and {MAX_WORKER_ID}, got {worker_id}")
+        self.worker_id = worker_id
+        self.prefix = prefix
+        self._last_ms = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self.stats = {"generated": 0, "clock_regressions": 0, "sequence_overflows": 0}
+
+    @classmethod
+    def get_shared(cls):
+        """Return the process-wide generator, creating it on first use."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    async def claim_worker_id(self, redis_client):
+        """
+        Take the next free worker ID from a counter shared by all workers.
+
+        Does nothing when the worker ID is configured. The counter wraps after
+        1024 claims, so a worker restarted that often reuses the ID of an old one.
+
+        Args:
+            redis_client: Asyncio Redis client, see utils.redis_client
+
+        Returns:
+            int: This worker's ID
+        """
+        if self.worker_id_source == "configured":
+            return self.worker_id
+        claimed = await redis_client.incr(WORKER_COUNTER_KEY)
+        with self._lock:
+            self.worker_id = (claimed - 1) & MAX_WORKER_ID
+            self.worker_id_source = "redis"
+        print(f"[UTILS] Claimed ticket worker ID {self.worker_id}")
+        return self.worker_id
+
+    def next_number(self):
+        """
+        Make the next ID as a number.
+
+        Returns:
+            int: ID, larger than every one made before by this generator
+        """
+        with self._lock:
+            now_ms = int(time.time() * 1000) - TICKET_EPOCH_MS
+            if now_ms < self._last_ms:
+                # The clock went back: keep counting from the last timestamp
+                self.stats["clock_regressions"] += 1
+                now_ms = self._last_ms
+            if now_ms == self._last_ms:
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    # Borrow the next millisecond rather than wait for it
+                    self.stats["sequence_overflows"] += 1
+                    now_ms += 1
+                    self._sequence = 0
+            else:
+                self._sequence = 0
+            self._last_ms = now_ms
+            self.stats["generated"] += 1
+            return (now_ms << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+    def next_id(self):
+        """
+        Make the next ticket ID.
+
+        Returns:
+            str: Ticket ID such as "TICKET-0383412395069456384"
+        """
+        return f"{self.prefix}{self.next_number():0{ID_DIGITS}d}"
+
+    def get_stats(self):
+        """
+        Get generator counters.
+
+        Returns:
+            dict: Worker ID, where it came from, and counts of IDs made, clock
+                regressions and sequence overflows
+        """
+        return {"worker_id": self.worker_id, "worker_id_source": self.worker_id_source, **self.stats}
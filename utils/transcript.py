@@ -0,0 +1,288 @@
+import sys
+import time
+from array import array
+from datetime import datetime
+
+from utils.conversation_utils import format_message, estimate_tokens
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def format_timestamp(epoch):
+    """
+    Render an epoch timestamp the way the UI and database expect it.
+
+    Args:
+        epoch (int): Seconds since the epoch
+
+    Returns:
+        str: Local time as "YYYY-MM-DD HH:MM:SS"
+    """
+    return datetime.fromtimestamp(epoch).strftime(TIMESTAMP_FORMAT)
+
+
+def parse_timestamp(value):
+    """
+    Convert a timestamp string or number to epoch seconds.
+
+    Args:
+        value (str or int): "YYYY-MM-DD HH:MM:SS" string or epoch seconds
+
+    Returns:
+        int: Seconds since the epoch
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.strptime(value, TIMESTAMP_FORMAT).timestamp())
+    except (TypeError, ValueError):
+        return int(time.time())
+
+
+class Message:
+    """A conversation message stored compactly: interned role, content and epoch-second timestamp."""
+
+    __slots__ = ("role", "content", "created_at")
+
+    def __init__(self, role, content, created_at=None):
+        """
+        Initialize a message.
+
+        Args:
+            role (str): "user" or "assistant"
+            content (str): Message text
+            created_at (int, optional): Epoch seconds, defaults to now
+        """
+        self.role = sys.intern(role)
+        self.content = content
+        self.created_at = int(time.time()) if created_at is None else int(created_at)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a message from the dict format used by the UI and database."""
+        return cls(data.get("role", "unknown"), data.get("content", ""), parse_timestamp(data.get("timestamp")))
+
+    @property
+    def timestamp(self):
+        """The formatted timestamp, produced only when something displays it."""
+        return format_timestamp(self.created_at)
+
+    def get(self, key, default=None):
+        """Dict-style access so message consumers work with both dicts and messages."""
+        if key == "timestamp":
+            return self.timestamp
+        if key in ("role", "content"):
+            return getattr(self, key)
+        return default
+
+    def __getitem__(self, key):
+        if key not in ("role", "content", "timestamp"):
+            raise KeyError(key)
+        return self.get(key)
+
+    def to_dict(self):
+        """The dict format used by the UI and database."""
+        return {"role": self.role, "content": self.content, "timestamp": self.timestamp}
+
+
+# Roles stored as one-byte codes; messages with any other role are kept whole
+ROLES = ("user", "assistant")
+ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+OTHER_ROLE = 255
+
+
+def _render_margins(role):
+    """Characters format_message puts before and after the content of a message with this role."""
+    marker = "\x00"
+    rendered = format_message(Message(role, marker, 0))
+    header = rendered.index(marker)
+    return header, len(rendered) - header - len(marker)
+
+
+# Timestamps always render at the same width, so the margins are fixed per role
+RENDER_MARGINS = [_render_margins(role) for role in ROLES]
+
+
+class TranscriptView:
+    """Read-only window onto a contiguous range of a ConversationTranscript."""
+
+    __slots__ = ("_transcript", "_start", "_end")
+
+    def __init__(self, transcript, start, end):
+        self._transcript = transcript
+        self._start = start
+        self._end = end
+
+    def _bounds(self):
+        return self._start, self._end
+
+    def __len__(self):
+        start, end = self._bounds()
+        return end - start
+
+    def __iter__(self):
+        start, end = self._bounds()
+        transcript = self._transcript
+        for index in range(start, end):
+            yield transcript._message_at(index)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, key):
+        """
+        Index a message or slice a sub-view.
+
+        Args:
+            key (int or slice): Position relative to this view; slices must be contiguous
+
+        Returns:
+            Message or TranscriptView: The message, or a view of the slice
+        """
+        start, end = self._bounds()
+        if isinstance(key, slice):
+            first, last, step = key.indices(end - start)
+            if step != 1:
+                raise ValueError("Transcript slices must be contiguous")
+            return TranscriptView(self._transcript, start + first, start + max(first, last))
+        if key < 0:
+            key += end - start
+        if not 0 <= key < end - start:
+            raise IndexError("transcript index out of range")
+        return self._transcript._message_at(start + key)
+
+    @property
+    def start(self):
+        """Index of the first message of this view in the full transcript."""
+        return self._bounds()[0]
+
+    @property
+    def messages(self):
+        """The messages as plain dicts, e.g. for JSON responses."""
+        start, end = self._bounds()
+        return [message.to_dict() for message in self]
+
+    @property
+    def text(self):
+        """The rendered messages, joined from just this view's pieces."""
+        start, end = self._bounds()
+        return "".join(self._transcript._pieces[start:end])
+
+    @property
+    def tokens(self):
+        """Estimated tokens of the rendered messages, from cumulative counts."""
+        start, end = self._bounds()
+        prefix = self._transcript._token_prefix
+        return prefix[end] - prefix[start]
+
+    def rendered(self, index):
+        """Rendered text of the message at a position in this view."""
+        return self._transcript._rendered_at(self.start + index)
+
+    def token_count(self, index):
+        """Estimated tokens of the message at a position in this view."""
+        prefix = self._transcript._token_prefix
+        return prefix[self.start + index + 1] - prefix[self.start + index]
+
+    def last(self, n):
+        """
+        View of the newest messages.
+
+        Args:
+            n (int): Number of messages
+
+        Returns:
+            TranscriptView: At most n messages ending at the end of this view
+        """
+        start, end = self._bounds()
+        return TranscriptView(self._transcript, max(start, end - n), end)
+
+    def since(self, index):
+        """
+        View of the messages from an absolute transcript index onwards.
+
+        Args:
+            index (int): Index of the first message, e.g. a summary watermark
+
+        Returns:
+            TranscriptView: Messages from index to the end of this view
+        """
+        start, end = self._bounds()
+        return TranscriptView(self._transcript, min(max(start, index), end), end)
+
+    def snapshot(self):
+        """
+        Freeze the current extent.
+
+        Returns:
+            TranscriptView: A view that does not grow when messages are appended
+        """
+        start, end = self._bounds()
+        return TranscriptView(self._transcript, start, end)
+
+
+class ConversationTranscript(TranscriptView):
+    """
+    Append-only conversation log that renders and measures each message exactly once.
+
+    Messages are stored as columns rather than objects: role codes and epoch
+    timestamps in arrays, and the content as part of the message's rendered
+    text, from which it is sliced back out when a message is read. Rendered
+    messages are only joined when text is read, and then only the ones in range.
+    """
+
+    __slots__ = ("_roles", "_created_at", "_pieces", "_token_prefix", "_other")
+
+    def __init__(self, messages=None):
+        """
+        Initialize the transcript.
+
+        Args:
+            messages (list, optional): Existing messages to load
+        """
+        super().__init__(self, 0, 0)
+        self._roles = array("B")
+        self._created_at = array("q")
+        self._pieces = []                     # rendered text of each message, "" if it does not render
+        self._token_prefix = array("I", [0])  # cumulative token counts
+        self._other = None                    # messages with roles that do not render, by index
+        for message in messages or []:
+            self.append(message)
+
+    def _bounds(self):
+        # The full transcript grows with every append
+        return 0, len(self._roles)
+
+    def append(self, message):
+        """
+        Add a message, rendering and measuring it once.
+
+        Args:
+            message (Message or dict): Message with role, content and timestamp
+        """
+        if not isinstance(message, Message):
+            message = Message.from_dict(message)
+        rendered = format_message(message)
+        code = ROLE_CODES.get(message.role, OTHER_ROLE)
+        if code == OTHER_ROLE or not rendered:
+            # Not part of the rendered text, so keep the message itself
+            code = OTHER_ROLE
+            if self._other is None:
+                self._other = {}
+            self._other[len(self._roles)] = message
+        tokens = estimate_tokens(rendered) if rendered else 0
+        self._roles.append(code)
+        self._created_at.append(message.created_at)
+        self._pieces.append(rendered)
+        self._token_prefix.append(self._token_prefix[-1] + tokens)
+
+    def _message_at(self, index):
+        code = self._roles[index]
+        if code == OTHER_ROLE:
+            return self._other[index]
+        header, trailer = RENDER_MARGINS[code]
+        rendered = self._pieces[index]
+        return Message(ROLES[code], rendered[header:len(rendered) - trailer], self._created_at[index])
+
+    def _rendered_at(self, index):
+        return self._pieces[index]
@@ -0,0 +1,70 @@
+import asyncio
+
+
+class TurnRunner:
+    """
+    Runs conversation turns in the background, one at a time per session.
+
+    Starting a turn cancels the session's turn in progress, since its work is
+    for a conversation state that is already out of date. The new turn waits
+    for the cancelled one to finish cleaning up before it starts, so turns of
+    one session never run side by side.
+    """
+
+    def __init__(self):
+        self._tasks = {}  # session ID -> latest turn task
+        self.stats = {"started": 0, "completed": 0, "superseded": 0, "failed": 0}
+
+    def start(self, session_id, turn):
+        """
+        Start a turn, cancelling the one in progress.
+
+        Args:
+            session_id (str): Session ID
+            turn (callable): Coroutine function running the turn
+
+        Returns:
+            asyncio.Task: The turn's task
+        """
+        previous = self._tasks.get(session_id)
+        if previous is not None and not previous.done():
+            previous.cancel()
+            self.stats["superseded"] += 1
+            print(f"[WORKFLOW] Cancelling superseded turn for client #{session_id}")
+        task = asyncio.create_task(self._run(session_id, previous, turn))
+        self._tasks[session_id] = task
+        self.stats["started"] += 1
+        return task
+
+    async def _run(self, session_id, previous, turn):
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            await turn()
+            self.stats["completed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"[WORKFLOW] ERROR: Turn for client #{session_id} failed: {str(e)}")
+        finally:
+            if self._tasks.get(session_id) is asyncio.current_task():
+                del self._tasks[session_id]
+
+    async def wait(self, session_id):
+        """Wait until the session's turns are done, without cancelling them."""
+        task = self._tasks.get(session_id)
+        while task is not None:
+            await asyncio.wait([task])
+            # A turn started meanwhile replaces the one waited for
+            latest = self._tasks.get(session_id)
+            task = latest if latest is not task else None
+
+    def get_stats(self):
+        """
+        Get turn counters.
+
+        Returns:
+            dict: Turns running now and started, completed, superseded and failed turns
+        """
+        return {"running": len(self._tasks), **self.stats}